@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException
+
+from app.ml.registry import get_model_registry, read_manifest
+from app.core.logging import get_logger
+
+# Not authenticated: anyone who can reach the API can switch the served model.
+# Mounted only with ADMIN_API_ENABLED; disable it (or put the API behind an
+# authenticating proxy) wherever untrusted clients can reach it.
+router = APIRouter(prefix="/admin")
+logger = get_logger("admin")
+
+
+@router.get("/models")
+def list_models():
+    return get_model_registry().status()
+
+
+@router.post("/models/{version}/activate", status_code=202)
+def activate_model(version: str):
+    registry = get_model_registry()
+
+    if version not in read_manifest(registry.registry_dir)["versions"]:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+
+    # Loads and warms up in the background; the current version keeps serving
+    registry.activate(version)
+
+    logger.info("model_activation_requested", extra={"extra_data": {"version": version}})
+
+    return {"activating": version, "active": registry.status()["active"]}
\ No newline at end of file
@@ -1,50 +1,143 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List
 from datetime import datetime
+from sqlalchemy.orm import Session
 
-from app.ml.validation import validate_input, ValidationError
-from app.ml.model import predict as ml_predict
-from app.core.state import get_current_state
+from app.ml.validation import validate_input, validate_batch, ValidationError, REQUIRED_FEATURES
+from app.ml.model import predict as ml_predict, predict_batch as ml_predict_batch
+from app.core.config import (
+    MAX_BATCH_SIZE,
+    PREDICTION_LOG_FEATURE_STORAGE,
+    SEGMENT_FIELD,
+    SEGMENT_MAX_LENGTH,
+    SEGMENT_ALLOWED_VALUES,
+    SEGMENT_OTHER,
+)
+from app.core.state import get_cached_state
+from app.core.detector import get_detector
 from app.fallback.rules import apply_fallback
-from app.storage.db import get_db_session
-from app.storage.schemas import PredictionLog
+from app.storage.db import get_db
+from app.storage.log_writer import record_predictions
 from app.core.logging import get_logger
+from app.core.metrics import stage_clock, count
 
 router = APIRouter()
 logger = get_logger("predict")
 
 
+def payload_segment(payload: dict):
+    """The optional segment key of a request, or None; values outside SEGMENT_ALLOWED_VALUES map to SEGMENT_OTHER."""
+    value = payload.get(SEGMENT_FIELD) if SEGMENT_FIELD else None
+    if value is None:
+        return None
+    value = str(value)[:SEGMENT_MAX_LENGTH]
+    if SEGMENT_ALLOWED_VALUES and value not in SEGMENT_ALLOWED_VALUES:
+        return SEGMENT_OTHER
+    return value
+
+
+def prediction_log(payload: dict, prediction, confidence, model_version, system_state, fallback_used,
+                   timestamp=None, features=None, cache_hit=False) -> dict:
+    row = {
+        "timestamp": timestamp or datetime.utcnow(),
+        "model_version": model_version,
+        "system_state": system_state,
+        "input_summary": payload,
+        "prediction": str(prediction),
+        "confidence_score": confidence,
+        "fallback_used": fallback_used,
+        "segment": payload_segment(payload),
+        "cache_hit": cache_hit,
+    }
+    if features is not None and PREDICTION_LOG_FEATURE_STORAGE == "typed":
+        # The validated vector goes into float columns; only unknown keys stay JSON
+        row.update(zip(REQUIRED_FEATURES, features))
+        extras = {k: v for k, v in payload.items() if k not in REQUIRED_FEATURES and k != SEGMENT_FIELD}
+        row["input_summary"] = extras or None
+    return row
+
+
+def check_batch_size(payloads: list):
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payloads)} > {MAX_BATCH_SIZE}"
+        )
+
+
+def score_batch(matrix, fallback_used: bool):
+    """(predictions, confidences, model_version) for a validated matrix."""
+    if fallback_used:
+        scored = [apply_fallback(row) for row in matrix.tolist()]
+        return [p for p, _ in scored], [c for _, c in scored], "fallback"
+    return ml_predict_batch(matrix)
+
+
+def observe_predictions(confidences):
+    """Feed model confidences to the streaming detector (fallback rows are skipped by callers)."""
+    detector = get_detector()
+    if detector is None:
+        return
+    if len(confidences) == 1:
+        detector.observe(confidences[0])
+    else:
+        detector.observe_batch(confidences)
+
+
+def batch_logs(payloads, matrix, valid_indices, predictions, confidences, model_version, system_state, fallback_used) -> list:
+    now = datetime.utcnow()
+    return [
+        prediction_log(payloads[i], prediction, confidence, model_version, system_state, fallback_used, now, features)
+        for i, features, prediction, confidence in zip(valid_indices, matrix.tolist(), predictions, confidences)
+    ]
+
+
+def batch_response(payloads, valid_indices, predictions, confidences, errors, system_state, fallback_used) -> dict:
+    results = [None] * len(payloads)
+    for i, prediction, confidence in zip(valid_indices, predictions, confidences):
+        results[i] = {"prediction": prediction, "confidence": confidence}
+    for i, error in errors.items():
+        results[i] = {"error": error}
+
+    return {
+        "results": results,
+        "system_state": system_state,
+        "fallback_used": fallback_used
+    }
+
+
 @router.post("/predict")
-def predict(payload: dict):
-    db = get_db_session()
+def predict(payload: dict, db: Session = Depends(get_db)):
+    clock = stage_clock("predict")
 
     try:
         features = validate_input(payload)
     except ValidationError as e:
+        count("validation_errors", route="predict")
         raise HTTPException(status_code=400, detail=str(e))
+    clock.lap("validate")
 
-    system_state = get_current_state(db)
+    system_state = get_cached_state(db)
+    clock.lap("state")
 
     fallback_used = False
+    cache_hit = False
 
     if system_state.current_state == "DEGRADED":
         prediction, confidence = apply_fallback(features)
         fallback_used = True
         model_version = "fallback"
     else:
-        prediction, confidence, model_version = ml_predict(features)
-
-    log = PredictionLog(
-        timestamp=datetime.utcnow(),
-        model_version=model_version,
-        system_state=system_state.current_state,
-        input_summary=payload,
-        prediction=str(prediction),
-        confidence_score=confidence,
-        fallback_used=fallback_used,
-    )
+        prediction, confidence, model_version, cache_hit = ml_predict(features)
+        observe_predictions([confidence])
+    clock.lap("inference")
 
-    db.add(log)
-    db.commit()
+    log = prediction_log(
+        payload, prediction, confidence, model_version,
+        system_state.current_state, fallback_used, features=features, cache_hit=cache_hit,
+    )
+    record_predictions(db, [log])
+    clock.lap("log_write")
 
     logger.info(
         "prediction_made",
@@ -52,13 +145,63 @@ def predict(payload: dict):
             "model_version": model_version,
             "state": system_state.current_state,
             "confidence": confidence,
-            "fallback": fallback_used
+            "fallback": fallback_used,
+            "cache_hit": cache_hit,
         }}
     )
+    clock.lap("logging")
+    clock.finish()
+    count("predictions", route="predict", fallback=str(fallback_used).lower())
 
     return {
         "prediction": prediction,
         "confidence": confidence,
         "system_state": system_state.current_state,
         "fallback_used": fallback_used
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/predict/batch")
+def predict_batch(payloads: List[Any], db: Session = Depends(get_db)):
+    check_batch_size(payloads)
+    clock = stage_clock("predict_batch")
+
+    matrix, valid_indices, errors = validate_batch(payloads)
+    clock.lap("validate")
+
+    current_state = get_cached_state(db).current_state
+    clock.lap("state")
+
+    fallback_used = current_state == "DEGRADED"
+    predictions, confidences, model_version = score_batch(matrix, fallback_used)
+    if not fallback_used:
+        observe_predictions(confidences)
+    clock.lap("inference")
+
+    logs = batch_logs(
+        payloads, matrix, valid_indices, predictions, confidences,
+        model_version, current_state, fallback_used,
+    )
+    if logs:
+        record_predictions(db, logs)
+    clock.lap("log_write")
+
+    logger.info(
+        "batch_prediction_made",
+        extra={"extra_data": {
+            "model_version": model_version,
+            "state": current_state,
+            "batch_size": len(payloads),
+            "scored": len(logs),
+            "rejected": len(errors),
+            "fallback": fallback_used
+        }}
+    )
+    clock.lap("logging")
+    clock.finish()
+    count("predictions", len(logs), route="predict_batch", fallback=str(fallback_used).lower())
+    count("validation_errors", len(errors), route="predict_batch")
+
+    return batch_response(
+        payloads, valid_indices, predictions, confidences, errors, current_state, fallback_used
+    )
\ No newline at end of file
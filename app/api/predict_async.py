@@ -0,0 +1,125 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.predict import (
+    prediction_log,
+    check_batch_size,
+    score_batch,
+    observe_predictions,
+    batch_logs,
+    batch_response,
+)
+from app.ml.validation import validate_input, validate_batch, ValidationError
+from app.ml.model import predict_async as ml_predict_async
+from app.ml.executor import run_inference
+from app.core.state import get_cached_state_async
+from app.fallback.rules import apply_fallback
+from app.storage.async_db import get_async_db
+from app.storage.log_writer import record_predictions_async
+from app.core.logging import get_logger
+from app.core.metrics import stage_clock, count
+
+router = APIRouter()
+logger = get_logger("predict")
+
+
+@router.post("/predict")
+async def predict(payload: dict, db: AsyncSession = Depends(get_async_db)):
+    clock = stage_clock("predict")
+
+    try:
+        features = validate_input(payload)
+    except ValidationError as e:
+        count("validation_errors", route="predict")
+        raise HTTPException(status_code=400, detail=str(e))
+    clock.lap("validate")
+
+    system_state = await get_cached_state_async(db)
+    clock.lap("state")
+
+    fallback_used = False
+    cache_hit = False
+
+    if system_state.current_state == "DEGRADED":
+        prediction, confidence = apply_fallback(features)
+        fallback_used = True
+        model_version = "fallback"
+    else:
+        prediction, confidence, model_version, cache_hit = await ml_predict_async(features)
+        observe_predictions([confidence])
+    clock.lap("inference")
+
+    log = prediction_log(
+        payload, prediction, confidence, model_version,
+        system_state.current_state, fallback_used, features=features, cache_hit=cache_hit,
+    )
+    await record_predictions_async(db, [log])
+    clock.lap("log_write")
+
+    logger.info(
+        "prediction_made",
+        extra={"extra_data": {
+            "model_version": model_version,
+            "state": system_state.current_state,
+            "confidence": confidence,
+            "fallback": fallback_used,
+            "cache_hit": cache_hit,
+        }}
+    )
+    clock.lap("logging")
+    clock.finish()
+    count("predictions", route="predict", fallback=str(fallback_used).lower())
+
+    return {
+        "prediction": prediction,
+        "confidence": confidence,
+        "system_state": system_state.current_state,
+        "fallback_used": fallback_used
+    }
+
+
+@router.post("/predict/batch")
+async def predict_batch(payloads: List[Any], db: AsyncSession = Depends(get_async_db)):
+    check_batch_size(payloads)
+    clock = stage_clock("predict_batch")
+
+    matrix, valid_indices, errors = await run_inference(validate_batch, payloads)
+    clock.lap("validate")
+
+    current_state = (await get_cached_state_async(db)).current_state
+    clock.lap("state")
+
+    fallback_used = current_state == "DEGRADED"
+    predictions, confidences, model_version = await run_inference(score_batch, matrix, fallback_used)
+    if not fallback_used:
+        observe_predictions(confidences)
+    clock.lap("inference")
+
+    logs = batch_logs(
+        payloads, matrix, valid_indices, predictions, confidences,
+        model_version, current_state, fallback_used,
+    )
+    if logs:
+        await record_predictions_async(db, logs)
+    clock.lap("log_write")
+
+    logger.info(
+        "batch_prediction_made",
+        extra={"extra_data": {
+            "model_version": model_version,
+            "state": current_state,
+            "batch_size": len(payloads),
+            "scored": len(logs),
+            "rejected": len(errors),
+            "fallback": fallback_used
+        }}
+    )
+    clock.lap("logging")
+    clock.finish()
+    count("predictions", len(logs), route="predict_batch", fallback=str(fallback_used).lower())
+    count("validation_errors", len(errors), route="predict_batch")
+
+    return batch_response(
+        payloads, valid_indices, predictions, confidences, errors, current_state, fallback_used
+    )
\ No newline at end of file
@@ -9,10 +9,121 @@ MODEL_VERSION = os.getenv("MODEL_VERSION", "v1.0")
 
 # ---- Database ----
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/system.db")
+# Connection pool per engine (one per process); pre-ping drops dead connections before use
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))  # -1 never recycles
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# SQLite pragmas set on every new connection. WAL lets the monitoring jobs
+# read while /predict writes; a writer waits up to the busy timeout for the lock
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# Request threads of one process queue for the single SQLite writer on a lock
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "true").lower() == "true"
+# Upgrade the schema when app.main is imported (serialized across workers);
+# false leaves it to `python -m app.storage.migrations` before startup
+SCHEMA_UPGRADE_ON_STARTUP = os.getenv("SCHEMA_UPGRADE_ON_STARTUP", "true").lower() == "true"
+
+# ---- Request Path ----
+# sync: threadpool handlers with sync sessions
+# async: async handlers on SQLAlchemy's async engine (aiosqlite / asyncpg)
+API_MODE = os.getenv("API_MODE", "sync")
+# Threads scoring requests on the async path (0: min(4, CPU count))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))
+
+# ---- Batch Scoring ----
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 5000))
+# Score linear models from compiled coef_/intercept_ instead of sklearn calls
+MODEL_FAST_PATH = os.getenv("MODEL_FAST_PATH", "true").lower() == "true"
+
+# ---- Model Registry ----
+# Without a manifest in MODEL_REGISTRY_DIR, data/model.pkl is served as MODEL_VERSION
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "data/models")
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", 5))  # 0 disables the watcher
+MODEL_WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", 256))
+# /admin/models endpoints have no authentication; disable them wherever the API is reachable by untrusted clients
+ADMIN_API_ENABLED = os.getenv("ADMIN_API_ENABLED", "true").lower() == "true"
+
+# ---- Prediction Cache ----
+# LRU of single-row model results keyed by (model version, feature tuple); 0 disables.
+# Pays off for models scored through sklearn (~140 us/row vs ~2 us per hit); a
+# compiled linear model (MODEL_FAST_PATH) scores a row faster than a lookup.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 0))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 300))  # 0: no expiry
+# Features are rounded to this step for the key; 0 keys on exact values
+PREDICTION_CACHE_QUANTUM = float(os.getenv("PREDICTION_CACHE_QUANTUM", 0))
+
+# ---- Prediction Log Writes ----
+# sync: commit each request's log rows before responding
+# write_behind: enqueue rows and bulk-insert them from a background flusher
+PREDICTION_LOG_WRITE_MODE = os.getenv("PREDICTION_LOG_WRITE_MODE", "sync")
+PREDICTION_LOG_FLUSH_BATCH_SIZE = int(os.getenv("PREDICTION_LOG_FLUSH_BATCH_SIZE", 500))
+PREDICTION_LOG_FLUSH_INTERVAL_MS = int(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL_MS", 200))
+PREDICTION_LOG_QUEUE_MAX_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_MAX_SIZE", 50000))
+PREDICTION_LOG_QUEUE_FULL_POLICY = os.getenv("PREDICTION_LOG_QUEUE_FULL_POLICY", "block")  # block | drop | spill
+PREDICTION_LOG_SPILL_PATH = os.getenv("PREDICTION_LOG_SPILL_PATH", "data/prediction_log_spill.jsonl")
+# typed: validated features in float columns, input_summary keeps only other keys
+# json: the whole payload in input_summary (original layout)
+PREDICTION_LOG_FEATURE_STORAGE = os.getenv("PREDICTION_LOG_FEATURE_STORAGE", "typed")
 
 # ---- Monitoring Windows ----
-BASELINE_SAMPLE_SIZE = int(os.getenv("BASELINE_SAMPLE_SIZE", 1000))
+BASELINE_SAMPLE_SIZE = int(os.getenv("BASELINE_SAMPLE_SIZE", 1000))  # <= 0: every logged prediction
+SCAN_CHUNK_SIZE = int(os.getenv("SCAN_CHUNK_SIZE", 10000))
+SKETCH_BINS = int(os.getenv("SKETCH_BINS", 64))
 CURRENT_WINDOW_MINUTES = int(os.getenv("CURRENT_WINDOW_MINUTES", 15))
+# rollups: sum per-minute prediction_rollups rows; raw: scan prediction_logs
+WINDOW_SOURCE = os.getenv("WINDOW_SOURCE", "rollups")
+# Request-path sketch values are merged into the rollups this often; 0 merges every write
+ROLLUP_SKETCH_FLUSH_SECONDS = float(os.getenv("ROLLUP_SKETCH_FLUSH_SECONDS", 1))
+
+# ---- Segments ----
+# Monitoring also runs per (model_version, payload[SEGMENT_FIELD]); "" disables the payload field
+SEGMENT_FIELD = os.getenv("SEGMENT_FIELD", "segment")
+SEGMENT_MAX_LENGTH = int(os.getenv("SEGMENT_MAX_LENGTH", 64))
+# Comma-separated; other payload values are logged as SEGMENT_OTHER. Empty allows any value
+SEGMENT_ALLOWED_VALUES = [v.strip() for v in os.getenv("SEGMENT_ALLOWED_VALUES", "").split(",") if v.strip()]
+SEGMENT_OTHER = os.getenv("SEGMENT_OTHER", "other")
+SEGMENT_MONITORING_ENABLED = os.getenv("SEGMENT_MONITORING_ENABLED", "false").lower() == "true"
+# Segment windows with fewer predictions are not judged
+SEGMENT_MIN_PREDICTIONS = int(os.getenv("SEGMENT_MIN_PREDICTIONS", 30))
+# Only the busiest segments of a window are judged
+SEGMENT_MAX_SEGMENTS = int(os.getenv("SEGMENT_MAX_SEGMENTS", 100))
+
+# ---- Monitoring Daemon ----
+DAEMON_INTERVAL_SECONDS = float(os.getenv("DAEMON_INTERVAL_SECONDS", 60))
+# 0: compute the baseline only when it is missing
+DAEMON_BASELINE_INTERVAL_SECONDS = float(os.getenv("DAEMON_BASELINE_INTERVAL_SECONDS", 0))
+DAEMON_STATS_PATH = os.getenv("DAEMON_STATS_PATH", "data/monitoring_stats.json")
+
+# ---- Log Archive ----
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_AFTER_HOURS = int(os.getenv("ARCHIVE_AFTER_HOURS", 24))
+# logs: first BASELINE_SAMPLE_SIZE rows of prediction_logs
+# archive: every archived row from the last BASELINE_ARCHIVE_DAYS days
+BASELINE_SOURCE = os.getenv("BASELINE_SOURCE", "logs")
+BASELINE_ARCHIVE_DAYS = int(os.getenv("BASELINE_ARCHIVE_DAYS", 30))
+
+# ---- Baseline Updates ----
+# static: recompute from BASELINE_SOURCE; decayed: fold new rollups into an
+# exponentially decayed baseline every BASELINE_UPDATE_MINUTES
+BASELINE_MODE = os.getenv("BASELINE_MODE", "static")
+BASELINE_HALF_LIFE_HOURS = float(os.getenv("BASELINE_HALF_LIFE_HOURS", 168))
+BASELINE_UPDATE_MINUTES = int(os.getenv("BASELINE_UPDATE_MINUTES", 15))
+# Skip folding an interval in which the system was DEGRADED or raised a still-open incident
+BASELINE_FREEZE_ON_ALERT = os.getenv("BASELINE_FREEZE_ON_ALERT", "true").lower() == "true"
+
+# ---- Retention (days, <= 0 keeps rows forever) ----
+# Raw prediction_logs live ARCHIVE_AFTER_HOURS and are deleted by the archiver
+RETENTION_ROLLUPS_DAYS = int(os.getenv("RETENTION_ROLLUPS_DAYS", 90))
+RETENTION_WINDOW_METRICS_DAYS = int(os.getenv("RETENTION_WINDOW_METRICS_DAYS", 30))
+RETENTION_SYSTEM_STATE_DAYS = int(os.getenv("RETENTION_SYSTEM_STATE_DAYS", 90))
+# Snapshots referenced by incidents or the live baseline are always kept
+RETENTION_BASELINE_SNAPSHOTS_DAYS = int(os.getenv("RETENTION_BASELINE_SNAPSHOTS_DAYS", 90))
+# Rows per delete transaction, for retention and the archiver
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", 5000))
 
 # ---- Confidence Thresholds ----
 LOW_CONFIDENCE_THRESHOLD = float(os.getenv("LOW_CONFIDENCE_THRESHOLD", 0.6))
@@ -21,9 +132,59 @@ LOW_CONFIDENCE_THRESHOLD = float(os.getenv("LOW_CONFIDENCE_THRESHOLD", 0.6))
 MAX_CONFIDENCE_DROP = float(os.getenv("MAX_CONFIDENCE_DROP", 0.15))  
 MAX_LOW_CONFIDENCE_INCREASE = float(os.getenv("MAX_LOW_CONFIDENCE_INCREASE", 0.20))
 
+# ---- Feature Drift ----
+# Population Stability Index levels; 0.1 / 0.25 are the usual rules of thumb
+DRIFT_PSI_WARNING = float(os.getenv("DRIFT_PSI_WARNING", 0.10))
+DRIFT_PSI_CRITICAL = float(os.getenv("DRIFT_PSI_CRITICAL", 0.25))
+# PSI over this many baseline-quantile bins (0 = the SKETCH_BINS bins)
+DRIFT_PSI_BINS = int(os.getenv("DRIFT_PSI_BINS", 10))
+# Below this many rows PSI is mostly sampling noise; drift is not evaluated
+DRIFT_MIN_PREDICTIONS = int(os.getenv("DRIFT_MIN_PREDICTIONS", 500))
+# Severe drift alone only raises WARNING unless enabled (DEGRADED turns on fallback)
+DRIFT_CRITICAL_DEGRADES = os.getenv("DRIFT_CRITICAL_DEGRADES", "false").lower() == "true"
+DRIFT_PARALLEL_MIN_ROWS = int(os.getenv("DRIFT_PARALLEL_MIN_ROWS", 5000))
+DRIFT_WORKERS = int(os.getenv("DRIFT_WORKERS", os.cpu_count() or 1))
+
+# ---- Incident Explainer ----
+EXPLAINER_BATCH_SIZE = int(os.getenv("EXPLAINER_BATCH_SIZE", 8))
+EXPLAINER_POLL_SECONDS = float(os.getenv("EXPLAINER_POLL_SECONDS", 30))
+EXPLAINER_IDLE_UNLOAD_SECONDS = float(os.getenv("EXPLAINER_IDLE_UNLOAD_SECONDS", 600))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", 256))
+# Signals are rounded to this step before they become part of the cache key
+EXPLANATION_SIGNAL_QUANTUM = float(os.getenv("EXPLANATION_SIGNAL_QUANTUM", 0.05))
+
 # ---- Stability Rules ----
-WARNING_CONSECUTIVE_RUNS = 2
-CRITICAL_CONSECUTIVE_RUNS = 3
+# Consecutive breaching streaming-detector checks before WARNING / DEGRADED
+WARNING_CONSECUTIVE_RUNS = int(os.getenv("WARNING_CONSECUTIVE_RUNS", 2))
+CRITICAL_CONSECUTIVE_RUNS = int(os.getenv("CRITICAL_CONSECUTIVE_RUNS", 3))
+
+# ---- Streaming Detector ----
+# EWMAs of confidence and the low-confidence rate, updated per prediction
+STREAM_DETECTOR_ENABLED = os.getenv("STREAM_DETECTOR_ENABLED", "true").lower() == "true"
+STREAM_DETECTOR_HALF_LIFE = float(os.getenv("STREAM_DETECTOR_HALF_LIFE", 200))  # predictions
+STREAM_DETECTOR_CHECK_SECONDS = float(os.getenv("STREAM_DETECTOR_CHECK_SECONDS", 1))
+STREAM_DETECTOR_MIN_EVENTS = int(os.getenv("STREAM_DETECTOR_MIN_EVENTS", 200))
+
+# ---- System State Cache ----
+# Serving processes re-read the state when this file changes or the TTL expires
+STATE_CACHE_TTL_SECONDS = float(os.getenv("STATE_CACHE_TTL_SECONDS", 30))
+STATE_SIGNAL_PATH = os.getenv("STATE_SIGNAL_PATH", "data/state.signal")
+
+# ---- Metrics ----
+# Per-stage request timers and the /metrics endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# ---- Application Log ----
+# One file per process ({pid} is replaced); "-" logs to stderr
+LOG_PATH = os.getenv("LOG_PATH", "logs/app.{pid}.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 50 * 1024 * 1024))  # 0: no size rotation
+LOG_ROTATE_INTERVAL_HOURS = float(os.getenv("LOG_ROTATE_INTERVAL_HOURS", 24))  # 0: no time rotation
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 7))
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", 10000))
+# Keep 1 in N events per message, e.g. "prediction_made=100,batch_prediction_made=10".
+# Unlisted events and WARNING+ records are always written.
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_JSON_ENCODER = os.getenv("LOG_JSON_ENCODER", "json")  # json | orjson
 
 # ---- System States ----
 STATE_NORMAL = "NORMAL"
@@ -0,0 +1,297 @@
+"""
+Streaming change-point detector on the live prediction stream.
+
+Every model prediction updates two exponentially weighted moving averages
+in O(1): confidence, and the low-confidence indicator (confidence below
+LOW_CONFIDENCE_THRESHOLD). A background thread compares them with the
+stored baseline every STREAM_DETECTOR_CHECK_SECONDS using the same limits
+as monitoring.deviation (MAX_CONFIDENCE_DROP / MAX_LOW_CONFIDENCE_INCREASE,
+twice those for DEGRADED). A check only counts once it saw new predictions;
+WARNING is raised after WARNING_CONSECUTIVE_RUNS breaching checks in a row,
+DEGRADED after CRITICAL_CONSECUTIVE_RUNS critical ones.
+
+The detector only escalates. Recovery, drift and the incident bookkeeping
+stay with monitor_job, which keeps running on its windows as a cross-check.
+Fallback predictions are not observed, so the averages go stale while
+DEGRADED; whenever the state changes under the detector (recovery, or an
+escalation by monitor_job or another worker) it starts over from an empty
+stream instead of re-breaching on the old averages.
+
+Each worker process runs its own detector over the traffic it serves.
+Escalations are serialized across workers with an exclusive lock on
+STATE_SIGNAL_PATH + ".lock" and re-check the stored (uncached) state under
+it, so only the first worker to breach writes the state and the incident.
+"""
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not POSIX; escalations are only serialized per process
+    fcntl = None
+
+import numpy as np
+
+from app.core.config import (
+    STREAM_DETECTOR_ENABLED,
+    STREAM_DETECTOR_HALF_LIFE,
+    STREAM_DETECTOR_CHECK_SECONDS,
+    STREAM_DETECTOR_MIN_EVENTS,
+    WARNING_CONSECUTIVE_RUNS,
+    CRITICAL_CONSECUTIVE_RUNS,
+    LOW_CONFIDENCE_THRESHOLD,
+    MAX_CONFIDENCE_DROP,
+    MAX_LOW_CONFIDENCE_INCREASE,
+    STATE_NORMAL,
+    STATE_WARNING,
+    STATE_DEGRADED,
+    STATE_SIGNAL_PATH,
+)
+from app.core.logging import get_logger
+from app.core.state import get_cached_state, get_current_state, set_system_state
+from app.storage.db import get_db_session
+from app.storage.schemas import BaselineMetrics, Incident
+
+logger = get_logger("detector")
+
+SEVERITY = {STATE_NORMAL: 0, STATE_WARNING: 1, STATE_DEGRADED: 2}
+BASELINE_REFRESH_SECONDS = 300
+
+
+@contextmanager
+def escalation_lock(path: str = STATE_SIGNAL_PATH + ".lock"):
+    """Exclusive lock shared by the detectors of every worker process."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = Path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class StreamingDetector:
+    def __init__(
+        self,
+        half_life: float = STREAM_DETECTOR_HALF_LIFE,
+        check_seconds: float = STREAM_DETECTOR_CHECK_SECONDS,
+        min_events: int = STREAM_DETECTOR_MIN_EVENTS,
+        warning_runs: int = WARNING_CONSECUTIVE_RUNS,
+        critical_runs: int = CRITICAL_CONSECUTIVE_RUNS,
+    ):
+        # Weight of the newest event; half_life is counted in predictions
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.check_seconds = check_seconds
+        self.min_events = min_events
+        self.warning_runs = warning_runs
+        self.critical_runs = critical_runs
+
+        self._lock = threading.Lock()
+        self.events = 0
+        self.ewma_confidence = None
+        self.ewma_low_rate = None
+
+        self.baseline = None  # (avg_confidence, low_confidence_rate, version)
+        self._baseline_loaded_at = None
+        self._checked_events = 0
+        self._breach_runs = 0
+        self._critical_runs = 0
+        self._state = None  # state the averages were built under
+        self.raised = 0
+        self.resets = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- Request path ----
+
+    def observe(self, confidence: float):
+        low = 1.0 if confidence < LOW_CONFIDENCE_THRESHOLD else 0.0
+        with self._lock:
+            if self.ewma_confidence is None:
+                self.ewma_confidence, self.ewma_low_rate = confidence, low
+            else:
+                a = self.alpha
+                self.ewma_confidence += a * (confidence - self.ewma_confidence)
+                self.ewma_low_rate += a * (low - self.ewma_low_rate)
+            self.events += 1
+
+    def observe_batch(self, confidences):
+        """Same result as observe() per row, folded in closed form."""
+        n = len(confidences)
+        if n == 0:
+            return
+        values = np.asarray(confidences, dtype=float)
+        low = (values < LOW_CONFIDENCE_THRESHOLD).astype(float)
+        decay = 1 - self.alpha
+        # Newest row weighs alpha, the one before alpha * decay, ...
+        weights = self.alpha * decay ** np.arange(n - 1, -1, -1)
+        carry = decay ** n
+
+        with self._lock:
+            if self.ewma_confidence is None:
+                self.ewma_confidence, self.ewma_low_rate = values[0], low[0]
+            self.ewma_confidence = float(carry * self.ewma_confidence + weights @ values)
+            self.ewma_low_rate = float(carry * self.ewma_low_rate + weights @ low)
+            self.events += n
+
+    def reset(self):
+        """Forget the stream; the next checks wait for min_events fresh predictions."""
+        with self._lock:
+            self.events = 0
+            self.ewma_confidence = None
+            self.ewma_low_rate = None
+        self._checked_events = 0
+        self._breach_runs = self._critical_runs = 0
+        self.resets += 1
+
+    # ---- Checks ----
+
+    def signals(self) -> dict:
+        avg_confidence, low_rate, _ = self.baseline
+        return {
+            "confidence_drop": avg_confidence - self.ewma_confidence,
+            "low_confidence_increase": self.ewma_low_rate - low_rate,
+            "ewma_confidence": self.ewma_confidence,
+            "ewma_low_confidence_rate": self.ewma_low_rate,
+            "events": self.events,
+            "source": "stream",
+        }
+
+    def level(self, signals: dict) -> str:
+        drop = signals["confidence_drop"]
+        increase = signals["low_confidence_increase"]
+        if drop > MAX_CONFIDENCE_DROP * 2 or increase > MAX_LOW_CONFIDENCE_INCREASE * 2:
+            return STATE_DEGRADED
+        if drop > MAX_CONFIDENCE_DROP or increase > MAX_LOW_CONFIDENCE_INCREASE:
+            return STATE_WARNING
+        return STATE_NORMAL
+
+    def check(self, current_state: str):
+        """
+        One hysteresis step. Returns (new_state, signals, reason) when the
+        stream calls for a more severe state than current_state, else None.
+        """
+        events = self.events
+        if self.baseline is None or events < self.min_events or events == self._checked_events:
+            return None
+        self._checked_events = events
+
+        signals = self.signals()
+        level = self.level(signals)
+        self._breach_runs = self._breach_runs + 1 if level != STATE_NORMAL else 0
+        self._critical_runs = self._critical_runs + 1 if level == STATE_DEGRADED else 0
+
+        if self._critical_runs >= self.critical_runs:
+            target, reason = STATE_DEGRADED, "Streaming detector: severe sustained confidence degradation"
+        elif self._breach_runs >= self.warning_runs:
+            target, reason = STATE_WARNING, "Streaming detector: moderate deviation from baseline"
+        else:
+            return None
+
+        if SEVERITY[target] <= SEVERITY.get(current_state, 0):
+            return None
+        return target, signals, reason
+
+    def load_baseline(self, db):
+        row = db.query(BaselineMetrics).filter_by(baseline_id="default").first()
+        if row is not None:
+            self.baseline = (row.avg_confidence, row.low_confidence_rate, row.version)
+        self._baseline_loaded_at = time.monotonic()
+
+    def run_once(self):
+        db = get_db_session()
+        try:
+            if (
+                self._baseline_loaded_at is None
+                or time.monotonic() - self._baseline_loaded_at > BASELINE_REFRESH_SECONDS
+            ):
+                self.load_baseline(db)
+
+            current_state = get_cached_state(db).current_state
+            if current_state != self._state:
+                if self._state is not None:
+                    self.reset()
+                self._state = current_state
+            if current_state == STATE_DEGRADED:
+                return
+
+            decision = self.check(current_state)
+            if decision is None:
+                return
+            new_state, signals, reason = decision
+
+            with escalation_lock():
+                # Another worker may have escalated since the cached read
+                stored_state = get_current_state(db).current_state
+                if SEVERITY.get(stored_state, 0) >= SEVERITY[new_state]:
+                    return
+
+                set_system_state(new_state, reason, db)
+                db.add(Incident(
+                    incident_id=str(uuid.uuid4()),
+                    severity=new_state,
+                    trigger_signals=signals,
+                    decision_reason=reason,
+                    fallback_activated=(new_state == STATE_DEGRADED),
+                    resolved=False,
+                    baseline_version=self.baseline[2],
+                ))
+                db.commit()
+            self._state = new_state
+            self.raised += 1
+
+            # Escalating further needs a fresh run of breaching checks
+            self._breach_runs = self._critical_runs = 0
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(self.check_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("stream_detector_failed", extra={"extra_data": {"error": str(e)}})
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stream-detector", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "ewma_confidence": self.ewma_confidence,
+            "ewma_low_confidence_rate": self.ewma_low_rate,
+            "baseline_loaded": self.baseline is not None,
+            "breach_runs": self._breach_runs,
+            "critical_runs": self._critical_runs,
+            "raised": self.raised,
+            "resets": self.resets,
+        }
+
+
+_detector = None
+
+
+def get_detector():
+    """Process-wide detector, or None when STREAM_DETECTOR_ENABLED is false."""
+    global _detector
+    if _detector is None and STREAM_DETECTOR_ENABLED:
+        _detector = StreamingDetector()
+    return _detector
\ No newline at end of file
@@ -1,22 +1,191 @@
-import logging
+"""
+Structured JSON logging off the request path.
+
+Loggers only put records on a bounded in-memory queue. A single
+QueueListener thread per process formats them and writes LOG_PATH,
+rotating it by size and by age. Sampled events are dropped before they
+are enqueued, and a full queue drops records instead of blocking.
+
+Rotation renames the file, which is only safe with one writing process,
+so every process (each uvicorn worker, the monitoring jobs) writes its
+own file: "{pid}" in LOG_PATH is replaced with the process id. LOG_PATH
+"-" writes to stderr instead and leaves collection and rotation to the
+process manager.
+"""
+
+import atexit
+import itertools
 import json
-from datetime import datetime
+import logging
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
-LOG_PATH = Path("logs/app.log")
-LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+from app.core.config import (
+    LOG_PATH as _LOG_PATH,
+    LOG_MAX_BYTES,
+    LOG_ROTATE_INTERVAL_HOURS,
+    LOG_BACKUP_COUNT,
+    LOG_QUEUE_MAX_SIZE,
+    LOG_SAMPLE_RATES,
+    LOG_JSON_ENCODER,
+)
+
+
+def log_path():
+    """This process's log file, or None for stderr."""
+    if _LOG_PATH == "-":
+        return None
+    return Path(_LOG_PATH.replace("{pid}", str(os.getpid())))
+
+
+def _json_encoder():
+    if LOG_JSON_ENCODER == "orjson":
+        try:
+            import orjson
+
+            return lambda obj: orjson.dumps(
+                obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY
+            ).decode()
+        except ImportError:
+            pass
+    return lambda obj: json.dumps(obj, default=str)
+
 
 class JsonFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__()
+        self._dumps = _json_encoder()
+
     def format(self, record):
         log_record = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # Event time, not the time the listener got to it
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(),
             "level": record.levelname,
             "module": record.module,
             "message": record.getMessage(),
         }
         if hasattr(record, "extra_data"):
             log_record.update(record.extra_data)
-        return json.dumps(log_record)
+        return self._dumps(log_record)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every interval_seconds."""
+
+    def __init__(self, filename, max_bytes: int, interval_seconds: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count)
+        self.interval_seconds = interval_seconds
+        self._next_rollover = self._compute_next()
+
+    def _compute_next(self):
+        if self.interval_seconds <= 0:
+            return None
+        return time.time() + self.interval_seconds
+
+    def shouldRollover(self, record):
+        if self._next_rollover is not None and time.time() >= self._next_rollover:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._next_rollover = self._compute_next()
+
+
+def parse_sample_rates(spec: str) -> dict:
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        rates[event.strip()] = max(1, int(rate))
+    return rates
+
+
+# Events that are written whatever LOG_SAMPLE_RATES says
+ALWAYS_LOGGED = {"state_changed"}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N records per message; never drops WARNING and above."""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = {k: v for k, v in rates.items() if k not in ALWAYS_LOGGED}
+        self._counters = {event: itertools.count() for event in self.rates}
+
+    def filter(self, record):
+        rate = self.rates.get(record.msg)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return next(self._counters[record.msg]) % rate == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # The stock prepare() formats here, on the caller's thread
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+
+
+_queue_handler = None
+_listener = None
+
+
+def _get_queue_handler() -> QueueHandler:
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+
+        path = log_path()
+        if path is None:
+            handler = logging.StreamHandler(sys.stderr)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = SizeAndTimeRotatingFileHandler(
+                path,
+                max_bytes=LOG_MAX_BYTES,
+                interval_seconds=LOG_ROTATE_INTERVAL_HOURS * 3600,
+                backup_count=LOG_BACKUP_COUNT,
+            )
+        handler.setFormatter(JsonFormatter())
+
+        _listener = QueueListener(log_queue, handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        _queue_handler = DeferredQueueHandler(log_queue)
+        rates = parse_sample_rates(LOG_SAMPLE_RATES)
+        if rates:
+            _queue_handler.addFilter(SamplingFilter(rates))
+    return _queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records to disk (runs at interpreter exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -24,9 +193,6 @@ def get_logger(name: str) -> logging.Logger:
     logger.setLevel(logging.INFO)
 
     if not logger.handlers:
-        file_handler = logging.FileHandler(LOG_PATH)
-        formatter = JsonFormatter()
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        logger.addHandler(_get_queue_handler())
 
     return logger
\ No newline at end of file
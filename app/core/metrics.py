@@ -0,0 +1,190 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+Each request stage feeds a log-bucket histogram (four buckets per decade,
+1 us to ~30 s): one perf_counter_ns() call and one bisect per stage.
+Counts are plain ints updated without a lock, so concurrent threads can
+occasionally lose an increment. With METRICS_ENABLED=false the timers are
+no-ops and /metrics is not mounted. Values are per worker process.
+"""
+
+import json
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from app.core.config import (
+    METRICS_ENABLED,
+    DAEMON_STATS_PATH,
+    STATE_NORMAL,
+    STATE_WARNING,
+    STATE_DEGRADED,
+)
+
+PREFIX = "sfd"
+
+# Upper bounds in nanoseconds: 1 us * 10^(i/4)
+BUCKET_BOUNDS_NS = [int(1000 * 10 ** (i / 4)) for i in range(31)]
+
+
+class LogHistogram:
+    __slots__ = ("counts", "total_ns", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)  # last slot: +Inf
+        self.total_ns = 0
+        self.count = 0
+
+    def observe(self, elapsed_ns: int):
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)] += 1
+        self.total_ns += elapsed_ns
+        self.count += 1
+
+
+# (route, stage) -> LogHistogram
+STAGE_HISTOGRAMS = defaultdict(LogHistogram)
+# (name, labels tuple) -> int
+COUNTERS = defaultdict(int)
+
+
+class StageClock:
+    """Times consecutive stages of one request: clock.lap("validate") ..."""
+
+    __slots__ = ("route", "start", "last")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.start = self.last = time.perf_counter_ns()
+
+    def lap(self, stage: str):
+        now = time.perf_counter_ns()
+        STAGE_HISTOGRAMS[(self.route, stage)].observe(now - self.last)
+        self.last = now
+
+    def finish(self):
+        now = time.perf_counter_ns()
+        STAGE_HISTOGRAMS[(self.route, "total")].observe(now - self.start)
+        self.last = now
+
+
+class _NullClock:
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_CLOCK = _NullClock()
+
+
+def stage_clock(route: str):
+    if not METRICS_ENABLED:
+        return _NULL_CLOCK
+    return StageClock(route)
+
+
+def count(name: str, n: int = 1, **labels):
+    if METRICS_ENABLED:
+        COUNTERS[(name, tuple(sorted(labels.items())))] += n
+
+
+# ---- Prometheus text exposition ----
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _render_histograms(lines: list):
+    name = f"{PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {name} Request stage latency.")
+    lines.append(f"# TYPE {name} histogram")
+    for (route, stage), hist in sorted(STAGE_HISTOGRAMS.items()):
+        base = [("route", route), ("stage", stage)]
+        cumulative = 0
+        for bound, c in zip(BUCKET_BOUNDS_NS, hist.counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_labels(base + [('le', f'{bound / 1e9:.6g}')])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(base + [('le', '+Inf')])} {hist.count}")
+        lines.append(f"{name}_sum{_labels(base)} {hist.total_ns / 1e9:.9f}")
+        lines.append(f"{name}_count{_labels(base)} {hist.count}")
+
+
+def _render_counters(lines: list):
+    by_name = defaultdict(list)
+    for (name, labels), value in COUNTERS.items():
+        by_name[name].append((labels, value))
+    for name in sorted(by_name):
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(by_name[name]):
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+
+def _gauge(lines: list, name: str, value, labels=()):
+    metric = f"{PREFIX}_{name}"
+    lines.append(f"# TYPE {metric} gauge")
+    lines.append(f"{metric}{_labels(labels)} {value}")
+
+
+def _render_daemon_stats(lines: list, stats_path: str = DAEMON_STATS_PATH):
+    """Monitoring stage durations published by monitoring.daemon."""
+    try:
+        with open(stats_path) as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    _gauge(lines, "monitoring_last_cycle_seconds", stats["last_cycle_ms"] / 1000)
+    _gauge(lines, "monitoring_stats_age_seconds", round(time.time() - stats["updated_at"], 3))
+
+    for field in ("runs", "failures"):
+        metric = f"{PREFIX}_monitoring_stage_{field}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for stage, s in sorted(stats["stages"].items()):
+            lines.append(f"{metric}{_labels([('stage', stage)])} {s[field]}")
+    for field in ("last_ms", "max_ms", "total_ms"):
+        metric = f"{PREFIX}_monitoring_stage_{field[:-3]}_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        for stage, s in sorted(stats["stages"].items()):
+            lines.append(f"{metric}{_labels([('stage', stage)])} {s[field] / 1000:.6f}")
+
+
+def render(state: str = None, writer_stats: dict = None, cache_stats: dict = None, extra_gauges=()) -> str:
+    """Full exposition; extra_gauges is a sequence of (name, value, labels)."""
+    lines = []
+    _render_histograms(lines)
+    _render_counters(lines)
+
+    if state is not None:
+        metric = f"{PREFIX}_system_state"
+        lines.append(f"# HELP {metric} 1 for the current system state.")
+        lines.append(f"# TYPE {metric} gauge")
+        for s in (STATE_NORMAL, STATE_WARNING, STATE_DEGRADED):
+            lines.append(f"{metric}{_labels([('state', s)])} {int(s == state)}")
+
+    if writer_stats is not None:
+        _gauge(lines, "log_write_queue_depth", writer_stats["queue_depth"])
+        _gauge(lines, "log_write_queue_capacity", writer_stats["queue_capacity"])
+        for field in ("flushed", "dropped", "spilled", "failed"):
+            metric = f"{PREFIX}_log_write_rows_{field}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {writer_stats[field]}")
+
+    if cache_stats is not None:
+        _gauge(lines, "prediction_cache_entries", cache_stats["size"])
+        _gauge(lines, "prediction_cache_capacity", cache_stats["capacity"])
+        for field in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            metric = f"{PREFIX}_prediction_cache_{field}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {cache_stats[field]}")
+
+    for name, value, labels in extra_gauges:
+        _gauge(lines, name, value, labels)
+
+    _render_daemon_stats(lines)
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,18 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.config import STATE_NORMAL
+from app.core.config import STATE_NORMAL, STATE_CACHE_TTL_SECONDS, STATE_SIGNAL_PATH
 from app.storage.schemas import SystemState
 from app.storage.db import get_db_session
+from app.core.logging import get_logger
+
+logger = get_logger("state")
 
 
 def get_current_state(db: Session = None) -> SystemState:
@@ -46,7 +55,103 @@ def set_system_state(new_state: str, reason: str, db: Session = None):
     db.add(state)
     db.commit()
 
+    invalidate_state_cache()
+    _publish_state_change(new_state)
+
+    # In logging.ALWAYS_LOGGED, so sampling never drops it
+    logger.info(
+        "state_changed",
+        extra={"extra_data": {"state": new_state, "reason": reason}}
+    )
+
     if close_after:
         db.close()
 
-    return state
\ No newline at end of file
+    return state
+
+
+# ---------------------------------------------------------
+# In-process state cache
+#
+# The state changes at most once per monitoring run, so the request path
+# reads a cached snapshot. Writers in any process replace the signal file
+# on every change; readers compare its stat() result (no DB round-trip)
+# and re-query only when it moved or the TTL expired.
+# ---------------------------------------------------------
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    current_state: str
+    reason: str
+    last_updated: datetime
+
+
+_cache_lock = threading.Lock()
+_cached = None  # (snapshot, signal token, monotonic load time)
+
+
+def _signal_token():
+    try:
+        st = os.stat(STATE_SIGNAL_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def _publish_state_change(new_state: str):
+    """Atomically replace the signal file so every worker sees a new token."""
+    path = Path(STATE_SIGNAL_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(f"{new_state}\n{time.time_ns()}\n")
+    os.replace(tmp, path)
+
+
+def invalidate_state_cache():
+    global _cached
+    with _cache_lock:
+        _cached = None
+
+
+def get_cached_state(db: Session = None) -> StateSnapshot:
+    """Return the current state, hitting the DB only after a change or TTL expiry."""
+    token = _signal_token()
+    snapshot = _fresh_snapshot(token)
+    if snapshot is None:
+        snapshot = _store_snapshot(get_current_state(db), token)
+    return snapshot
+
+
+async def get_cached_state_async(db: AsyncSession) -> StateSnapshot:
+    """get_cached_state for the async request path."""
+    token = _signal_token()
+    snapshot = _fresh_snapshot(token)
+    if snapshot is None:
+        snapshot = _store_snapshot(await db.run_sync(get_current_state), token)
+    return snapshot
+
+
+def _fresh_snapshot(token):
+    cached = _cached
+    if (
+        cached is not None
+        and cached[1] == token
+        and time.monotonic() - cached[2] < STATE_CACHE_TTL_SECONDS
+    ):
+        return cached[0]
+    return None
+
+
+def _store_snapshot(state: SystemState, token) -> StateSnapshot:
+    global _cached
+
+    snapshot = StateSnapshot(
+        current_state=state.current_state,
+        reason=state.reason,
+        last_updated=state.last_updated,
+    )
+
+    with _cache_lock:
+        _cached = (snapshot, token, time.monotonic())
+
+    return snapshot
@@ -1,17 +1,116 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import API_MODE, METRICS_ENABLED, ADMIN_API_ENABLED, SCHEMA_UPGRADE_ON_STARTUP
+from app.core import metrics
+from app.core.logging import DeferredQueueHandler
+from app.core.state import get_cached_state
+from app.core.detector import get_detector
+from app.api.admin import router as admin_router
+from app.ml.registry import get_model_registry
+from app.ml.prediction_cache import get_prediction_cache
+from app.storage.migrations import upgrade_schema
+from app.storage.log_writer import get_log_writer
+from app.storage.rollups import get_sketch_buffer
+
+if API_MODE == "async":
+    from app.api.predict_async import router as predict_router
+    from app.ml.executor import shutdown_inference_executor
+    from app.storage.async_db import dispose_async_engine
+else:
+    from app.api.predict import router as predict_router
+
+# Create tables and indexes on startup; workers take turns (see migrations)
+if SCHEMA_UPGRADE_ON_STARTUP:
+    upgrade_schema()
 
-from app.api.predict import router as predict_router
-from app.storage.db import engine
-from app.storage.schemas import Base
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the active model before the first request
+    registry = get_model_registry()
+    registry.start()
+    writer = get_log_writer()
+    if writer is not None:
+        writer.start()
+    sketch_buffer = get_sketch_buffer()
+    if sketch_buffer is not None:
+        sketch_buffer.start()
+    detector = get_detector()
+    if detector is not None:
+        detector.start()
+    yield
+    if detector is not None:
+        detector.stop()
+    if writer is not None:
+        # Drain queued prediction logs before the worker exits
+        writer.stop()
+    if sketch_buffer is not None:
+        sketch_buffer.stop()
+    registry.stop()
+    if API_MODE == "async":
+        shutdown_inference_executor()
+        await dispose_async_engine()
 
-app = FastAPI(title="Silent Failure Detection System")
+
+app = FastAPI(title="Silent Failure Detection System", lifespan=lifespan)
 
 app.include_router(predict_router)
+if ADMIN_API_ENABLED:
+    app.include_router(admin_router)
 
 
 @app.get("/")
 def health():
-    return {"status": "ok", "service": "silent-failure-detection-system"}
\ No newline at end of file
+    return {"status": "ok", "service": "silent-failure-detection-system", "api_mode": API_MODE}
+
+
+@app.get("/stats/log-writer")
+def log_writer_stats():
+    writer = get_log_writer()
+    if writer is None:
+        return {"mode": "sync"}
+    return {"mode": "write_behind", **writer.stats()}
+
+
+@app.get("/stats/detector")
+def detector_stats():
+    detector = get_detector()
+    if detector is None:
+        return {"enabled": False}
+    return {"enabled": True, **detector.stats()}
+
+
+@app.get("/stats/prediction-cache")
+def prediction_cache_stats():
+    cache = get_prediction_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        writer = get_log_writer()
+        cache = get_prediction_cache()
+        registry = get_model_registry().status()
+        detector = get_detector()
+        gauges = [
+            ("model_info", 1, [("version", registry["active"]), ("fast_path", str(registry["fast_path"]).lower())]),
+            ("app_log_records_dropped", DeferredQueueHandler.dropped, []),
+        ]
+        if detector is not None and detector.ewma_confidence is not None:
+            gauges += [
+                ("stream_ewma_confidence", detector.ewma_confidence, []),
+                ("stream_ewma_low_confidence_rate", detector.ewma_low_rate, []),
+            ]
+        body = metrics.render(
+            state=get_cached_state().current_state,
+            writer_stats=writer.stats() if writer is not None else None,
+            cache_stats=cache.stats() if cache is not None else None,
+            extra_gauges=gauges,
+        )
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Dedicated thread pool for model scoring on the async request path.
+
+Scoring runs here instead of on the event loop (or in Starlette's shared
+threadpool). NumPy and sklearn hold the GIL for most of a small call, so
+more threads than cores only add contention; INFERENCE_WORKERS=0 sizes
+the pool to min(4, CPU count).
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import INFERENCE_WORKERS
+
+_executor = None
+
+
+def inference_workers() -> int:
+    if INFERENCE_WORKERS > 0:
+        return INFERENCE_WORKERS
+    return min(4, os.cpu_count() or 1)
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=inference_workers(), thread_name_prefix="inference"
+        )
+    return _executor
+
+
+async def run_inference(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), fn, *args)
+
+
+def shutdown_inference_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
\ No newline at end of file
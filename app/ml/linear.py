@@ -0,0 +1,109 @@
+"""
+Compiled fast path for linear models.
+
+A fitted LogisticRegression is reduced at load time to its coef_ /
+intercept_ arrays. Single rows are scored in pure Python (a dot product
+and a sigmoid), batches with one NumPy matmul, skipping sklearn's
+per-call validation and dispatch. The compiled scorer is only used after
+it reproduces sklearn's predict / predict_proba on a seeded corpus;
+anything else keeps the sklearn path.
+"""
+
+import math
+
+import numpy as np
+
+from app.ml.validation import REQUIRED_FEATURES, FEATURE_RANGES, synthetic_matrix
+
+VERIFY_ROWS = 2000
+VERIFY_TOLERANCE = 1e-9
+
+
+class LinearScorer:
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray):
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = np.asarray(intercept, dtype=float)
+        self.classes = list(classes.tolist())
+        self.binary = len(self.classes) == 2
+
+        if self.binary:
+            self._weights = self.coef[0].tolist()
+            self._bias = float(self.intercept[0])
+
+    def score_one(self, features: list):
+        """(label, confidence) for one row."""
+        if not self.binary:
+            labels, confidences = self.score_batch(np.array([features], dtype=float))
+            return labels[0], confidences[0]
+
+        z = self._bias
+        for w, x in zip(self._weights, features):
+            z += w * x
+        # max(sigmoid(z), 1 - sigmoid(z)) without overflow for large |z|
+        confidence = 1.0 / (1.0 + math.exp(-abs(z)))
+        # sklearn's binary predict is decision_function > 0
+        if z > 0:
+            return self.classes[1], confidence
+        return self.classes[0], confidence
+
+    def score_batch(self, matrix: np.ndarray):
+        """(labels, confidences) lists for a feature matrix."""
+        decision = matrix @ self.coef.T + self.intercept
+
+        if self.binary:
+            z = decision[:, 0]
+            confidences = 1.0 / (1.0 + np.exp(-np.abs(z)))
+            labels = np.where(z > 0, self.classes[1], self.classes[0])
+        else:
+            shifted = decision - decision.max(axis=1, keepdims=True)
+            proba = np.exp(shifted)
+            proba /= proba.sum(axis=1, keepdims=True)
+            confidences = proba.max(axis=1)
+            labels = np.asarray(self.classes)[proba.argmax(axis=1)]
+
+        return labels.tolist(), confidences.tolist()
+
+
+def _verification_corpus(rows: int = VERIFY_ROWS) -> np.ndarray:
+    corpus = synthetic_matrix(rows)
+    # Include the range corners as well
+    corners = np.array([
+        [FEATURE_RANGES[f][i] for f in REQUIRED_FEATURES] for i in (0, 1)
+    ], dtype=float)
+    return np.vstack([corpus, corners])
+
+
+def verify(scorer: LinearScorer, model) -> bool:
+    """Check the scorer against sklearn on a seeded corpus, row-wise and batched."""
+    corpus = _verification_corpus()
+
+    expected_labels = model.predict(corpus).tolist()
+    expected_conf = model.predict_proba(corpus).max(axis=1)
+
+    labels, confidences = scorer.score_batch(corpus)
+    if labels != expected_labels:
+        return False
+    if not np.allclose(confidences, expected_conf, rtol=0, atol=VERIFY_TOLERANCE):
+        return False
+
+    for row, label, conf in zip(corpus.tolist(), expected_labels, expected_conf.tolist()):
+        got_label, got_conf = scorer.score_one(row)
+        if got_label != label or abs(got_conf - conf) > VERIFY_TOLERANCE:
+            return False
+
+    return True
+
+
+def compile_model(model):
+    """Return a verified LinearScorer for a LogisticRegression, otherwise None."""
+    from sklearn.linear_model import LogisticRegression
+
+    if type(model) is not LogisticRegression:
+        return None
+    if model.coef_.shape[1] != len(REQUIRED_FEATURES):
+        return None
+
+    scorer = LinearScorer(model.coef_, model.intercept_, model.classes_)
+    if not verify(scorer, model):
+        return None
+    return scorer
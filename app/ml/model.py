@@ -1,31 +1,66 @@
-import pickle
-from pathlib import Path
+import numpy as np
 
-from app.core.config import MODEL_VERSION
+from app.ml.registry import get_model_registry
+from app.ml.prediction_cache import get_prediction_cache
+from app.ml.executor import run_inference
 
-MODEL_PATH = Path("data/model.pkl")
 
-_model = None
+def load_model():
+    return get_model_registry().current().model
 
 
-def load_model():
-    global _model
-    if _model is None:
-        with open(MODEL_PATH, "rb") as f:
-            _model = pickle.load(f)
-    return _model
+def cached_predict(features: list):
+    """
+    Registry read and prediction-cache lookup shared by the sync and async
+    /predict. Returns (loaded model, cached (prediction, confidence) or None).
+    """
+    # One registry read per call: a concurrent swap never mixes versions
+    loaded = get_model_registry().current()
+    cache = get_prediction_cache()
+    cached = cache.get(loaded.version, features) if cache is not None else None
+    return loaded, cached
+
+
+def cache_prediction(loaded, features: list, prediction, confidence):
+    cache = get_prediction_cache()
+    if cache is not None:
+        cache.put(loaded.version, features, prediction, confidence)
 
 
 def predict(features: list):
-    model = load_model()
+    """
+    Score one validated row through the prediction cache.
+    Returns (prediction, confidence, model_version, cache_hit).
+    """
+    loaded, cached = cached_predict(features)
+    if cached is not None:
+        return cached[0], cached[1], loaded.version, True
 
-    raw_pred = model.predict([features])[0]
-    prediction = int(raw_pred)   # convert numpy → python
+    prediction, confidence = loaded.predict(features)
+    cache_prediction(loaded, features, prediction, confidence)
+    return prediction, confidence, loaded.version, False
 
-    if hasattr(model, "predict_proba"):
-        raw_conf = max(model.predict_proba([features])[0])
-        confidence = float(raw_conf)   # convert numpy → python
+
+async def predict_async(features: list):
+    """predict() for the async path: uncompiled models score on the inference executor."""
+    loaded, cached = cached_predict(features)
+    if cached is not None:
+        return cached[0], cached[1], loaded.version, True
+
+    if loaded.scorer is not None:
+        # A compiled single row costs less than the hop to the executor
+        prediction, confidence = loaded.predict(features)
     else:
-        confidence = 1.0
+        prediction, confidence = await run_inference(loaded.predict, features)
+    cache_prediction(loaded, features, prediction, confidence)
+    return prediction, confidence, loaded.version, False
+
 
-    return prediction, confidence, MODEL_VERSION
\ No newline at end of file
+def predict_batch(matrix: np.ndarray):
+    """
+    Score a validated feature matrix with a single model call.
+    Returns (predictions, confidences, model_version) as python lists.
+    """
+    loaded = get_model_registry().current()
+    predictions, confidences = loaded.predict_batch(matrix)
+    return predictions, confidences, loaded.version
\ No newline at end of file
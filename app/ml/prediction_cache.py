@@ -0,0 +1,115 @@
+"""
+In-process LRU cache of single-row model results.
+
+Much of the traffic repeats identical payloads (client retries, fixed
+probes), so (prediction, confidence) is cached under the model version and
+the validated feature tuple, optionally rounded to PREDICTION_CACHE_QUANTUM.
+Entries expire after PREDICTION_CACHE_TTL_SECONDS and the least recently
+used ones are evicted beyond PREDICTION_CACHE_SIZE. The first lookup under
+a new model version drops every entry, so a hot swap never serves results
+of the previous model. Cache hits are still logged and observed by the
+streaming detector; each worker process has its own cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import (
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL_SECONDS,
+    PREDICTION_CACHE_QUANTUM,
+)
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        capacity: int = PREDICTION_CACHE_SIZE,
+        ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS,
+        quantum: float = PREDICTION_CACHE_QUANTUM,
+    ):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self._entries = OrderedDict()  # feature key -> (prediction, confidence, expires_at), most recent last
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _key(self, features) -> tuple:
+        if self.quantum > 0:
+            return tuple(round(round(v / self.quantum) * self.quantum, 9) for v in features)
+        return tuple(features)
+
+    def _check_version(self, version: str):
+        """Drop every entry once a new model version serves (caller holds the lock)."""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, version: str, features):
+        """(prediction, confidence) cached for features under version, or None."""
+        key = self._key(features)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds > 0 and entry[2] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, version: str, features, prediction, confidence):
+        key = self._key(features)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (prediction, confidence, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self._version,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl_seconds,
+            "quantum": self.quantum,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = None
+
+
+def get_prediction_cache():
+    """Process-wide cache, or None when PREDICTION_CACHE_SIZE is 0."""
+    global _cache
+    if _cache is None and PREDICTION_CACHE_SIZE > 0:
+        _cache = PredictionCache()
+    return _cache
\ No newline at end of file
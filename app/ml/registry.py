@@ -0,0 +1,319 @@
+"""
+Versioned model registry with background hot swap.
+
+    data/models/manifest.json        {"active": "v1.1", "versions": {"v1.1": {...}}}
+    data/models/v1.1/model.joblib    uncompressed joblib artifact
+
+Artifacts are loaded with mmap_mode="r": the estimator's NumPy arrays are
+mapped from the page cache, so every worker process shares one copy. A new
+version is loaded, compiled and warmed up with synthetic rows off the
+request path, then published with a single reference assignment; requests
+already scoring finish on the version they started with. Without a
+manifest the legacy data/model.pkl is served as MODEL_VERSION.
+
+Swaps are serialized behind the registry lock and a swap to the version
+that is already active is a no-op, so an activation and the manifest
+watcher reacting to it never load the same version twice.
+"""
+
+import json
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from app.core.config import (
+    MODEL_VERSION,
+    MODEL_FAST_PATH,
+    MODEL_REGISTRY_DIR,
+    MODEL_WATCH_INTERVAL_SECONDS,
+    MODEL_WARMUP_ROWS,
+)
+from app.core.logging import get_logger
+from app.ml.linear import compile_model
+from app.ml.validation import synthetic_matrix
+
+LEGACY_MODEL_PATH = Path("data/model.pkl")
+MANIFEST_NAME = "manifest.json"
+ARTIFACT_NAME = "model.joblib"
+
+logger = get_logger("model_registry")
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str
+    model: object
+    scorer: object = None  # LinearScorer, or None for the sklearn path
+
+    def predict(self, features: list):
+        if self.scorer is not None:
+            label, confidence = self.scorer.score_one(features)
+            return int(label), float(confidence)
+
+        model = self.model
+        prediction = int(model.predict([features])[0])   # convert numpy → python
+
+        if hasattr(model, "predict_proba"):
+            confidence = float(max(model.predict_proba([features])[0]))
+        else:
+            confidence = 1.0
+
+        return prediction, confidence
+
+    def predict_batch(self, matrix: np.ndarray):
+        if len(matrix) == 0:
+            return [], []
+
+        if self.scorer is not None:
+            labels, confidences = self.scorer.score_batch(matrix)
+            return [int(label) for label in labels], confidences
+
+        model = self.model
+        if hasattr(model, "predict_proba"):
+            proba = model.predict_proba(matrix)
+            labels = model.classes_[np.argmax(proba, axis=1)]
+            confidences = proba.max(axis=1).tolist()
+        else:
+            labels = model.predict(matrix)
+            confidences = [1.0] * len(matrix)
+
+        return [int(label) for label in labels], confidences
+
+
+# ---- Manifest ----
+
+def _manifest_path(registry_dir) -> Path:
+    return Path(registry_dir) / MANIFEST_NAME
+
+
+def read_manifest(registry_dir=MODEL_REGISTRY_DIR) -> dict:
+    path = _manifest_path(registry_dir)
+    if not path.exists():
+        return {"active": None, "versions": {}}
+    return json.loads(path.read_text())
+
+
+def write_manifest(manifest: dict, registry_dir=MODEL_REGISTRY_DIR):
+    """Atomic replace, so watchers never read a half-written manifest."""
+    path = _manifest_path(registry_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+
+
+def register_model(model, version: str, registry_dir=MODEL_REGISTRY_DIR, activate: bool = False) -> Path:
+    manifest = read_manifest(registry_dir)
+    if version in manifest["versions"]:
+        raise ValueError(f"Model version already registered: {version}")
+
+    artifact = Path(registry_dir) / version / ARTIFACT_NAME
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    # No compression: compressed artifacts cannot be memory-mapped
+    joblib.dump(model, artifact)
+
+    manifest["versions"][version] = {
+        "artifact": f"{version}/{ARTIFACT_NAME}",
+        "estimator": type(model).__name__,
+        "registered_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if activate:
+        manifest["active"] = version
+    write_manifest(manifest, registry_dir)
+    return artifact
+
+
+def activate_version(version: str, registry_dir=MODEL_REGISTRY_DIR):
+    manifest = read_manifest(registry_dir)
+    if version not in manifest["versions"]:
+        raise ValueError(f"Unknown model version: {version}")
+    manifest["active"] = version
+    write_manifest(manifest, registry_dir)
+
+
+# ---- Loading ----
+
+def warm_up(loaded: LoadedModel, rows: int = MODEL_WARMUP_ROWS):
+    """Touch both scoring paths so the first real request pays no first-call costs."""
+    if rows <= 0:
+        return
+    matrix = synthetic_matrix(rows, seed=1)
+    loaded.predict_batch(matrix)
+    for features in matrix[:min(rows, 32)].tolist():
+        loaded.predict(features)
+
+
+def _prepare(model, version: str) -> LoadedModel:
+    scorer = compile_model(model) if MODEL_FAST_PATH else None
+    loaded = LoadedModel(version=version, model=model, scorer=scorer)
+    warm_up(loaded)
+    return loaded
+
+
+def load_version(version: str, registry_dir=MODEL_REGISTRY_DIR) -> LoadedModel:
+    entry = read_manifest(registry_dir)["versions"].get(version)
+    if entry is None:
+        raise ValueError(f"Unknown model version: {version}")
+    model = joblib.load(Path(registry_dir) / entry["artifact"], mmap_mode="r")
+    return _prepare(model, version)
+
+
+def load_legacy(path: Path = LEGACY_MODEL_PATH, version: str = MODEL_VERSION) -> LoadedModel:
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    return _prepare(model, version)
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        registry_dir=MODEL_REGISTRY_DIR,
+        watch_interval: float = MODEL_WATCH_INTERVAL_SECONDS,
+    ):
+        self.registry_dir = Path(registry_dir)
+        self.watch_interval = watch_interval
+        self._active = None
+        # Serializes loads; request threads only read self._active
+        self._lock = threading.Lock()
+        self._loading = None
+        self._last_error = None
+        self._manifest_mtime = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def current(self) -> LoadedModel:
+        loaded = self._active
+        if loaded is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self._load_active()
+                loaded = self._active
+        return loaded
+
+    def _load_active(self) -> LoadedModel:
+        active = read_manifest(self.registry_dir)["active"]
+        if active:
+            return load_version(active, self.registry_dir)
+        return load_legacy()
+
+    def swap(self, version: str) -> LoadedModel:
+        """Load, compile and warm version, then publish it. Blocks the caller."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._active is not None and self._active.version == version:
+                return self._active  # another swap got there first
+            self._loading = version
+            try:
+                loaded = load_version(version, self.registry_dir)
+            except Exception as e:
+                self._last_error = f"{version}: {e}"
+                logger.error("model_swap_failed", extra={"extra_data": {"version": version, "error": str(e)}})
+                raise
+            finally:
+                self._loading = None
+
+            previous = self._active
+            self._active = loaded
+            self._last_error = None
+
+        logger.info(
+            "model_swapped",
+            extra={"extra_data": {
+                "from": previous.version if previous else None,
+                "to": version,
+                "fast_path": loaded.scorer is not None,
+                "load_ms": (time.perf_counter() - start) * 1000,
+            }}
+        )
+        return loaded
+
+    def _swap_quietly(self, version: str):
+        try:
+            self.swap(version)
+        except Exception:
+            pass  # kept in last_error; the previous version keeps serving
+
+    def swap_in_background(self, version: str) -> threading.Thread:
+        thread = threading.Thread(
+            target=self._swap_quietly, args=(version,), name=f"model-swap-{version}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def activate(self, version: str) -> threading.Thread:
+        """Mark version active in the manifest and swap it in off the request path."""
+        with self._lock:
+            activate_version(version, self.registry_dir)
+            # Our own manifest write; the swap below covers it, not the watcher
+            self._manifest_mtime = _manifest_path(self.registry_dir).stat().st_mtime_ns
+        return self.swap_in_background(version)
+
+    def check_manifest(self):
+        """Follow the manifest's active version when another process changed it."""
+        try:
+            mtime = _manifest_path(self.registry_dir).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        self._manifest_mtime = mtime
+
+        active = read_manifest(self.registry_dir)["active"]
+        current = self._active
+        if not active or active == self._loading:
+            return
+        if current is None or current.version != active:
+            self._swap_quietly(active)
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.check_manifest()
+            except Exception as e:
+                logger.error("model_watch_failed", extra={"extra_data": {"error": str(e)}})
+
+    def start(self):
+        """Load the active version before serving and start the manifest watcher."""
+        try:
+            self._manifest_mtime = _manifest_path(self.registry_dir).stat().st_mtime_ns
+        except FileNotFoundError:
+            self._manifest_mtime = None
+        self.current()
+
+        if self.watch_interval > 0 and self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def status(self) -> dict:
+        current = self._active
+        return {
+            "active": current.version if current else None,
+            "fast_path": current is not None and current.scorer is not None,
+            "loading": self._loading,
+            "last_error": self._last_error,
+            "manifest": read_manifest(self.registry_dir),
+        }
+
+
+_registry = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,190 @@
+"""
+Constant-memory, mergeable distribution sketches.
+
+Each feature (and confidence) is summarized as a fixed-bin histogram over
+its known valid range, plus underflow / overflow / null counters. Memory
+and serialized size depend only on the bin count, never on how many
+predictions were folded in, and two sketches over the same range merge
+by adding counts.
+"""
+
+import numpy as np
+
+from app.ml.validation import FEATURE_RANGES
+
+CONFIDENCE_RANGE = (0.0, 1.0)
+
+
+class FixedHistogram:
+    def __init__(self, lo: float, hi: float, bins: int, counts=None,
+                 underflow: int = 0, overflow: int = 0, nulls: int = 0):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.bins = int(bins)
+        if counts is None:
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+        else:
+            # Float counts come from exponentially decayed baselines
+            counts = np.asarray(counts)
+            self.counts = counts.astype(np.float64 if counts.dtype.kind == "f" else np.int64)
+        self.underflow = underflow
+        self.overflow = overflow
+        self.nulls = nulls
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    @property
+    def total(self):
+        total = self.counts.sum() + self.underflow + self.overflow
+        return float(total) if self.counts.dtype.kind == "f" else int(total)
+
+    def bin_codes(self, values: np.ndarray) -> np.ndarray:
+        """
+        Column of each value in the [underflow, bins..., overflow] layout
+        (0 .. bins + 1); -1 for NaN.
+        """
+        values = np.asarray(values, dtype=float)
+        codes = np.full(values.shape, -1, dtype=np.int64)
+        present = ~np.isnan(values)
+        v = values[present]
+
+        idx = np.clip((v - self.lo) / (self.hi - self.lo) * self.bins, 0, self.bins - 1)
+        inner = idx.astype(np.int64) + 1
+        inner[v < self.lo] = 0
+        inner[v > self.hi] = self.bins + 1
+        codes[present] = inner
+        return codes
+
+    def update(self, values: np.ndarray):
+        """Fold a chunk of values (NaN = missing) into the sketch."""
+        codes = self.bin_codes(values)
+        present = codes[codes >= 0]
+        self.nulls += len(codes) - len(present)
+
+        layout = np.bincount(present, minlength=self.bins + 2)
+        self.underflow += int(layout[0])
+        self.overflow += int(layout[-1])
+        self.counts += layout[1:-1]
+
+    def grouped_rows(self, values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+        """
+        Counts of values per group as an (n_groups, bins + 3) matrix in the
+        from_row layout: [underflow, counts..., overflow, nulls].
+        """
+        codes = self.bin_codes(values)
+        codes[codes < 0] = self.bins + 2
+        width = self.bins + 3
+        return np.bincount(
+            np.asarray(groups, dtype=np.int64) * width + codes, minlength=n_groups * width
+        ).reshape(n_groups, width)
+
+    @classmethod
+    def from_row(cls, lo: float, hi: float, row) -> "FixedHistogram":
+        """Inverse of grouped_rows for one group."""
+        row = np.asarray(row)
+        return cls(
+            lo, hi, len(row) - 3,
+            counts=row[1:-2],
+            underflow=row[0].item(),
+            overflow=row[-2].item(),
+            nulls=row[-1].item(),
+        )
+
+    def merge(self, other: "FixedHistogram") -> "FixedHistogram":
+        if (self.lo, self.hi, self.bins) != (other.lo, other.hi, other.bins):
+            raise ValueError("Cannot merge histograms with different bin layouts")
+        return FixedHistogram(
+            self.lo, self.hi, self.bins,
+            counts=self.counts + other.counts,
+            underflow=self.underflow + other.underflow,
+            overflow=self.overflow + other.overflow,
+            nulls=self.nulls + other.nulls,
+        )
+
+    def decayed(self, factor: float) -> "FixedHistogram":
+        """Copy with every count scaled by factor (float counts)."""
+        return FixedHistogram(
+            self.lo, self.hi, self.bins,
+            counts=self.counts * float(factor),
+            underflow=self.underflow * factor,
+            overflow=self.overflow * factor,
+            nulls=self.nulls * factor,
+        )
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, interpolating linearly inside a bin."""
+        in_range = self.counts.sum()
+        if in_range == 0:
+            return float("nan")
+        cumulative = np.cumsum(self.counts)
+        target = q * in_range
+        i = int(np.searchsorted(cumulative, target, side="left"))
+        i = min(i, self.bins - 1)
+        before = cumulative[i - 1] if i > 0 else 0
+        fraction = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        width = (self.hi - self.lo) / self.bins
+        return self.lo + (i + fraction) * width
+
+    def to_dict(self) -> dict:
+        return {
+            "lo": self.lo,
+            "hi": self.hi,
+            "counts": self.counts.tolist(),
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+            "nulls": self.nulls,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FixedHistogram":
+        return cls(
+            data["lo"], data["hi"], len(data["counts"]),
+            counts=data["counts"],
+            underflow=data.get("underflow", 0),
+            overflow=data.get("overflow", 0),
+            nulls=data.get("nulls", 0),
+        )
+
+
+def new_sketches(bins: int) -> dict:
+    """One empty histogram for confidence and for every validated feature."""
+    sketches = {"confidence": FixedHistogram(*CONFIDENCE_RANGE, bins)}
+    for feature, (lo, hi) in FEATURE_RANGES.items():
+        sketches[feature] = FixedHistogram(lo, hi, bins)
+    return sketches
+
+
+def sketches_from_values(columns: dict, bins: int) -> dict:
+    """Build sketches from {name: sequence of values}; None / NaN count as nulls."""
+    sketches = new_sketches(bins)
+    for name, values in columns.items():
+        if name in sketches and len(values):
+            sketches[name].update(np.array(values, dtype=float))
+    return sketches
+
+
+def sketches_from_chunks(chunks, names: list, bins: int) -> dict:
+    """Build sketches from an iterable of row chunks whose columns follow `names`."""
+    sketches = new_sketches(bins)
+    for chunk in chunks:
+        values = np.array(chunk, dtype=float).reshape(-1, len(names))
+        for i, name in enumerate(names):
+            sketches[name].update(values[:, i])
+    return sketches
+
+
+def merge_sketches(a: dict, b: dict) -> dict:
+    merged = dict(a)
+    for name, sketch in b.items():
+        merged[name] = merged[name].merge(sketch) if name in merged else sketch
+    return merged
+
+
+def sketches_to_dict(sketches: dict) -> dict:
+    return {name: sketch.to_dict() for name, sketch in sketches.items()}
+
+
+def sketches_from_dict(data: dict) -> dict:
+    return {name: FixedHistogram.from_dict(d) for name, d in (data or {}).items()}
@@ -1,4 +1,6 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Tuple
+
+import numpy as np
 
 # This must match the feature order used to train model.pkl
 REQUIRED_FEATURES = ["feature_1", "feature_2", "feature_3"]
@@ -39,4 +41,36 @@ def validate_input(payload: Dict) -> List[float]:
 
         features.append(float(value))
 
-    return features
\ No newline at end of file
+    return features
+
+
+def validate_batch(payloads: List[Any]) -> Tuple[np.ndarray, List[int], Dict[int, str]]:
+    """
+    Validate a batch of payloads in one pass; non-object elements are
+    reported per row like any other invalid payload.
+    Returns (feature matrix of valid rows, their indices in the batch, errors by index).
+    """
+    rows = []
+    valid_indices = []
+    errors = {}
+
+    for i, payload in enumerate(payloads):
+        if not isinstance(payload, dict):
+            errors[i] = f"Invalid payload type: {type(payload)}"
+            continue
+        try:
+            rows.append(validate_input(payload))
+        except ValidationError as e:
+            errors[i] = str(e)
+            continue
+        valid_indices.append(i)
+
+    matrix = np.array(rows, dtype=float).reshape(len(rows), len(REQUIRED_FEATURES))
+    return matrix, valid_indices, errors
+
+
+def synthetic_matrix(rows: int, seed: int = 0) -> np.ndarray:
+    """Seeded feature rows drawn uniformly within FEATURE_RANGES."""
+    rng = np.random.default_rng(seed)
+    columns = [rng.uniform(*FEATURE_RANGES[f], rows) for f in REQUIRED_FEATURES]
+    return np.column_stack(columns)
\ No newline at end of file
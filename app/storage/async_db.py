@@ -0,0 +1,55 @@
+"""
+Async engine for the async request path (API_MODE=async).
+
+DATABASE_URL keeps its sync form for the monitoring jobs; the async engine
+swaps in the matching async driver (aiosqlite for SQLite, asyncpg for
+Postgres) and shares the sync engine's pool settings and SQLite pragmas.
+Drivers are only imported when the async path is in use.
+"""
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import DATABASE_URL
+from app.storage.db import engine_options, configure_engine
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+_engine = None
+_session_factory = None
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = create_async_engine(async_database_url(), **engine_options())
+        configure_engine(_engine.sync_engine)
+        # Rows are plain mappings; nothing is read back after commit
+        _session_factory = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+async def get_async_db():
+    """FastAPI dependency: one session per request, always closed."""
+    get_async_engine()
+    async with _session_factory() as session:
+        yield session
+
+
+async def dispose_async_engine():
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_factory = None
\ No newline at end of file
@@ -1,17 +1,108 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""
+Database engine and sessions.
+
+One engine per process with an explicitly sized, pre-pinged connection
+pool. On SQLite every new connection gets SQLITE_JOURNAL_MODE (WAL),
+SQLITE_SYNCHRONOUS, mmap_size and busy_timeout from a connect hook, so the
+monitoring jobs' long reads no longer block /predict writes and a writer
+waits for the lock instead of failing with "database is locked". SQLite
+still admits one writer at a time, so threads of one process take turns
+through write_lock() instead of polling the busy handler.
+
+Request handlers get their session from the get_db dependency; jobs and
+background threads use session_scope(). Both always close the session.
+"""
 
-from app.core.config import DATABASE_URL
+import threading
+from contextlib import contextmanager, nullcontext
 
-engine = create_engine(
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+from app.core.config import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_PRE_PING,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_SERIALIZE_WRITES,
 )
 
+
+def engine_options(url: str = DATABASE_URL) -> dict:
+    """create_engine keyword arguments shared by the sync and async engines."""
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options  # single shared connection; nothing to size
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def configure_engine(engine: Engine) -> Engine:
+    """Install the SQLite connect hook (no-op for other backends)."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options()))
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
 def get_db_session():
-    return SessionLocal()
\ No newline at end of file
+    return SessionLocal()
+
+
+def get_db():
+    """FastAPI dependency: one session per request, always closed."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_write_lock = threading.Lock()
+
+
+def write_lock():
+    """Hold around a write transaction; serializes this process's SQLite writers."""
+    if SQLITE_SERIALIZE_WRITES and engine.dialect.name == "sqlite":
+        return _write_lock
+    return nullcontext()
+
+
+@contextmanager
+def session_scope():
+    """Session for a job or background thread; closed (and rolled back if uncommitted) on exit."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
\ No newline at end of file
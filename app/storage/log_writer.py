@@ -0,0 +1,280 @@
+"""
+Write-behind pipeline for PredictionLog rows.
+
+Requests enqueue plain row mappings; a background thread bulk-inserts them
+once PREDICTION_LOG_FLUSH_BATCH_SIZE rows or PREDICTION_LOG_FLUSH_INTERVAL_MS
+milliseconds are reached. The synchronous mode commits per request and
+leaves the rollup sketches to the SketchBuffer; write-behind flushes are
+already batched and merge them inline.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import (
+    PREDICTION_LOG_WRITE_MODE,
+    PREDICTION_LOG_FLUSH_BATCH_SIZE,
+    PREDICTION_LOG_FLUSH_INTERVAL_MS,
+    PREDICTION_LOG_QUEUE_MAX_SIZE,
+    PREDICTION_LOG_QUEUE_FULL_POLICY,
+    PREDICTION_LOG_SPILL_PATH,
+)
+from app.storage.db import get_db_session, write_lock
+from app.storage.schemas import PredictionLog
+from app.storage.rollups import accumulate, apply_rollups, get_sketch_buffer
+from app.core.logging import get_logger
+
+logger = get_logger("log_writer")
+
+FULL_POLICIES = ("block", "drop", "spill")
+
+
+def insert_prediction_logs(db, rows: list, chunk_size: int = PREDICTION_LOG_FLUSH_BATCH_SIZE,
+                           sketches: bool = True) -> dict:
+    """
+    Bulk-insert log rows and fold them into the per-minute rollups (no
+    commit). Returns the rollup deltas; with sketches=False their sketch
+    values are left for the caller to hand to the SketchBuffer.
+    """
+    # Aggregate before the first write, so the write lock is held only for SQL
+    deltas = accumulate(rows)
+    for i in range(0, len(rows), chunk_size):
+        db.bulk_insert_mappings(PredictionLog, rows[i:i + chunk_size])
+    apply_rollups(db, deltas, sketches)
+    return deltas
+
+
+def _encode_row(row: dict) -> str:
+    encoded = dict(row)
+    if isinstance(encoded.get("timestamp"), datetime):
+        encoded["timestamp"] = encoded["timestamp"].isoformat()
+    return json.dumps(encoded)
+
+
+def _decode_row(line: str) -> dict:
+    row = json.loads(line)
+    if row.get("timestamp"):
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class PredictionLogWriter:
+    def __init__(
+        self,
+        batch_size: int = PREDICTION_LOG_FLUSH_BATCH_SIZE,
+        flush_interval_ms: int = PREDICTION_LOG_FLUSH_INTERVAL_MS,
+        max_queue_size: int = PREDICTION_LOG_QUEUE_MAX_SIZE,
+        full_policy: str = PREDICTION_LOG_QUEUE_FULL_POLICY,
+        spill_path: str = PREDICTION_LOG_SPILL_PATH,
+    ):
+        if full_policy not in FULL_POLICIES:
+            raise ValueError(f"Unknown queue full policy: {full_policy}")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.full_policy = full_policy
+        self.spill_path = Path(spill_path)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.blocked = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+
+    # ---- Producer side ----
+
+    def submit(self, rows: list):
+        for row in rows:
+            if self.full_policy == "block":
+                try:
+                    self._queue.put_nowait(row)
+                except queue.Full:
+                    self.blocked += 1
+                    self._queue.put(row)
+            else:
+                try:
+                    self._queue.put_nowait(row)
+                except queue.Full:
+                    if self.full_policy == "drop":
+                        self.dropped += 1
+                    else:
+                        self._spill([row])
+                    continue
+            self.enqueued += 1
+
+    def has_room(self, rows: int) -> bool:
+        return self._queue.maxsize <= 0 or self._queue.maxsize - self._queue.qsize() >= rows
+
+    def _spill(self, rows: list):
+        with self._spill_lock:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a") as f:
+                for row in rows:
+                    f.write(_encode_row(row) + "\n")
+        self.spilled += len(rows)
+
+    # ---- Consumer side ----
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._replay_spill()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="prediction-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher after draining everything still queued."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._flush(self._take_all())
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self) -> list:
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _take_all(self) -> list:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _flush(self, rows: list):
+        if not rows:
+            return
+
+        start = time.perf_counter()
+        db = get_db_session()
+        try:
+            insert_prediction_logs(db, rows, self.batch_size)
+            db.commit()
+            self.flushed += len(rows)
+        except Exception as e:
+            db.rollback()
+            self.failed += len(rows)
+            logger.error(
+                "prediction_log_flush_failed",
+                extra={"extra_data": {"rows": len(rows), "error": str(e)}}
+            )
+            self._spill(rows)
+        finally:
+            db.close()
+
+        self.flush_count += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _replay_spill(self):
+        """Re-insert rows spilled by a previous run before accepting new ones."""
+        with self._spill_lock:
+            if not self.spill_path.exists():
+                return
+            with open(self.spill_path) as f:
+                rows = [_decode_row(line) for line in f if line.strip()]
+            self.spill_path.unlink()
+
+        self._flush(rows)
+        logger.info(
+            "prediction_log_spill_replayed",
+            extra={"extra_data": {"rows": len(rows)}}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "full_policy": self.full_policy,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "flush_count": self.flush_count,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+_writer = None
+
+
+def get_log_writer():
+    """Return the process-wide writer, or None in synchronous mode."""
+    global _writer
+    if PREDICTION_LOG_WRITE_MODE != "write_behind":
+        return None
+    if _writer is None:
+        _writer = PredictionLogWriter()
+    return _writer
+
+
+def record_predictions(db, rows: list):
+    """Persist prediction log mappings according to PREDICTION_LOG_WRITE_MODE."""
+    writer = get_log_writer()
+    if writer is not None:
+        writer.submit(rows)
+        return
+
+    buffer = get_sketch_buffer()
+    with write_lock():
+        deltas = insert_prediction_logs(db, rows, sketches=buffer is None)
+        db.commit()
+    if buffer is not None:
+        buffer.add(deltas)
+
+
+async def record_predictions_async(db, rows: list):
+    """record_predictions for the async request path (db is an AsyncSession)."""
+    writer = get_log_writer()
+    if writer is not None:
+        if writer.full_policy == "block" and not writer.has_room(len(rows)):
+            # Waiting for queue space must not stall the event loop
+            await asyncio.to_thread(writer.submit, rows)
+        else:
+            writer.submit(rows)
+        return
+
+    buffer = get_sketch_buffer()
+    deltas = await db.run_sync(lambda session: insert_prediction_logs(session, rows, sketches=buffer is None))
+    await db.commit()
+    if buffer is not None:
+        buffer.add(deltas)
\ No newline at end of file
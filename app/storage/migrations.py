@@ -0,0 +1,139 @@
+"""
+Idempotent schema upgrades run at startup.
+
+create_all only creates missing tables, so columns and indexes added to
+existing tables are created here. Tables whose primary key gained a
+column are rebuilt and their rows copied over.
+
+Every uvicorn worker imports app.main, so upgrades are serialized across
+processes: a PostgreSQL advisory lock, or a lock file next to the SQLite
+database. Each step inspects the live schema only once it holds the lock,
+so the workers that wait find nothing left to do. With
+SCHEMA_UPGRADE_ON_STARTUP=false run it once before starting the workers:
+
+    python -m app.storage.migrations
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+
+from app.storage.db import engine as default_engine
+from app.storage.schemas import Base
+
+try:
+    import fcntl
+except ImportError:  # Windows: upgrades are not serialized
+    fcntl = None
+
+# pg_advisory_lock key shared by every process upgrading this database
+SCHEMA_LOCK_KEY = 5_105_190_005
+
+
+@contextmanager
+def schema_lock(engine: Engine):
+    """Exclusive, cross-process lock held for the whole upgrade."""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"SELECT pg_advisory_lock({SCHEMA_LOCK_KEY})")
+            conn.commit()  # session-level lock; don't sit idle in a transaction
+            try:
+                yield
+            finally:
+                conn.exec_driver_sql(f"SELECT pg_advisory_unlock({SCHEMA_LOCK_KEY})")
+                conn.commit()
+        return
+
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or fcntl is None or database in (None, "", ":memory:"):
+        yield
+        return
+    with open(database + ".upgrade.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _rebuild_changed_primary_keys(engine: Engine):
+    """
+    Recreate tables whose live primary key lacks model key columns (e.g.
+    prediction_rollups.segment). The new table is created under a staging
+    name, rows are copied with the new key columns set to their scalar
+    default, the old table is dropped and the staging table renamed into
+    place; runs in one transaction. Nothing is created under a name the
+    old table still holds, which on PostgreSQL includes its <table>_pkey
+    constraint and its indexes.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        live_key = set(inspector.get_pk_constraint(table.name)["constrained_columns"])
+        new_key = [c for c in table.primary_key.columns if c.name not in live_key]
+        if not new_key:
+            continue
+
+        live_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        copied = [c.name for c in table.columns if c.name in live_columns]
+        staging = table.to_metadata(MetaData(), name=f"{table.name}_upgrade")
+        with engine.begin() as conn:
+            # Left behind if an earlier rebuild died before its commit
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {staging.name}")
+            # Table only; the indexes are created once the old ones are gone
+            conn.execute(CreateTable(staging))
+
+            defaults = [c for c in new_key if c.name not in live_columns]
+            columns = copied + [c.name for c in defaults]
+            values = [f'"{name}"' for name in copied] + [":default_" + c.name for c in defaults]
+            conn.execute(
+                text(
+                    f'INSERT INTO {staging.name} ({", ".join(columns)}) '
+                    f'SELECT {", ".join(values)} FROM {table.name}'
+                ),
+                {"default_" + c.name: c.default.arg for c in defaults},
+            )
+            conn.exec_driver_sql(f"DROP TABLE {table.name}")
+            conn.exec_driver_sql(f"ALTER TABLE {staging.name} RENAME TO {table.name}")
+            if engine.dialect.name == "postgresql":
+                # The renamed table keeps its constraint (and its index) name
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} RENAME CONSTRAINT {staging.name}_pkey TO {table.name}_pkey"
+                )
+            for index in table.indexes:
+                index.create(bind=conn)
+
+
+def _add_missing_columns(engine: Engine):
+    """ALTER TABLE ADD COLUMN for model columns the live table lacks (nullable only)."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+                )
+
+
+def upgrade_schema(engine: Engine = default_engine):
+    with schema_lock(engine):
+        _rebuild_changed_primary_keys(engine)
+        Base.metadata.create_all(bind=engine)
+        _add_missing_columns(engine)
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+
+if __name__ == "__main__":
+    upgrade_schema()
+    print("Schema is up to date.")
\ No newline at end of file
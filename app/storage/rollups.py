@@ -0,0 +1,341 @@
+"""
+Incremental per-minute rollups of prediction logs.
+
+Every batch of PredictionLog rows written by the prediction path is folded
+into prediction_rollups in the same transaction, so window metrics can be
+computed from CURRENT_WINDOW_MINUTES rollup rows instead of raw logs.
+Rows are kept per model version and segment; summing across them gives
+the global window.
+
+The counters are upserted with every batch; the JSON columns need a
+read-merge-write and are only touched when a batch has null or
+out-of-range features. Sketch values of the synchronous request path are
+collected in memory by SketchBuffer and merged into feature_sketches once
+per ROLLUP_SKETCH_FLUSH_SECONDS instead of once per request.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sqlalchemy import bindparam, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import LOW_CONFIDENCE_THRESHOLD, SKETCH_BINS, ROLLUP_SKETCH_FLUSH_SECONDS
+from app.ml.validation import FEATURE_RANGES
+from app.ml.sketches import (
+    FixedHistogram,
+    sketches_from_values,
+    sketches_from_dict,
+    sketches_to_dict,
+    merge_sketches,
+)
+from app.storage.db import get_db_session, write_lock
+from app.storage.schemas import PredictionRollup
+
+def bucket_start(ts: datetime) -> datetime:
+    return ts.replace(second=0, microsecond=0)
+
+
+def _new_delta():
+    return {
+        "prediction_count": 0,
+        "confidence_sum": 0.0,
+        "low_confidence_count": 0,
+        "feature_null_counts": defaultdict(int),
+        "feature_out_of_range_counts": defaultdict(int),
+        # Raw values per sketch; turned into histograms in one vectorized step
+        "values": defaultdict(list),
+    }
+
+
+def accumulate(rows: list, deltas: dict = None) -> dict:
+    """Fold prediction log mappings into {(bucket_start, model_version, segment): delta}."""
+    if deltas is None:
+        deltas = defaultdict(_new_delta)
+
+    for row in rows:
+        key = (bucket_start(row["timestamp"]), row["model_version"], row.get("segment") or "")
+        delta = deltas[key]
+        confidence = row["confidence_score"]
+
+        delta["prediction_count"] += 1
+        delta["confidence_sum"] += confidence
+        delta["values"]["confidence"].append(confidence)
+        if confidence < LOW_CONFIDENCE_THRESHOLD:
+            delta["low_confidence_count"] += 1
+
+        # Typed feature columns win over the JSON payload (see prediction_log)
+        values = dict(row.get("input_summary") or {})
+        for k in FEATURE_RANGES:
+            if row.get(k) is not None:
+                values[k] = row[k]
+
+        for k, v in values.items():
+            if v is None:
+                delta["feature_null_counts"][k] += 1
+            elif k in FEATURE_RANGES and isinstance(v, (int, float)):
+                delta["values"][k].append(v)
+                min_val, max_val = FEATURE_RANGES[k]
+                if not (min_val <= v <= max_val):
+                    delta["feature_out_of_range_counts"][k] += 1
+
+    return deltas
+
+
+def _merge_counts(existing, new):
+    merged = dict(existing or {})
+    for k, v in new.items():
+        merged[k] = merged.get(k, 0) + v
+    return merged
+
+
+def _merge_json(db: Session, table, key: tuple, delta: dict, sketches: bool):
+    nulls, out_of_range, current = db.execute(
+        table.select()
+        .with_only_columns(
+            table.c.feature_null_counts,
+            table.c.feature_out_of_range_counts,
+            table.c.feature_sketches,
+        )
+        .where(*key)
+    ).one()
+
+    values = {
+        "feature_null_counts": _merge_counts(nulls, delta["feature_null_counts"]),
+        "feature_out_of_range_counts": _merge_counts(out_of_range, delta["feature_out_of_range_counts"]),
+    }
+    if sketches and delta["values"]:
+        values["feature_sketches"] = sketches_to_dict(merge_sketches(
+            sketches_from_dict(current),
+            sketches_from_values(delta["values"], SKETCH_BINS),
+        ))
+    db.execute(update(table).where(*key).values(**values))
+
+
+def _upsert_statement():
+    """
+    Counter upsert as one text statement: the dialect insert().on_conflict_do_update()
+    constructs are not cacheable and were recompiled on every request. The
+    ON CONFLICT syntax is the same on SQLite and PostgreSQL.
+    """
+    table = PredictionRollup.__table__
+    counters = ("prediction_count", "confidence_sum", "low_confidence_count")
+    return text(
+        f"INSERT INTO {table.name} (bucket_start, model_version, segment, {', '.join(counters)}, "
+        "feature_null_counts, feature_out_of_range_counts, feature_sketches) "
+        f"VALUES (:bucket_start, :model_version, :segment, {', '.join(':' + c for c in counters)}, "
+        "'{}', '{}', '{}') "
+        "ON CONFLICT (bucket_start, model_version, segment) DO UPDATE SET "
+        + ", ".join(f"{c} = {table.name}.{c} + excluded.{c}" for c in counters)
+    ).bindparams(bindparam("bucket_start", type_=table.c.bucket_start.type))
+
+
+_UPSERT = _upsert_statement()
+
+
+def apply_rollups(db: Session, deltas: dict, sketches: bool = True):
+    """
+    Add deltas to prediction_rollups inside the caller's transaction.
+    The numeric upsert takes the row lock, so the JSON merge that follows
+    cannot race with another writer. With sketches=False the sketch values
+    are left to the caller (see SketchBuffer).
+    """
+    table = PredictionRollup.__table__
+
+    for (bucket, model_version, segment), delta in deltas.items():
+        db.execute(_UPSERT, {
+            "bucket_start": bucket,
+            "model_version": model_version,
+            "segment": segment,
+            "prediction_count": delta["prediction_count"],
+            "confidence_sum": delta["confidence_sum"],
+            "low_confidence_count": delta["low_confidence_count"],
+        })
+
+        if delta["feature_null_counts"] or delta["feature_out_of_range_counts"] or (sketches and delta["values"]):
+            key = (
+                table.c.bucket_start == bucket,
+                table.c.model_version == model_version,
+                table.c.segment == segment,
+            )
+            _merge_json(db, table, key, delta, sketches)
+
+
+class SketchBuffer:
+    """
+    Sketch values of committed rollup deltas, merged into feature_sketches
+    by a background thread every flush_seconds. Each worker process has its
+    own buffer; windows see a process's sketches at most one interval late.
+    """
+
+    def __init__(self, flush_seconds: float = ROLLUP_SKETCH_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._values = defaultdict(lambda: defaultdict(list))  # rollup key -> sketch name -> values
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flush_count = 0
+        self.failed = 0
+
+    def add(self, deltas: dict):
+        with self._lock:
+            for key, delta in deltas.items():
+                for name, values in delta["values"].items():
+                    self._values[key][name].extend(values)
+
+    def flush(self):
+        """Merge everything buffered so far, one transaction for all keys."""
+        with self._lock:
+            pending, self._values = self._values, defaultdict(lambda: defaultdict(list))
+        if not pending:
+            return
+
+        table = PredictionRollup.__table__
+        db = get_db_session()
+        try:
+            with write_lock():
+                for (bucket, model_version, segment), values in pending.items():
+                    key = (
+                        table.c.bucket_start == bucket,
+                        table.c.model_version == model_version,
+                        table.c.segment == segment,
+                    )
+                    current = db.execute(
+                        table.select().with_only_columns(table.c.feature_sketches).where(*key)
+                    ).scalar_one_or_none()
+                    merged = merge_sketches(sketches_from_dict(current), sketches_from_values(values, SKETCH_BINS))
+                    db.execute(update(table).where(*key).values(feature_sketches=sketches_to_dict(merged)))
+                db.commit()
+            self.flush_count += 1
+        except Exception:
+            db.rollback()
+            self.failed += 1
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception:
+                pass  # counted in self.failed; the next flush starts from new values
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rollup-sketches", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_sketch_buffer = None
+
+
+def get_sketch_buffer():
+    """Process-wide buffer, or None when ROLLUP_SKETCH_FLUSH_SECONDS is 0 (merge per batch)."""
+    global _sketch_buffer
+    if _sketch_buffer is None and ROLLUP_SKETCH_FLUSH_SECONDS > 0:
+        _sketch_buffer = SketchBuffer()
+    return _sketch_buffer
+
+
+def window_buckets(window_end: datetime, minutes: int):
+    """Return (first bucket, last bucket) covering the last `minutes` minutes."""
+    last = bucket_start(window_end)
+    return last - timedelta(minutes=minutes - 1), last
+
+
+def sum_rollups(db: Session, first_bucket: datetime, last_bucket: datetime) -> dict:
+    """Sum rollup rows in [first_bucket, last_bucket] across model versions."""
+    rows = (
+        db.query(PredictionRollup)
+        .filter(PredictionRollup.bucket_start >= first_bucket)
+        .filter(PredictionRollup.bucket_start <= last_bucket)
+        .all()
+    )
+
+    total = _new_delta()
+    total["sketches"] = {}
+    for row in rows:
+        total["prediction_count"] += row.prediction_count
+        total["confidence_sum"] += row.confidence_sum
+        total["low_confidence_count"] += row.low_confidence_count
+        for k, v in (row.feature_null_counts or {}).items():
+            total["feature_null_counts"][k] += v
+        for k, v in (row.feature_out_of_range_counts or {}).items():
+            total["feature_out_of_range_counts"][k] += v
+        total["sketches"] = merge_sketches(
+            total["sketches"], sketches_from_dict(row.feature_sketches)
+        )
+
+    return total
+
+
+def sum_rollups_by_segment(db: Session, first_bucket: datetime, last_bucket: datetime) -> dict:
+    """
+    sum_rollups for every (model_version, segment) in one query. Sketch
+    counts are stacked into per-layout matrices and summed per segment with
+    np.add.at, so the cost is one pass over the rows whatever the number of
+    segments. Returns {(model_version, segment): totals}; totals["sketches"]
+    holds FixedHistograms.
+    """
+    table = PredictionRollup.__table__
+    rows = db.execute(
+        table.select()
+        .with_only_columns(
+            table.c.model_version,
+            table.c.segment,
+            table.c.prediction_count,
+            table.c.confidence_sum,
+            table.c.low_confidence_count,
+            table.c.feature_null_counts,
+            table.c.feature_sketches,
+        )
+        .where(table.c.bucket_start >= first_bucket, table.c.bucket_start <= last_bucket)
+    ).all()
+
+    keys = {}
+    groups = np.empty(len(rows), dtype=np.int64)
+    totals = []
+    # name -> ((lo, hi, bins), [(row index, FixedHistogram.from_row layout)])
+    sketch_rows = {}
+    for i, row in enumerate(rows):
+        key = (row.model_version, row.segment or "")
+        if key not in keys:
+            keys[key] = len(keys)
+            total = _new_delta()
+            total["sketches"] = {}
+            totals.append(total)
+        g = groups[i] = keys[key]
+
+        total = totals[g]
+        total["prediction_count"] += row.prediction_count
+        total["confidence_sum"] += row.confidence_sum
+        total["low_confidence_count"] += row.low_confidence_count
+        for k, v in (row.feature_null_counts or {}).items():
+            total["feature_null_counts"][k] += v
+
+        for name, d in (row.feature_sketches or {}).items():
+            layout = (d["lo"], d["hi"], len(d["counts"]))
+            entry = sketch_rows.setdefault(name, (layout, []))
+            if entry[0] == layout:
+                entry[1].append((i, [d.get("underflow", 0), *d["counts"], d.get("overflow", 0), d.get("nulls", 0)]))
+
+    for name, ((lo, hi, bins), entries) in sketch_rows.items():
+        matrix = np.zeros((len(keys), bins + 3))
+        np.add.at(matrix, groups[[i for i, _ in entries]], np.array([v for _, v in entries], dtype=float))
+        present = np.flatnonzero(matrix.sum(axis=1))
+        for g in present:
+            totals[g]["sketches"][name] = FixedHistogram.from_row(lo, hi, matrix[g].astype(np.int64))
+
+    return {key: totals[g] for key, g in keys.items()}
\ No newline at end of file
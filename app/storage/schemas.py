@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Index, func
 from datetime import datetime
 
 from app.storage.db import Base
@@ -11,10 +11,47 @@ class PredictionLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     model_version = Column(String)
     system_state = Column(String)
-    input_summary = Column(JSON)
+    # Full payload in "json" feature storage; only non-feature keys in "typed"
+    input_summary = Column(JSON(none_as_null=True))
     prediction = Column(String)
     confidence_score = Column(Float)
     fallback_used = Column(Boolean)
+    # payload[SEGMENT_FIELD]; monitoring groups by (model_version, segment)
+    segment = Column(String)
+    # Served from the prediction cache instead of a model call
+    cache_hit = Column(Boolean)
+    # Validated feature vector (REQUIRED_FEATURES); NULL for rows in the JSON layout
+    feature_1 = Column(Float)
+    feature_2 = Column(Float)
+    feature_3 = Column(Float)
+
+    __table_args__ = (
+        # Window range scans and the baseline's ORDER BY timestamp; confidence
+        # is included so confidence aggregates can be answered from the index.
+        Index("ix_prediction_logs_timestamp_confidence", "timestamp", "confidence_score"),
+    )
+
+
+def feature_value(name: str):
+    """A logged feature as a number: the typed column, else the JSON payload (older rows)."""
+    return func.coalesce(
+        getattr(PredictionLog, name), PredictionLog.input_summary[name].as_float()
+    )
+
+
+class PredictionRollup(Base):
+    """Per-minute running aggregates of prediction_logs, one row per model version and segment."""
+    __tablename__ = "prediction_rollups"
+
+    bucket_start = Column(DateTime, primary_key=True)
+    model_version = Column(String, primary_key=True)
+    segment = Column(String, primary_key=True, default="")  # "" when the payload had none
+    prediction_count = Column(Integer, default=0)
+    confidence_sum = Column(Float, default=0.0)
+    low_confidence_count = Column(Integer, default=0)
+    feature_null_counts = Column(JSON)
+    feature_out_of_range_counts = Column(JSON)
+    feature_sketches = Column(JSON)
 
 
 class BaselineMetrics(Base):
@@ -28,6 +65,62 @@ class BaselineMetrics(Base):
     feature_ranges = Column(JSON)
     category_frequencies = Column(JSON)
     missing_value_rates = Column(JSON)
+    feature_sketches = Column(JSON)
+    version = Column(Integer)  # BaselineSnapshot this row was written from
+
+
+class BaselineSnapshot(Base):
+    """Immutable baseline versions; incidents refer to the one they were judged against."""
+    __tablename__ = "baseline_snapshots"
+
+    version = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    mode = Column(String)  # static | decayed
+    # Decayed mode: rollup buckets before this have been folded in
+    data_through = Column(DateTime)
+    # Written while the system was WARNING / DEGRADED; statistics carried over unchanged
+    frozen = Column(Boolean, default=False)
+    # Effective (decayed) number of predictions
+    sample_size = Column(Float)
+    avg_confidence = Column(Float)
+    low_confidence_rate = Column(Float)
+    feature_ranges = Column(JSON)
+    missing_value_rates = Column(JSON)
+    feature_sketches = Column(JSON)
+
+    __table_args__ = (
+        Index("ix_baseline_snapshots_mode_version", "mode", "version"),
+    )
+
+
+class SegmentBaseline(Base):
+    """Baseline per (model_version, segment); segments without one use the "default" baseline."""
+    __tablename__ = "segment_baselines"
+
+    model_version = Column(String, primary_key=True)
+    segment = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sample_size = Column(Integer)
+    avg_confidence = Column(Float)
+    low_confidence_rate = Column(Float)
+    feature_sketches = Column(JSON)
+
+
+class SegmentState(Base):
+    """Latest verdict of the per-segment monitor; the global state stays in system_state."""
+    __tablename__ = "segment_states"
+
+    model_version = Column(String, primary_key=True)
+    segment = Column(String, primary_key=True)
+    current_state = Column(String)
+    reason = Column(String)
+    last_updated = Column(DateTime)
+    prediction_count = Column(Integer)
+    avg_confidence = Column(Float)
+    low_confidence_rate = Column(Float)
+    # Recovery bookkeeping (see monitor_job.next_action)
+    escalated_at = Column(DateTime)
+    healthy_runs = Column(Integer)
 
 
 class CurrentWindowMetrics(Base):
@@ -41,6 +134,11 @@ class CurrentWindowMetrics(Base):
     low_confidence_rate = Column(Float)
     feature_anomalies = Column(JSON)
     unseen_categories = Column(Boolean)
+    feature_sketches = Column(JSON)
+
+    __table_args__ = (
+        Index("ix_current_window_metrics_window_end", "window_end"),
+    )
 
 
 class SystemState(Base):
@@ -51,6 +149,10 @@ class SystemState(Base):
     last_updated = Column(DateTime, default=datetime.utcnow)
     reason = Column(String)
 
+    __table_args__ = (
+        Index("ix_system_state_last_updated", "last_updated"),
+    )
+
 
 class Incident(Base):
     __tablename__ = "incidents"
@@ -62,6 +164,14 @@ class Incident(Base):
     decision_reason = Column(String)
     fallback_activated = Column(Boolean)
     resolved = Column(Boolean)
+    baseline_version = Column(Integer)
+    # Set for per-segment incidents; NULL for the global monitor and detector
+    model_version = Column(String)
+    segment = Column(String)
+
+    __table_args__ = (
+        Index("ix_incidents_resolved_detected_at", "resolved", "detected_at"),
+    )
 
 
 class LLMExplanation(Base):
@@ -72,4 +182,23 @@ class LLMExplanation(Base):
     generated_at = Column(DateTime, default=datetime.utcnow)
     summary = Column(String)
     recommendations = Column(String)
-    llm_model = Column(String)
\ No newline at end of file
+    llm_model = Column(String)
+
+    __table_args__ = (
+        Index("ix_llm_explanations_incident_id", "incident_id"),
+    )
+
+
+class ExplanationCacheEntry(Base):
+    """Generated narratives keyed by a canonical incident signature."""
+    __tablename__ = "explanation_cache"
+
+    signature = Column(String, primary_key=True)
+    narrative = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    hits = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_explanation_cache_last_used_at", "last_used_at"),
+    )
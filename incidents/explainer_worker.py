@@ -0,0 +1,129 @@
+# incidents/explainer_worker.py
+"""
+Standalone worker that explains incidents off the monitoring path.
+
+Pulls incidents that have no LLMExplanation yet (or payloads submitted to
+its local queue), summarizes up to EXPLAINER_BATCH_SIZE of them per
+generate() call, and unloads the model after EXPLAINER_IDLE_UNLOAD_SECONDS
+without work.
+
+    python -m incidents.explainer_worker
+"""
+
+import queue
+
+from app.core.config import (
+    EXPLAINER_BATCH_SIZE,
+    EXPLAINER_POLL_SECONDS,
+    EXPLAINER_IDLE_UNLOAD_SECONDS,
+)
+from app.storage.db import get_db_session
+from app.storage.schemas import (
+    Incident,
+    LLMExplanation,
+    BaselineMetrics,
+    CurrentWindowMetrics,
+)
+from incidents.payload import build_incident_payload
+from incidents import llm_explainer
+
+
+def pending_payloads(limit: int, exclude: set = frozenset()) -> list:
+    """
+    Payloads for the oldest incidents without an explanation. Incidents
+    with no window stored at or before detection can never be explained,
+    so they are filtered out in SQL rather than re-selected every poll.
+    """
+    db = get_db_session()
+
+    baseline = db.query(BaselineMetrics).filter_by(baseline_id="default").first()
+    if baseline is None:
+        db.close()
+        return []
+
+    has_window = (
+        db.query(CurrentWindowMetrics.id)
+        .filter(CurrentWindowMetrics.window_end <= Incident.detected_at)
+        .exists()
+    )
+    incidents = (
+        db.query(Incident)
+        .outerjoin(LLMExplanation, LLMExplanation.incident_id == Incident.incident_id)
+        .filter(LLMExplanation.id.is_(None))
+        .filter(Incident.incident_id.not_in(exclude))
+        .filter(has_window)
+        .order_by(Incident.detected_at.asc())
+        .limit(limit)
+        .all()
+    )
+
+    payloads = []
+    for incident in incidents:
+        # The window the monitor compared against when it raised the incident
+        current = (
+            db.query(CurrentWindowMetrics)
+            .filter(CurrentWindowMetrics.window_end <= incident.detected_at)
+            .order_by(CurrentWindowMetrics.window_end.desc())
+            .first()
+        )
+        payloads.append(build_incident_payload(incident, baseline, current))
+
+    db.close()
+    return payloads
+
+
+class ExplainerWorker:
+    def __init__(
+        self,
+        batch_size: int = EXPLAINER_BATCH_SIZE,
+        poll_seconds: float = EXPLAINER_POLL_SECONDS,
+        idle_unload_seconds: float = EXPLAINER_IDLE_UNLOAD_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.idle_unload_seconds = idle_unload_seconds
+        self.queue = queue.Queue()
+        # Incidents that failed in this process are not retried until restart
+        self._failed = set()
+
+    def submit(self, payload: dict):
+        self.queue.put(payload)
+
+    def _next_batch(self) -> list:
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=self.poll_seconds))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if len(batch) < self.batch_size:
+            queued = {p["incident_id"] for p in batch}
+            batch += pending_payloads(self.batch_size - len(batch), self._failed | queued)
+        return batch
+
+    def run_once(self) -> int:
+        batch = self._next_batch()
+        if batch:
+            stored = llm_explainer.explain_incidents(batch)
+            if not stored:
+                self._failed.update(p["incident_id"] for p in batch)
+            return stored
+
+        if llm_explainer.is_model_loaded() and llm_explainer.idle_seconds() > self.idle_unload_seconds:
+            llm_explainer.unload_model()
+            print("Explainer model unloaded after idle timeout.")
+        return 0
+
+    def run(self):
+        print("Explainer worker started.")
+        while True:
+            self.run_once()
+
+
+if __name__ == "__main__":
+    try:
+        ExplainerWorker().run()
+    except KeyboardInterrupt:
+        print("Explainer worker stopped.")
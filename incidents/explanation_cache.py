@@ -0,0 +1,133 @@
+# incidents/explanation_cache.py
+"""
+LRU cache of generated incident narratives.
+
+Incidents raised during one degradation episode differ only in the exact
+metric values, so the narrative is cached under a canonical signature
+(severity, decision reason and quantized confidence signals). Entries are
+persisted in explanation_cache so they survive restarts; the least
+recently used ones are evicted beyond EXPLANATION_CACHE_SIZE.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from app.core.config import EXPLANATION_CACHE_SIZE, EXPLANATION_SIGNAL_QUANTUM
+from app.storage.db import get_db_session
+from app.storage.schemas import ExplanationCacheEntry
+
+SIGNATURE_SIGNALS = ("confidence_drop", "low_confidence_increase")
+
+
+def _quantize(value, quantum: float):
+    if value is None:
+        return None
+    return round(round(value / quantum) * quantum, 6)
+
+
+def signature_fields(payload: dict, quantum: float = EXPLANATION_SIGNAL_QUANTUM) -> dict:
+    """The only incident fields a cached narrative may depend on."""
+    signals = payload.get("trigger_signals") or {}
+    return {
+        "severity": payload.get("severity"),
+        "decision_reason": payload.get("decision_reason"),
+        "signals": {name: _quantize(signals.get(name), quantum) for name in SIGNATURE_SIGNALS},
+    }
+
+
+def incident_signature(payload: dict, quantum: float = EXPLANATION_SIGNAL_QUANTUM) -> str:
+    encoded = json.dumps(signature_fields(payload, quantum), sort_keys=True)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class ExplanationCache:
+    def __init__(self, capacity: int = EXPLANATION_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = OrderedDict()  # signature -> narrative, most recent last
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._new = {}
+        self._touched = {}
+        self._evicted = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """Warm the in-memory LRU from the persisted entries, most recent last."""
+        db = get_db_session()
+        rows = (
+            db.query(ExplanationCacheEntry)
+            .order_by(ExplanationCacheEntry.last_used_at.desc())
+            .limit(self.capacity)
+            .all()
+        )
+        db.close()
+        for row in reversed(rows):
+            self._entries[row.signature] = row.narrative
+        self._loaded = True
+
+    def get(self, signature: str):
+        """In-memory lookup; usage is written back by persist()."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            narrative = self._entries.get(signature)
+            if narrative is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(signature)
+            self._touched[signature] = self._touched.get(signature, 0) + 1
+            self.hits += 1
+            return narrative
+
+    def put(self, signature: str, narrative: str):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._entries[signature] = narrative
+            self._entries.move_to_end(signature)
+            self._new[signature] = narrative
+            self._evicted.discard(signature)
+            while len(self._entries) > self.capacity:
+                evicted = self._entries.popitem(last=False)[0]
+                self._new.pop(evicted, None)
+                self._touched.pop(evicted, None)
+                self._evicted.add(evicted)
+
+    def persist(self, db):
+        """Write new entries, usage and evictions into the caller's transaction."""
+        with self._lock:
+            new, touched, evicted = self._new, self._touched, self._evicted
+            self._new, self._touched, self._evicted = {}, {}, set()
+
+        now = datetime.utcnow()
+        for signature, narrative in new.items():
+            db.merge(ExplanationCacheEntry(
+                signature=signature,
+                narrative=narrative,
+                created_at=now,
+                last_used_at=now,
+                hits=0,
+            ))
+        for signature, hits in touched.items():
+            db.query(ExplanationCacheEntry).filter_by(signature=signature).update({
+                ExplanationCacheEntry.last_used_at: now,
+                ExplanationCacheEntry.hits: ExplanationCacheEntry.hits + hits,
+            })
+        if evicted:
+            db.query(ExplanationCacheEntry).filter(
+                ExplanationCacheEntry.signature.in_(evicted)
+            ).delete(synchronize_session=False)
+
+
+_cache = None
+
+
+def get_explanation_cache() -> ExplanationCache:
+    global _cache
+    if _cache is None:
+        _cache = ExplanationCache()
+    return _cache
@@ -1,91 +1,177 @@
 # incidents/llm_explainer.py
 
+import gc
+import threading
+import time
 from datetime import datetime, timezone
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
 
 from app.storage.db import get_db_session
 from app.storage.schemas import LLMExplanation
+from incidents.explanation_cache import get_explanation_cache, incident_signature, signature_fields
 
 # ---------------------------------------------------------
-# Load BART once at startup (CPU, observer-only)
+# BART is loaded lazily on first use (CPU, observer-only).
+# Importing this module costs nothing; the worker unloads the
+# model again after an idle period.
 # ---------------------------------------------------------
 MODEL_NAME = "facebook/bart-large-cnn"
 
-_tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-_model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-_model.eval()  # inference only
+_tokenizer = None
+_model = None
+_last_used = 0.0
+_load_lock = threading.Lock()
+
+
+def _load_model():
+    global _tokenizer, _model
+    with _load_lock:
+        if _model is None:
+            from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+            _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            _model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+            _model.eval()  # inference only
+    return _tokenizer, _model
+
+
+def is_model_loaded() -> bool:
+    return _model is not None
+
+
+def idle_seconds() -> float:
+    return time.monotonic() - _last_used
+
+
+def unload_model():
+    """Drop the model so its memory can be reclaimed between incident bursts."""
+    global _tokenizer, _model
+    with _load_lock:
+        _tokenizer = None
+        _model = None
+    gc.collect()
 
 
 def _format_incident(payload: dict) -> str:
+    """
+    Generation input built from the signature fields only: the narrative is
+    cached per signature, so exact metric values would leak from the first
+    incident into every later one. Those go in _metrics_summary instead.
+    """
+    fields = signature_fields(payload)
+    signals = fields["signals"]
+    lines = [
+        "During routine prediction monitoring, the system detected a deviation.",
+        f"The incident was classified as {fields['severity']} severity.",
+        f"The deterministic decision was: {fields['decision_reason']}.",
+    ]
+    if signals["confidence_drop"] is not None:
+        lines.append(f"Average confidence dropped by about {signals['confidence_drop']} against its baseline.")
+    if signals["low_confidence_increase"] is not None:
+        lines.append(f"The share of low-confidence predictions rose by about {signals['low_confidence_increase']}.")
+    lines.append("No fallback mechanism was activated.")
+    return "\n".join(lines)
+
+
+def _metrics_summary(payload: dict) -> str:
     return (
-        "During routine prediction monitoring, the system detected a deviation.\n"
-        f"The incident was classified as {payload.get('severity')} severity.\n"
-        f"The primary observation was that model confidence dropped below its baseline.\n"
-        f"Historically, average confidence was {payload.get('baseline_metrics', {}).get('avg_confidence')}.\n"
-        f"In the current window, average confidence declined to "
+        f" Baseline avg confidence: "
+        f"{payload.get('baseline_metrics', {}).get('avg_confidence')}. "
+        f"Current avg confidence: "
         f"{payload.get('current_window_metrics', {}).get('avg_confidence')} "
-        f"across {payload.get('current_window_metrics', {}).get('prediction_count')} predictions.\n"
-        f"Observed signals included: {payload.get('trigger_signals')}.\n"
-        f"No fallback mechanism was activated."
+        f"over {payload.get('current_window_metrics', {}).get('prediction_count')} predictions. "
+        f"Trigger signals: {payload.get('trigger_signals')}."
     )
 
 
-def explain_incident(payload: dict):
-    """
-    Observer-only LLM explainer.
-    NEVER affects system behavior.
-    """
+def _generate_narratives(payloads: list) -> list:
+    """Summarize several incidents in one padded generate() call."""
+    import torch
 
-    try:
-        text = _format_incident(payload)
+    global _last_used
+    tokenizer, model = _load_model()
 
-        inputs = _tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512,
+    inputs = tokenizer(
+        [_format_incident(p) for p in payloads],
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=512,
+    )
+
+    with torch.no_grad():
+        summary_ids = model.generate(
+            inputs["input_ids"],
+            attention_mask=inputs["attention_mask"],
+            max_length=80,
+            min_length=30,
+            do_sample=False,
         )
 
-        with torch.no_grad():
-            summary_ids = _model.generate(
-                inputs["input_ids"],
-                max_length=80,
-                min_length=30,
-                do_sample=False,
-            )
+    _last_used = time.monotonic()
+    return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
 
-        narrative = _tokenizer.decode(
-            summary_ids[0],
-            skip_special_tokens=True
-        )
 
-        metrics_summary = (
-            f" Baseline avg confidence: "
-            f"{payload.get('baseline_metrics', {}).get('avg_confidence')}. "
-            f"Current avg confidence: "
-            f"{payload.get('current_window_metrics', {}).get('avg_confidence')} "
-            f"over {payload.get('current_window_metrics', {}).get('prediction_count')} predictions. "
-            f"Trigger signals: {payload.get('trigger_signals')}."
-        )
+def explain_incidents(payloads: list) -> int:
+    """
+    Observer-only LLM explainer for a batch of incident payloads.
+    NEVER affects system behavior. Returns the number of explanations stored.
+    """
+
+    if not payloads:
+        return 0
 
-        summary_text = narrative.rstrip(".") + "." + metrics_summary
+    try:
+        cache = get_explanation_cache()
+        signatures = [incident_signature(p) for p in payloads]
+        narratives = {}
+        misses = {}
+        for signature, payload in zip(signatures, payloads):
+            if signature in narratives or signature in misses:
+                continue
+            narrative = cache.get(signature)
+            if narrative is None:
+                misses[signature] = payload
+            else:
+                narratives[signature] = narrative
+
+        # Only signatures never seen before pay for generation
+        if misses:
+            generated = _generate_narratives(list(misses.values()))
+            for signature, narrative in zip(misses, generated):
+                cache.put(signature, narrative)
+                narratives[signature] = narrative
 
         db = get_db_session()
-        db.add(
-            LLMExplanation(
-                incident_id=payload["incident_id"],
-                generated_at=datetime.now(timezone.utc),
-                summary=summary_text,
-                recommendations="",  # observer-only by design
-                llm_model="facebook/bart-large-cnn (local)",
+        for payload, signature in zip(payloads, signatures):
+            narrative = narratives[signature]
+            db.add(
+                LLMExplanation(
+                    incident_id=payload["incident_id"],
+                    generated_at=datetime.now(timezone.utc),
+                    summary=narrative.rstrip(".") + "." + _metrics_summary(payload),
+                    recommendations="",  # observer-only by design
+                    llm_model=f"{MODEL_NAME} (local)",
+                )
             )
-        )
+        cache.persist(db)
         db.commit()
         db.close()
 
-        print("LLM explanation stored (local BART).")
+        print(
+            f"LLM explanations stored for {len(payloads)} incidents "
+            f"({len(misses)} generated, {len(payloads) - len(misses)} reused)."
+        )
+        return len(payloads)
 
     except Exception as e:
         # Observer-only guarantee
-        print(f"LLM explainer failed safely: {e}")
\ No newline at end of file
+        print(f"LLM explainer failed safely: {e}")
+        return 0
+
+
+def explain_incident(payload: dict):
+    """
+    Observer-only LLM explainer.
+    NEVER affects system behavior.
+    """
+    explain_incidents([payload])
@@ -0,0 +1,229 @@
+# monitoring/archive.py
+"""
+Columnar archive of closed hours of prediction_logs.
+
+Hours older than ARCHIVE_AFTER_HOURS are moved out of the OLTP database
+into one Arrow IPC file per hour under ARCHIVE_DIR/YYYY-MM-DD/HH.arrow,
+with REQUIRED_FEATURES as typed float columns. Arrow IPC (rather than
+Parquet) is used because it can be memory-mapped and read without
+copying or decoding, so offline jobs can scan months of history quickly.
+Files written before a column was added read back with it as nulls.
+
+Only the rows that were exported are deleted, by id, so logs written to
+an hour while it is being archived stay in the database for the next run.
+The archiver is the only job that deletes raw logs: ARCHIVE_AFTER_HOURS is
+their lifetime in the database. Deletes run in RETENTION_CHUNK_SIZE chunks,
+each committed on its own so predictions never wait long on the write lock.
+
+Requires the optional `pyarrow` package.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.storage.db import get_db_session
+from app.storage.schemas import PredictionLog
+from app.ml.validation import REQUIRED_FEATURES
+from app.core.config import ARCHIVE_DIR, ARCHIVE_AFTER_HOURS, RETENTION_CHUNK_SIZE, SCAN_CHUNK_SIZE
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.compute  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("The prediction log archive requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("model_version", pa.string()),
+            ("system_state", pa.string()),
+            ("prediction", pa.string()),
+            ("confidence_score", pa.float64()),
+            ("fallback_used", pa.bool_()),
+            ("segment", pa.string()),
+            ("cache_hit", pa.bool_()),
+        ]
+        + [(f, pa.float64()) for f in REQUIRED_FEATURES]
+        + [("input_summary", pa.string())]
+    )
+
+
+def hour_path(hour: datetime, archive_dir: str = ARCHIVE_DIR) -> Path:
+    return Path(archive_dir) / hour.strftime("%Y-%m-%d") / hour.strftime("%H.arrow")
+
+
+def _hour_table(db: Session, hour: datetime, pa):
+    """Read one hour of logs into an Arrow table, SCAN_CHUNK_SIZE rows at a time."""
+    schema = _schema(pa)
+    query = (
+        db.query(
+            PredictionLog.id,
+            PredictionLog.timestamp,
+            PredictionLog.model_version,
+            PredictionLog.system_state,
+            PredictionLog.prediction,
+            PredictionLog.confidence_score,
+            PredictionLog.fallback_used,
+            PredictionLog.segment,
+            PredictionLog.cache_hit,
+            PredictionLog.input_summary,
+            *[getattr(PredictionLog, f).label(f"typed_{f}") for f in REQUIRED_FEATURES],
+        )
+        .filter(PredictionLog.timestamp >= hour)
+        .filter(PredictionLog.timestamp < hour + timedelta(hours=1))
+        .order_by(PredictionLog.id)
+    )
+
+    batches = []
+    result = db.execute(query.statement.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    for chunk in result.partitions():
+        columns = {name: list(values) for name, values in zip(result.keys(), zip(*chunk))}
+        summaries = [summary or {} for summary in columns["input_summary"]]
+        for f in REQUIRED_FEATURES:
+            typed = columns.pop(f"typed_{f}")
+            columns[f] = [
+                value if value is not None else summary.get(f)
+                for value, summary in zip(typed, summaries)
+            ]
+        columns["input_summary"] = [json.dumps(summary) for summary in summaries]
+        batches.append(pa.RecordBatch.from_pydict(columns, schema=schema))
+
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+def _conform(table, schema, pa):
+    """Add columns missing from an older file as nulls, in schema order."""
+    if table.schema.names == schema.names:
+        return table
+    return pa.table(
+        [
+            table[field.name] if field.name in table.schema.names
+            else pa.nulls(table.num_rows, field.type)
+            for field in schema
+        ],
+        schema=schema,
+    )
+
+
+def _delete_ids(db: Session, ids: list, label: str = "prediction_logs"):
+    """Delete ids in chunks of RETENTION_CHUNK_SIZE, each in its own short transaction."""
+    for chunk, i in enumerate(range(0, len(ids), RETENTION_CHUNK_SIZE), start=1):
+        start = time.perf_counter()
+        chunk_ids = ids[i:i + RETENTION_CHUNK_SIZE]
+        (
+            db.query(PredictionLog)
+            .filter(PredictionLog.id.in_(chunk_ids))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        print(f"{label}: chunk {chunk} deleted {len(chunk_ids)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def _write_table(table, path: Path, pa):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def archive_closed_hours(archive_dir: str = ARCHIVE_DIR, after_hours: int = ARCHIVE_AFTER_HOURS):
+    """Move every hour older than `after_hours` from prediction_logs into the archive."""
+    pa = _pyarrow()
+    db: Session = get_db_session()
+
+    cutoff = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=after_hours)
+    oldest = db.query(func.min(PredictionLog.timestamp)).filter(PredictionLog.timestamp < cutoff).scalar()
+
+    archived_hours = 0
+    archived_rows = 0
+
+    while oldest is not None:
+        hour = oldest.replace(minute=0, second=0, microsecond=0)
+        table = _hour_table(db, hour, pa)
+        if table.num_rows:
+            exported_ids = table["id"].to_pylist()
+            path = hour_path(hour, archive_dir)
+            if path.exists():
+                # Late rows for an already archived hour: append, keeping ids unique
+                existing = read_file(path)
+                seen = pa.compute.is_in(existing["id"], value_set=table["id"])
+                existing = existing.filter(pa.compute.invert(seen))
+                table = pa.concat_tables([existing, table]).combine_chunks()
+            _write_table(table, path, pa)
+
+            # The file is in place, so every deleted chunk is already archived
+            _delete_ids(db, exported_ids, f"prediction_logs {hour:%Y-%m-%d %H}:00")
+
+            archived_hours += 1
+            archived_rows += table.num_rows
+
+        # Jump straight to the next hour that has logs
+        oldest = (
+            db.query(func.min(PredictionLog.timestamp))
+            .filter(PredictionLog.timestamp >= hour + timedelta(hours=1))
+            .filter(PredictionLog.timestamp < cutoff)
+            .scalar()
+        )
+
+    db.close()
+    print(f"Archived {archived_rows} prediction logs across {archived_hours} hours.")
+
+
+def read_file(path):
+    """Memory-map one archive file; column buffers point straight into the page cache."""
+    pa = _pyarrow()
+    source = pa.memory_map(str(path), "r")
+    return _conform(pa.ipc.open_file(source).read_all(), _schema(pa), pa)
+
+
+def read_archive(start: datetime, end: datetime, archive_dir: str = ARCHIVE_DIR, columns: list = None):
+    """
+    Arrow table of archived logs with start <= timestamp < end.
+    Hours fully inside the range stay zero-copy views of the mapped files;
+    only the partial first / last hour is filtered.
+    """
+    pa = _pyarrow()
+    columns = list(dict.fromkeys(["timestamp"] + columns)) if columns else None
+    lo = pa.scalar(start, pa.timestamp("us"))
+    hi = pa.scalar(end, pa.timestamp("us"))
+
+    tables = []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        path = hour_path(hour, archive_dir)
+        if path.exists():
+            table = read_file(path)
+            if columns is not None:
+                table = table.select(columns)
+            if hour < start or hour + timedelta(hours=1) > end:
+                ts = table["timestamp"]
+                table = table.filter(pa.compute.and_(
+                    pa.compute.greater_equal(ts, lo), pa.compute.less(ts, hi)
+                ))
+            tables.append(table)
+        hour += timedelta(hours=1)
+
+    if not tables:
+        table = _schema(pa).empty_table()
+        return table.select(columns) if columns is not None else table
+
+    return pa.concat_tables(tables)
+
+
+if __name__ == "__main__":
+    archive_closed_hours()
@@ -1,61 +1,353 @@
 # monitoring/baseline.py
-from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 
-from app.storage.db import get_db_session
-from app.storage.schemas import PredictionLog, BaselineMetrics
-from app.core.config import LOW_CONFIDENCE_THRESHOLD, BASELINE_SAMPLE_SIZE
+from app.storage.db import session_scope
+from app.storage.schemas import PredictionLog, BaselineMetrics, BaselineSnapshot, SystemState, Incident, feature_value
+from app.storage.rollups import bucket_start, sum_rollups
+from app.ml.validation import REQUIRED_FEATURES
+from app.ml.sketches import (
+    new_sketches,
+    sketches_from_chunks,
+    sketches_from_dict,
+    sketches_to_dict,
+)
+from app.core.config import (
+    LOW_CONFIDENCE_THRESHOLD,
+    BASELINE_SAMPLE_SIZE,
+    SCAN_CHUNK_SIZE,
+    SKETCH_BINS,
+    BASELINE_SOURCE,
+    BASELINE_ARCHIVE_DAYS,
+    BASELINE_MODE,
+    BASELINE_HALF_LIFE_HOURS,
+    BASELINE_UPDATE_MINUTES,
+    BASELINE_FREEZE_ON_ALERT,
+    STATE_DEGRADED,
+    SEGMENT_MONITORING_ENABLED,
+)
+from app.core.state import get_current_state
+from monitoring.archive import read_archive
+from monitoring.segments import compute_segment_baselines
 
+SNAPSHOT_FIELDS = (
+    "avg_confidence",
+    "low_confidence_rate",
+    "feature_ranges",
+    "missing_value_rates",
+    "feature_sketches",
+)
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
 
-def compute_baseline():
-    db: Session = get_db_session()
 
-    logs = (
-        db.query(PredictionLog)
+def _sample_query(db: Session):
+    """Confidence plus features of the baseline sample, oldest first."""
+    query = (
+        db.query(
+            PredictionLog.confidence_score.label("confidence"),
+            *[feature_value(f).label(f) for f in REQUIRED_FEATURES],
+        )
         .order_by(PredictionLog.timestamp.asc())
-        .limit(BASELINE_SAMPLE_SIZE)
-        .all()
     )
+    if BASELINE_SAMPLE_SIZE > 0:
+        query = query.limit(BASELINE_SAMPLE_SIZE)
+    return query
 
-    if not logs:
-        print("No prediction logs available for baseline")
-        return
 
-    confidences = []
-    low_conf_count = 0
+def _build_sketches(db: Session) -> dict:
+    """
+    One streaming pass over the sample in SCAN_CHUNK_SIZE chunks.
+    Memory is bounded by the chunk size and SKETCH_BINS, not the sample size.
+    """
+    result = db.execute(
+        _sample_query(db).statement.execution_options(yield_per=SCAN_CHUNK_SIZE)
+    )
+    return sketches_from_chunks(
+        result.partitions(), ["confidence"] + REQUIRED_FEATURES, SKETCH_BINS
+    )
+
 
-    feature_ranges = defaultdict(lambda: {"min": float("inf"), "max": float("-inf")})
-    missing_counts = defaultdict(int)
-    total = len(logs)
+def _baseline_from_logs(db: Session):
+    """Aggregate the baseline sample inside the database."""
+    sample = _sample_query(db).subquery()
 
-    for log in logs:
-        confidences.append(log.confidence_score)
+    columns = [
+        func.count(),
+        func.avg(sample.c.confidence),
+        _count_if(sample.c.confidence < LOW_CONFIDENCE_THRESHOLD),
+    ]
+    for f in REQUIRED_FEATURES:
+        columns += [
+            func.min(sample.c[f]),
+            func.max(sample.c[f]),
+            _count_if(sample.c[f].is_(None)),
+        ]
 
-        if log.confidence_score < LOW_CONFIDENCE_THRESHOLD:
-            low_conf_count += 1
+    row = db.query(*columns).one()
+    total, avg_confidence, low_conf_count = row[0], row[1], row[2]
 
-        for k, v in log.input_summary.items():
-            if v is None:
-                missing_counts[k] += 1
-            else:
-                feature_ranges[k]["min"] = min(feature_ranges[k]["min"], v)
-                feature_ranges[k]["max"] = max(feature_ranges[k]["max"], v)
+    if not total:
+        return None
 
-    baseline = BaselineMetrics(
+    feature_ranges = {}
+    missing_value_rates = {}
+    for i, f in enumerate(REQUIRED_FEATURES):
+        min_val, max_val, missing = row[3 + 3 * i: 6 + 3 * i]
+        if min_val is not None:
+            feature_ranges[f] = {"min": min_val, "max": max_val}
+        if missing:
+            missing_value_rates[f] = missing / total
+
+    return BaselineMetrics(
         baseline_id="default",
         sample_size=total,
-        avg_confidence=sum(confidences) / total,
+        avg_confidence=avg_confidence,
         low_confidence_rate=low_conf_count / total,
-        feature_ranges=dict(feature_ranges),
-        missing_value_rates={k: v / total for k, v in missing_counts.items()},
-        category_frequencies={}
+        feature_ranges=feature_ranges,
+        missing_value_rates=missing_value_rates,
+        category_frequencies={},
+        feature_sketches=sketches_to_dict(_build_sketches(db)),
+    )
+
+
+def _baseline_from_archive():
+    """
+    Baseline over every archived prediction of the last BASELINE_ARCHIVE_DAYS days,
+    computed with NumPy directly on the memory-mapped Arrow columns.
+    """
+    end = datetime.utcnow()
+    table = read_archive(
+        end - timedelta(days=BASELINE_ARCHIVE_DAYS),
+        end,
+        columns=["confidence_score"] + REQUIRED_FEATURES,
+    )
+
+    total = table.num_rows
+    if not total:
+        return None
+
+    sketches = new_sketches(SKETCH_BINS)
+    feature_ranges = {}
+    missing_value_rates = {}
+    low_conf_count = 0
+    confidence_sum = 0.0
+
+    for batch in table.to_batches(max_chunksize=SCAN_CHUNK_SIZE):
+        confidences = batch.column("confidence_score").to_numpy(zero_copy_only=False)
+        confidence_sum += float(confidences.sum())
+        low_conf_count += int((confidences < LOW_CONFIDENCE_THRESHOLD).sum())
+        sketches["confidence"].update(confidences)
+
+        for f in REQUIRED_FEATURES:
+            values = batch.column(f).to_numpy(zero_copy_only=False).astype(float)
+            sketches[f].update(values)
+            present = values[~np.isnan(values)]
+            missing = len(values) - len(present)
+            if missing:
+                missing_value_rates[f] = missing_value_rates.get(f, 0) + missing
+            if len(present):
+                lo, hi = float(present.min()), float(present.max())
+                if f in feature_ranges:
+                    lo = min(lo, feature_ranges[f]["min"])
+                    hi = max(hi, feature_ranges[f]["max"])
+                feature_ranges[f] = {"min": lo, "max": hi}
+
+    return BaselineMetrics(
+        baseline_id="default",
+        sample_size=total,
+        avg_confidence=confidence_sum / total,
+        low_confidence_rate=low_conf_count / total,
+        feature_ranges=feature_ranges,
+        missing_value_rates={k: v / total for k, v in missing_value_rates.items()},
+        category_frequencies={},
+        feature_sketches=sketches_to_dict(sketches),
+    )
+
+
+def _publish(db: Session, snapshot: BaselineSnapshot):
+    """Store an immutable snapshot and point the "default" baseline at it (no commit)."""
+    db.add(snapshot)
+    db.flush()  # assigns snapshot.version
+
+    db.merge(BaselineMetrics(
+        baseline_id="default",
+        created_at=snapshot.created_at,
+        sample_size=round(snapshot.sample_size),
+        category_frequencies={},
+        version=snapshot.version,
+        **{f: getattr(snapshot, f) for f in SNAPSHOT_FIELDS},
+    ))
+
+
+# ---- Decayed baseline ----
+#
+# The sufficient statistics are the effective weight W (decayed prediction
+# count) and decayed sums: confidence, low-confidence count, null counts and
+# sketch counts. Each snapshot stores them as W plus the derived averages, so
+# the next update can recover the sums without reading any raw rows.
+
+def _decayed_sums(snapshot: BaselineSnapshot) -> dict:
+    weight = snapshot.sample_size or 0.0
+    return {
+        "weight": weight,
+        "confidence_sum": (snapshot.avg_confidence or 0.0) * weight,
+        "low_confidence_count": (snapshot.low_confidence_rate or 0.0) * weight,
+        "null_counts": {f: r * weight for f, r in (snapshot.missing_value_rates or {}).items()},
+        "sketches": sketches_from_dict(snapshot.feature_sketches),
+    }
+
+
+def _seed_snapshot(db: Session, data_through: datetime) -> BaselineSnapshot:
+    """First decayed snapshot: the current static baseline, or nothing at all."""
+    static = db.get(BaselineMetrics, "default")
+    snapshot = BaselineSnapshot(
+        mode="decayed",
+        data_through=data_through,
+        sample_size=0.0,
+        avg_confidence=0.0,
+        low_confidence_rate=0.0,
+        feature_ranges={},
+        missing_value_rates={},
+        feature_sketches={},
     )
+    if static is not None:
+        snapshot.sample_size = float(static.sample_size or 0)
+        for f in SNAPSHOT_FIELDS:
+            setattr(snapshot, f, getattr(static, f))
+    return snapshot
+
+
+def fold_rollups(previous: BaselineSnapshot, totals: dict, data_through: datetime) -> BaselineSnapshot:
+    """
+    Decay previous by the time elapsed since its data_through and add the
+    rollup totals of [previous.data_through, data_through). Buckets inside
+    one update are not decayed relative to each other.
+    """
+    elapsed_hours = (data_through - previous.data_through).total_seconds() / 3600
+    decay = 0.5 ** (elapsed_hours / BASELINE_HALF_LIFE_HOURS)
+    sums = _decayed_sums(previous)
+
+    weight = decay * sums["weight"] + totals["prediction_count"]
+    confidence_sum = decay * sums["confidence_sum"] + totals["confidence_sum"]
+    low_count = decay * sums["low_confidence_count"] + totals["low_confidence_count"]
+
+    null_counts = {f: decay * n for f, n in sums["null_counts"].items()}
+    for f, n in totals["feature_null_counts"].items():
+        null_counts[f] = null_counts.get(f, 0.0) + n
+
+    sketches = {name: sketch.decayed(decay) for name, sketch in sums["sketches"].items()}
+    for name, sketch in totals["sketches"].items():
+        sketches[name] = sketches[name].merge(sketch) if name in sketches else sketch.decayed(1.0)
 
-    db.merge(baseline)
+    return BaselineSnapshot(
+        mode="decayed",
+        data_through=data_through,
+        sample_size=weight,
+        avg_confidence=confidence_sum / weight if weight else 0.0,
+        low_confidence_rate=low_count / weight if weight else 0.0,
+        feature_ranges=previous.feature_ranges or {},
+        missing_value_rates={f: n / weight for f, n in null_counts.items() if n and weight},
+        feature_sketches=sketches_to_dict(sketches),
+    )
+
+
+def _frozen_copy(previous: BaselineSnapshot, data_through: datetime) -> BaselineSnapshot:
+    return BaselineSnapshot(
+        mode="decayed",
+        data_through=data_through,
+        frozen=True,
+        sample_size=previous.sample_size,
+        **{f: getattr(previous, f) for f in SNAPSHOT_FIELDS},
+    )
+
+
+def _alerting_since(db: Session, since: datetime) -> bool:
+    """
+    True if the system is DEGRADED, was DEGRADED at any point since `since`,
+    or a global incident raised since `since` is still open. An older
+    WARNING alone does not keep the baseline frozen.
+    """
+    if get_current_state(db).current_state == STATE_DEGRADED:
+        return True
+    degraded = (
+        db.query(SystemState)
+        .filter(SystemState.last_updated >= since)
+        .filter(SystemState.current_state == STATE_DEGRADED)
+        .exists()
+    )
+    new_incident = (
+        db.query(Incident)
+        .filter(Incident.detected_at >= since)
+        .filter(Incident.resolved.is_(False))
+        .filter(Incident.segment.is_(None))
+        .exists()
+    )
+    return db.query(degraded).scalar() or db.query(new_incident).scalar()
+
+
+def update_decayed_baseline(db: Session, now: datetime = None) -> str:
+    """
+    Fold the complete rollup buckets since the latest decayed snapshot into a
+    new one once BASELINE_UPDATE_MINUTES of them are available. Cost depends
+    on the update interval, not on how much history the baseline covers.
+    """
+    data_through = bucket_start(now or datetime.utcnow())  # current minute is still open
+
+    previous = (
+        db.query(BaselineSnapshot)
+        .filter_by(mode="decayed")
+        .order_by(BaselineSnapshot.version.desc())
+        .first()
+    )
+    if previous is None:
+        previous = _seed_snapshot(db, data_through - timedelta(minutes=BASELINE_UPDATE_MINUTES))
+
+    if data_through - previous.data_through < timedelta(minutes=BASELINE_UPDATE_MINUTES):
+        return "Decayed baseline is up to date."
+
+    if BASELINE_FREEZE_ON_ALERT and _alerting_since(db, previous.data_through):
+        snapshot = _frozen_copy(previous, data_through)
+        message = "Decayed baseline frozen: DEGRADED or a new open incident during the update interval"
+    else:
+        totals = sum_rollups(db, previous.data_through, data_through - timedelta(minutes=1))
+        snapshot = fold_rollups(previous, totals, data_through)
+        message = f"Folded {totals['prediction_count']} predictions into the decayed baseline"
+
+    _publish(db, snapshot)
     db.commit()
-    db.close()
+    return f"{message} (version {snapshot.version})."
+
+
+def compute_baseline():
+    with session_scope() as db:
+        if BASELINE_MODE == "decayed":
+            print(update_decayed_baseline(db))
+            return
+
+        if BASELINE_SOURCE == "archive":
+            baseline = _baseline_from_archive()
+        else:
+            baseline = _baseline_from_logs(db)
+
+        if baseline is None:
+            print("No prediction logs available for baseline")
+            return
+
+        _publish(db, BaselineSnapshot(
+            mode="static",
+            sample_size=float(baseline.sample_size),
+            **{f: getattr(baseline, f) for f in SNAPSHOT_FIELDS},
+        ))
+        segments = compute_segment_baselines(db) if SEGMENT_MONITORING_ENABLED else 0
+        db.commit()
 
-    print("Baseline computed and stored.")
+    print(f"Baseline computed and stored ({segments} segment baselines).")
 
 if __name__ == "__main__":
-    compute_baseline()
\ No newline at end of file
+    compute_baseline()
@@ -1,59 +1,131 @@
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
-from collections import defaultdict
 
-from app.storage.db import get_db_session
-from app.storage.schemas import PredictionLog, CurrentWindowMetrics
-from app.core.config import LOW_CONFIDENCE_THRESHOLD, CURRENT_WINDOW_MINUTES
+from app.storage.db import session_scope
+from app.storage.schemas import PredictionLog, CurrentWindowMetrics, feature_value
+from app.storage.rollups import window_buckets, sum_rollups
+from app.ml.validation import REQUIRED_FEATURES, FEATURE_RANGES
+from app.ml.sketches import sketches_from_chunks, sketches_to_dict
+from app.core.config import (
+    LOW_CONFIDENCE_THRESHOLD,
+    CURRENT_WINDOW_MINUTES,
+    WINDOW_SOURCE,
+    SKETCH_BINS,
+    SCAN_CHUNK_SIZE,
+)
 
 
-def compute_current_window():
-    db: Session = get_db_session()
+def _window_from_rollups(db: Session, window_end: datetime):
+    """Sum CURRENT_WINDOW_MINUTES per-minute rollup rows; cost is independent of traffic."""
+    first_bucket, last_bucket = window_buckets(window_end, CURRENT_WINDOW_MINUTES)
+    totals = sum_rollups(db, first_bucket, last_bucket)
+
+    count = totals["prediction_count"]
+    if not count:
+        return None
+
+    return CurrentWindowMetrics(
+        window_start=first_bucket,
+        window_end=window_end,
+        prediction_count=count,
+        avg_confidence=totals["confidence_sum"] / count,
+        low_confidence_rate=totals["low_confidence_count"] / count,
+        feature_anomalies={
+            "missing": dict(totals["feature_null_counts"]),
+            "out_of_range": dict(totals["feature_out_of_range_counts"]),
+        },
+        unseen_categories=False,
+        feature_sketches=sketches_to_dict(totals["sketches"]),
+    )
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
 
-    window_end = datetime.now(timezone.utc)
-    window_start = window_end - timedelta(minutes=CURRENT_WINDOW_MINUTES)
 
-    logs = (
-        db.query(PredictionLog)
-        .filter(PredictionLog.timestamp >= window_start)
-        .filter(PredictionLog.timestamp <= window_end)
-        .all()
+def _window_sketches(db: Session, in_window) -> dict:
+    """Stream the window's numeric columns into sketches, chunk by chunk."""
+    query = db.query(
+        PredictionLog.confidence_score,
+        *[feature_value(f) for f in REQUIRED_FEATURES],
+    ).filter(*in_window)
+    result = db.execute(query.statement.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    return sketches_from_chunks(
+        result.partitions(), ["confidence"] + REQUIRED_FEATURES, SKETCH_BINS
     )
 
-    if not logs:
-        print("No prediction logs in current window.")
-        return
 
-    confidences = []
-    low_conf_count = 0
-    feature_anomalies = defaultdict(int)
+def _window_from_logs(db: Session, window_end: datetime):
+    """Aggregate raw logs inside the database; only one row comes back."""
+    window_start = window_end - timedelta(minutes=CURRENT_WINDOW_MINUTES)
+
+    columns = [
+        func.count(),
+        func.avg(PredictionLog.confidence_score),
+        _count_if(PredictionLog.confidence_score < LOW_CONFIDENCE_THRESHOLD),
+    ]
+    for f in REQUIRED_FEATURES:
+        value = feature_value(f)
+        min_val, max_val = FEATURE_RANGES[f]
+        columns += [
+            _count_if(value.is_(None)),
+            _count_if((value < min_val) | (value > max_val)),
+        ]
 
-    for log in logs:
-        confidences.append(log.confidence_score)
+    in_window = (
+        PredictionLog.timestamp >= window_start,
+        PredictionLog.timestamp <= window_end,
+    )
+    row = db.query(*columns).filter(*in_window).one()
+    count, avg_confidence, low_conf_count = row[0], row[1], row[2]
 
-        if log.confidence_score < LOW_CONFIDENCE_THRESHOLD:
-            low_conf_count += 1
+    if not count:
+        return None
 
-        for k, v in log.input_summary.items():
-            if v is None:
-                feature_anomalies[k] += 1
+    missing_counts = {}
+    out_of_range_counts = {}
+    for i, f in enumerate(REQUIRED_FEATURES):
+        missing, out_of_range = row[3 + 2 * i: 5 + 2 * i]
+        if missing:
+            missing_counts[f] = missing
+        if out_of_range:
+            out_of_range_counts[f] = out_of_range
 
-    metrics = CurrentWindowMetrics(
+    return CurrentWindowMetrics(
         window_start=window_start,
         window_end=window_end,
-        prediction_count=len(logs),
-        avg_confidence=sum(confidences) / len(confidences),
-        low_confidence_rate=low_conf_count / len(logs),
-        feature_anomalies=dict(feature_anomalies),
-        unseen_categories=False
+        prediction_count=count,
+        avg_confidence=avg_confidence,
+        low_confidence_rate=low_conf_count / count,
+        feature_anomalies={
+            "missing": missing_counts,
+            "out_of_range": out_of_range_counts,
+        },
+        unseen_categories=False,
+        feature_sketches=sketches_to_dict(_window_sketches(db, in_window)),
     )
 
-    db.add(metrics)
-    db.commit()
-    db.close()
+
+def compute_current_window():
+    # Stored timestamps are naive UTC
+    window_end = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with session_scope() as db:
+        if WINDOW_SOURCE == "rollups":
+            metrics = _window_from_rollups(db, window_end)
+        else:
+            metrics = _window_from_logs(db, window_end)
+
+        if metrics is None:
+            print("No prediction logs in current window.")
+            return
+
+        db.add(metrics)
+        db.commit()
 
     print("Current window metrics stored.")
 
 
 if __name__ == "__main__":
-    compute_current_window()
\ No newline at end of file
+    compute_current_window()
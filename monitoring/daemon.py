@@ -0,0 +1,169 @@
+# monitoring/daemon.py
+"""
+Long-running monitoring process.
+
+Replaces the cron process-per-run model: one interpreter, one SQLAlchemy
+engine and connection pool, and an asyncio scheduler that runs the window,
+baseline, monitor and segment stages in dependency order every
+DAEMON_INTERVAL_SECONDS. Stages run one after another in a worker thread,
+so runs never overlap; ticks missed by a slow run are skipped, not queued.
+
+    python -m monitoring.daemon
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from pathlib import Path
+
+from app.core.config import (
+    DAEMON_INTERVAL_SECONDS,
+    DAEMON_BASELINE_INTERVAL_SECONDS,
+    DAEMON_STATS_PATH,
+    BASELINE_MODE,
+    SEGMENT_MONITORING_ENABLED,
+)
+from app.core.logging import get_logger
+from app.storage.db import get_db_session
+from app.storage.migrations import upgrade_schema
+from app.storage.schemas import BaselineMetrics
+from monitoring.baseline import compute_baseline
+from monitoring.current_window import compute_current_window
+from monitoring.monitor_job import run_monitoring
+from monitoring.segments import run_segment_monitoring
+
+logger = get_logger("daemon")
+
+# name -> {"runs", "failures", "last_ms", "max_ms", "total_ms"}
+STAGE_STATS = {}
+
+
+def _baseline_missing() -> bool:
+    db = get_db_session()
+    try:
+        return db.get(BaselineMetrics, "default") is None
+    finally:
+        db.close()
+
+
+class MonitoringDaemon:
+    def __init__(
+        self,
+        interval: float = DAEMON_INTERVAL_SECONDS,
+        baseline_interval: float = DAEMON_BASELINE_INTERVAL_SECONDS,
+        stats_path: str = DAEMON_STATS_PATH,
+    ):
+        self.interval = interval
+        self.baseline_interval = baseline_interval
+        self.stats_path = Path(stats_path)
+        self._last_baseline = None
+        self._stop = asyncio.Event()
+
+    def _baseline_due(self) -> bool:
+        if BASELINE_MODE == "decayed":
+            return True  # the update itself waits for BASELINE_UPDATE_MINUTES of new rollups
+        # Retried every tick until there are logs to build one from
+        if _baseline_missing():
+            return True
+        return (
+            self.baseline_interval > 0
+            and (
+                self._last_baseline is None
+                or time.monotonic() - self._last_baseline >= self.baseline_interval
+            )
+        )
+
+    async def _run_stage(self, name: str, fn) -> bool:
+        stats = STAGE_STATS.setdefault(
+            name, {"runs": 0, "failures": 0, "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0}
+        )
+        start = time.perf_counter()
+        ok = True
+        try:
+            await asyncio.to_thread(fn)
+        except Exception as e:
+            ok = False
+            stats["failures"] += 1
+            logger.error("stage_failed", extra={"extra_data": {"stage": name, "error": str(e)}})
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats["runs"] += 1
+        stats["last_ms"] = elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["total_ms"] += elapsed_ms
+        return ok
+
+    async def run_once(self):
+        start = time.perf_counter()
+
+        # Baseline first when it is missing, so the first monitor run can compare
+        if self._baseline_due():
+            # compute_baseline returns quietly when there are no logs yet
+            if await self._run_stage("baseline", compute_baseline) and not _baseline_missing():
+                self._last_baseline = time.monotonic()
+
+        # The monitor stage reads the window row the previous stage just wrote
+        if await self._run_stage("window", compute_current_window):
+            await self._run_stage("monitor", run_monitoring)
+        if SEGMENT_MONITORING_ENABLED:
+            await self._run_stage("segments", run_segment_monitoring)
+
+        cycle_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            "monitoring_cycle",
+            extra={"extra_data": {
+                "cycle_ms": cycle_ms,
+                "stages": {name: s["last_ms"] for name, s in STAGE_STATS.items()},
+            }}
+        )
+        self._write_stats(cycle_ms)
+
+    def _write_stats(self, cycle_ms: float):
+        """Publish stage timings for the serving process (atomic replace)."""
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.stats_path.with_name(self.stats_path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "updated_at": time.time(),
+            "interval_seconds": self.interval,
+            "last_cycle_ms": cycle_ms,
+            "stages": STAGE_STATS,
+        }))
+        os.replace(tmp, self.stats_path)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except NotImplementedError:  # Windows
+                pass
+
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            await self.run_once()
+
+            next_tick += self.interval
+            now = time.monotonic()
+            if now > next_tick:
+                skipped = int((now - next_tick) // self.interval) + 1
+                logger.warning("monitoring_ticks_skipped", extra={"extra_data": {"skipped": skipped}})
+                next_tick += skipped * self.interval
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=next_tick - now)
+            except asyncio.TimeoutError:
+                pass
+
+        print("Monitoring daemon stopped.")
+
+
+def main():
+    upgrade_schema()
+    print(f"Monitoring daemon started (every {DAEMON_INTERVAL_SECONDS}s).")
+    asyncio.run(MonitoringDaemon().run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,57 @@
+from dataclasses import dataclass
+
 from app.core.config import (
     MAX_CONFIDENCE_DROP,
     MAX_LOW_CONFIDENCE_INCREASE,
+    DRIFT_PSI_WARNING,
+    DRIFT_PSI_CRITICAL,
+    DRIFT_MIN_PREDICTIONS,
+    DRIFT_CRITICAL_DEGRADES,
     STATE_NORMAL,
     STATE_WARNING,
     STATE_DEGRADED,
 )
+from app.ml.sketches import sketches_from_dict
+from app.ml.validation import REQUIRED_FEATURES
+from monitoring.drift import compute_drift
+
+
+@dataclass(frozen=True)
+class DeviationThresholds:
+    max_confidence_drop: float = MAX_CONFIDENCE_DROP
+    max_low_confidence_increase: float = MAX_LOW_CONFIDENCE_INCREASE
+    drift_psi_warning: float = DRIFT_PSI_WARNING
+    drift_psi_critical: float = DRIFT_PSI_CRITICAL
+    drift_min_predictions: int = DRIFT_MIN_PREDICTIONS
+    drift_critical_degrades: bool = DRIFT_CRITICAL_DEGRADES
+
+
+DEFAULT_THRESHOLDS = DeviationThresholds()
+
+# Input features only: confidence has its own thresholds above, and a
+# confidence sketch shift must not bypass them as "feature drift"
+DRIFT_SKETCHES = frozenset(REQUIRED_FEATURES)
+
+
+def feature_drift(baseline, current, min_predictions: int = DRIFT_MIN_PREDICTIONS) -> dict:
+    """Per-feature PSI / KS / Wasserstein between baseline and window input-feature sketches."""
+    if (current.prediction_count or 0) < min_predictions:
+        return {}
 
+    base_sketches = sketches_from_dict(getattr(baseline, "feature_sketches", None))
+    cur_sketches = sketches_from_dict(getattr(current, "feature_sketches", None))
 
-def evaluate_deviation(baseline, current):
+    return compute_drift({
+        name: (base_sketches[name], cur_sketches[name])
+        for name in base_sketches
+        if name in cur_sketches and name in DRIFT_SKETCHES
+    })
+
+
+def evaluate_deviation(baseline, current, thresholds: DeviationThresholds = DEFAULT_THRESHOLDS, drift: dict = None):
     """
     Returns: (state, trigger_signals, reason)
+    `drift` skips the sketch comparison when the caller already has it (replay).
     """
 
     signals = {}
@@ -22,23 +64,41 @@ def evaluate_deviation(baseline, current):
     low_conf_increase = current.low_confidence_rate - baseline.low_confidence_rate
     signals["low_confidence_increase"] = low_conf_increase
 
+    # Input feature drift
+    if drift is None:
+        drift = feature_drift(baseline, current, thresholds.drift_min_predictions)
+    if drift:
+        signals["feature_drift"] = drift
+
     critical = False
     warning = False
 
-    if confidence_drop > MAX_CONFIDENCE_DROP:
+    if confidence_drop > thresholds.max_confidence_drop:
         warning = True
-    if low_conf_increase > MAX_LOW_CONFIDENCE_INCREASE:
+    if low_conf_increase > thresholds.max_low_confidence_increase:
         warning = True
 
-    if confidence_drop > MAX_CONFIDENCE_DROP * 2:
+    if confidence_drop > thresholds.max_confidence_drop * 2:
         critical = True
-    if low_conf_increase > MAX_LOW_CONFIDENCE_INCREASE * 2:
+    if low_conf_increase > thresholds.max_low_confidence_increase * 2:
         critical = True
 
+    drifted = sorted(f for f, stats in drift.items() if stats["psi"] > thresholds.drift_psi_warning)
+    severe_drift = [f for f in drifted if drift[f]["psi"] > thresholds.drift_psi_critical]
+
     if critical:
         return STATE_DEGRADED, signals, "Severe sustained confidence degradation"
 
+    if severe_drift and thresholds.drift_critical_degrades:
+        return STATE_DEGRADED, signals, f"Severe feature distribution drift: {', '.join(severe_drift)}"
+
     if warning:
         return STATE_WARNING, signals, "Moderate deviation from baseline"
 
-    return STATE_NORMAL, signals, "Within normal range"
\ No newline at end of file
+    if severe_drift:
+        return STATE_WARNING, signals, f"Severe feature distribution drift: {', '.join(severe_drift)}"
+
+    if drifted:
+        return STATE_WARNING, signals, f"Feature distribution drift: {', '.join(drifted)}"
+
+    return STATE_NORMAL, signals, "Within normal range"
@@ -0,0 +1,100 @@
+# monitoring/feature_backfill.py
+"""
+Move logged features from the JSON input_summary into the typed columns.
+
+Rows written before typed feature storage keep their features only in
+input_summary. This copies them into feature_1..3 and, unless --keep-json
+is given, removes them from the JSON so it holds only the remaining keys
+(NULL when none are left). Rows are processed in id ranges of --chunk-size,
+each in its own short transaction, so the API keeps writing meanwhile and
+an interrupted run can simply be restarted.
+
+    python -m monitoring.feature_backfill
+    python -m monitoring.retention --enable-incremental-vacuum   # SQLite: return the space
+
+Readers coalesce typed and JSON values, so monitoring is correct before,
+during and after the backfill.
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, or_, update
+
+from app.core.config import RETENTION_CHUNK_SIZE
+from app.ml.validation import REQUIRED_FEATURES
+from app.storage.db import get_db_session
+from app.storage.schemas import PredictionLog
+
+
+def _typed_row(row, keep_json: bool) -> dict:
+    summary = dict(row.input_summary or {})
+    values = {}
+    for f in REQUIRED_FEATURES:
+        value = summary.get(f)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[f] = float(value)
+            if not keep_json:
+                del summary[f]
+    if not keep_json:
+        values["input_summary"] = summary or None
+    return values
+
+
+def backfill_features(chunk_size: int = RETENTION_CHUNK_SIZE, keep_json: bool = False) -> int:
+    db = get_db_session()
+    first_id, last_id = db.query(func.min(PredictionLog.id), func.max(PredictionLog.id)).one()
+    db.close()
+    if first_id is None:
+        print("No prediction logs to backfill.")
+        return 0
+
+    # Rows still in the JSON layout; typed rows have no feature keys left to move
+    pending = or_(*[getattr(PredictionLog, f).is_(None) for f in REQUIRED_FEATURES])
+
+    table = PredictionLog.__table__
+    updated = 0
+    start = time.perf_counter()
+    for low in range(first_id, last_id + 1, chunk_size):
+        db = get_db_session()
+        t0 = time.perf_counter()
+        rows = (
+            db.query(PredictionLog.id, PredictionLog.input_summary)
+            .filter(PredictionLog.id >= low, PredictionLog.id < low + chunk_size)
+            .filter(PredictionLog.input_summary.is_not(None), pending)
+            .all()
+        )
+        # One executemany per distinct set of updated columns
+        groups = defaultdict(list)
+        for row in rows:
+            values = _typed_row(row, keep_json)
+            if values:
+                groups[tuple(sorted(values))].append(
+                    {"row_id": row.id, **{f"new_{k}": v for k, v in values.items()}}
+                )
+        for columns, params in groups.items():
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values({k: bindparam(f"new_{k}") for k in columns})
+            )
+            db.execute(stmt, params)
+        db.commit()
+        db.close()
+
+        updated += len(rows)
+        if rows:
+            print(f"ids {low}..{low + chunk_size - 1}: {len(rows)} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    print(f"Backfilled typed features for {updated} prediction logs in {time.perf_counter() - start:.1f} s.")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy JSON features of prediction_logs into typed columns")
+    parser.add_argument("--chunk-size", type=int, default=RETENTION_CHUNK_SIZE)
+    parser.add_argument("--keep-json", action="store_true",
+                        help="Leave the features in input_summary as well (no space is reclaimed)")
+    args = parser.parse_args()
+    backfill_features(args.chunk_size, args.keep_json)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import uuid
 from sqlalchemy.orm import Session
 
-from app.storage.db import get_db_session
+from app.storage.db import session_scope
 from app.storage.schemas import (
     BaselineMetrics,
     CurrentWindowMetrics,
@@ -14,9 +14,52 @@ from monitoring.deviation import evaluate_deviation
 RECOVERY_REQUIRED_RUNS = 2  # deterministic, explainable
 
 
+def next_action(current_state: str, new_state: str, healthy_runs: int,
+                recovery_required_runs: int = RECOVERY_REQUIRED_RUNS) -> str:
+    """
+    State-transition rule shared with monitoring.replay and monitoring.segments.
+    healthy_runs: consecutive NORMAL verdicts, up to and including this one,
+    on windows that started after the last escalation.
+    Returns "incident", "recover", "pending_recovery" or "none".
+    """
+    if new_state != current_state and new_state != "NORMAL":
+        return "incident"
+    if current_state != "NORMAL" and new_state == "NORMAL":
+        # WARNING expires the same way, so it never sticks (or freezes the baseline) for good
+        if healthy_runs >= recovery_required_runs:
+            return "recover"
+        return "pending_recovery"
+    return "none"
+
+
+def healthy_runs_since(db: Session, baseline, since, limit: int = RECOVERY_REQUIRED_RUNS) -> int:
+    """
+    Consecutive NORMAL verdicts over the newest stored windows that started
+    at or after `since` (the escalation), newest first, looking at no more
+    than `limit` windows. Windows that overlap the escalation, and incidents
+    raised by the streaming detector, never count towards recovery.
+    """
+    windows = (
+        db.query(CurrentWindowMetrics)
+        .filter(CurrentWindowMetrics.window_start >= since)
+        .order_by(CurrentWindowMetrics.window_end.desc())
+        .limit(limit)
+        .all()
+    )
+    runs = 0
+    for window in windows:
+        if evaluate_deviation(baseline, window)[0] != "NORMAL":
+            break
+        runs += 1
+    return runs
+
+
 def run_monitoring():
-    db: Session = get_db_session()
+    with session_scope() as db:
+        _run_monitoring(db)
+
 
+def _run_monitoring(db: Session):
     baseline = db.query(BaselineMetrics).filter_by(baseline_id="default").first()
     current = (
         db.query(CurrentWindowMetrics)
@@ -31,10 +74,16 @@ def run_monitoring():
     new_state, signals, reason = evaluate_deviation(baseline, current)
     current_state = get_current_state(db)
 
+    healthy_runs = 0
+    if current_state.current_state != "NORMAL" and new_state == "NORMAL":
+        healthy_runs = healthy_runs_since(db, baseline, current_state.last_updated)
+
+    action = next_action(current_state.current_state, new_state, healthy_runs)
+
     # ----------------------------
     # CASE 1: Degradation detected
     # ----------------------------
-    if new_state != current_state.current_state and new_state != "NORMAL":
+    if action == "incident":
         set_system_state(new_state, reason, db)
 
         incident = Incident(
@@ -44,6 +93,7 @@ def run_monitoring():
             decision_reason=reason,
             fallback_activated=(new_state == "DEGRADED"),
             resolved=False,
+            baseline_version=baseline.version,
         )
         db.add(incident)
         db.commit()
@@ -53,29 +103,25 @@ def run_monitoring():
     # ----------------------------
     # CASE 2: Recovery detection
     # ----------------------------
-    elif current_state.current_state == "DEGRADED" and new_state == "NORMAL":
-        open_incidents = (
+    elif action == "recover":
+        set_system_state("NORMAL", "Recovered after sustained stability", db)
+
+        (
             db.query(Incident)
             .filter_by(resolved=False)
-            .all()
+            .filter(Incident.segment.is_(None))  # segment incidents belong to monitoring.segments
+            .update({"resolved": True}, synchronize_session=False)
         )
 
-        if len(open_incidents) >= RECOVERY_REQUIRED_RUNS:
-            set_system_state("NORMAL", "Recovered after sustained stability", db)
-
-            for incident in open_incidents:
-                incident.resolved = True
+        db.commit()
+        print("System recovered. Fallback disabled. Incidents resolved.")
 
-            db.commit()
-            print("System recovered. Fallback disabled. Incidents resolved.")
-        else:
-            print("Recovery signal detected but not yet stable.")
+    elif action == "pending_recovery":
+        print("Recovery signal detected but not yet stable.")
 
     else:
         print("No state change.")
 
-    db.close()
-
 
 if __name__ == "__main__":
     run_monitoring()
\ No newline at end of file
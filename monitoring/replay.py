@@ -0,0 +1,417 @@
+# monitoring/replay.py
+"""
+Offline replay / backtest of the monitoring loop.
+
+Loads a slice of prediction_logs (or the Arrow archive) into NumPy arrays
+once and folds it into per-minute buckets, the same granularity as
+prediction_rollups. Cumulative sums over the buckets give the metrics and
+sketch counts of every sliding window in O(1) per position, and drift for
+all positions comes out of one drift_matrix call per feature. Each
+position is then judged by the real evaluate_deviation and next_action,
+so the replayed state timeline and incidents follow monitor_job exactly:
+
+- a tick fires every --step-minutes and looks at the last
+  CURRENT_WINDOW_MINUTES complete minutes;
+- an empty window stores nothing, so the monitor re-judges the latest
+  stored window, as it does in production.
+
+Threshold grids are swept across processes; the window series is built
+once and shared with the workers.
+
+    python -m monitoring.replay --start 2026-09-01 --end 2026-10-01
+    python -m monitoring.replay --start 2026-09-01 --end 2026-10-01 \\
+        --grid max_confidence_drop=0.1,0.15,0.2 --grid recovery_required_runs=1,2,3
+"""
+
+import argparse
+import itertools
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.core.config import (
+    CURRENT_WINDOW_MINUTES,
+    DRIFT_WORKERS,
+    LOW_CONFIDENCE_THRESHOLD,
+    SCAN_CHUNK_SIZE,
+    SKETCH_BINS,
+    STATE_NORMAL,
+    STATE_DEGRADED,
+)
+from app.ml.sketches import sketches_from_dict, sketches_from_values
+from app.ml.validation import REQUIRED_FEATURES
+from app.storage.db import get_db_session
+from app.storage.migrations import upgrade_schema
+from app.storage.schemas import BaselineMetrics, PredictionLog
+from monitoring.archive import read_archive
+from monitoring.deviation import DeviationThresholds, DEFAULT_THRESHOLDS, DRIFT_SKETCHES, evaluate_deviation
+from monitoring.drift import _counts, drift_matrix
+from monitoring.monitor_job import RECOVERY_REQUIRED_RUNS, next_action
+
+BUCKET = np.timedelta64(1, "m")
+
+
+@dataclass
+class ReplaySlice:
+    start: datetime
+    end: datetime
+    timestamps: np.ndarray   # datetime64[us]
+    confidence: np.ndarray
+    features: dict           # name -> float array, NaN = missing
+
+
+@dataclass
+class WindowSeries:
+    """Threshold-independent metrics for every tick."""
+    tick_times: list
+    counts: np.ndarray
+    avg_confidence: np.ndarray
+    low_confidence_rate: np.ndarray
+    drift: dict              # sketch name -> {"psi", "ks", "wasserstein", "valid"} arrays
+    step_minutes: int
+    window_minutes: int = CURRENT_WINDOW_MINUTES
+
+    def drift_at(self, k: int) -> dict:
+        return {
+            name: {stat: float(values[stat][k]) for stat in ("psi", "ks", "wasserstein")}
+            for name, values in self.drift.items()
+            if values["valid"][k]
+        }
+
+
+# ---- Loading ----
+
+def _as_float(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def load_from_logs(start: datetime, end: datetime) -> ReplaySlice:
+    db = get_db_session()
+    query = (
+        db.query(
+            PredictionLog.timestamp,
+            PredictionLog.confidence_score,
+            PredictionLog.input_summary,
+            *[getattr(PredictionLog, f) for f in REQUIRED_FEATURES],
+        )
+        .filter(PredictionLog.timestamp >= start)
+        .filter(PredictionLog.timestamp < end)
+    )
+
+    timestamps, confidence = [], []
+    features = {f: [] for f in REQUIRED_FEATURES}
+    result = db.execute(query.statement.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    for chunk in result.partitions():
+        for ts, conf, summary, *typed in chunk:
+            timestamps.append(ts)
+            confidence.append(conf)
+            summary = summary or {}
+            for f, value in zip(REQUIRED_FEATURES, typed):
+                features[f].append(value if value is not None else _as_float(summary.get(f)))
+    db.close()
+
+    return ReplaySlice(
+        start=start,
+        end=end,
+        timestamps=np.array(timestamps, dtype="datetime64[us]"),
+        confidence=np.array(confidence, dtype=float),
+        features={f: np.array(v, dtype=float) for f, v in features.items()},
+    )
+
+
+def load_from_archive(start: datetime, end: datetime) -> ReplaySlice:
+    table = read_archive(start, end, columns=["confidence_score"] + REQUIRED_FEATURES)
+    return ReplaySlice(
+        start=start,
+        end=end,
+        timestamps=table["timestamp"].to_numpy().astype("datetime64[us]"),
+        confidence=table["confidence_score"].to_numpy().astype(float),
+        features={f: table[f].to_numpy(zero_copy_only=False).astype(float) for f in REQUIRED_FEATURES},
+    )
+
+
+def load_stored_baseline():
+    db = get_db_session()
+    row = db.query(BaselineMetrics).filter_by(baseline_id="default").first()
+    db.close()
+    if row is None:
+        return None
+    return SimpleNamespace(
+        avg_confidence=row.avg_confidence,
+        low_confidence_rate=row.low_confidence_rate,
+        feature_sketches=row.feature_sketches,
+    )
+
+
+def baseline_from_slice(data: ReplaySlice, hours: float):
+    """Baseline over the first `hours` of the slice, the way compute_baseline summarizes logs."""
+    cutoff = np.datetime64(data.start, "us") + np.timedelta64(int(hours * 3600), "s")
+    head = data.timestamps < cutoff
+    if not head.any():
+        return None
+    confidence = data.confidence[head]
+    columns = {f: values[head] for f, values in data.features.items()}
+    columns["confidence"] = confidence
+    return SimpleNamespace(
+        avg_confidence=float(confidence.mean()),
+        low_confidence_rate=float((confidence < LOW_CONFIDENCE_THRESHOLD).mean()),
+        feature_sketches={
+            name: sketch.to_dict()
+            for name, sketch in sketches_from_values(columns, SKETCH_BINS).items()
+        },
+    )
+
+
+# ---- Window series ----
+
+def _window_sums(per_bucket: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    cumulative = np.concatenate([np.zeros((1,) + per_bucket.shape[1:]), np.cumsum(per_bucket, axis=0)])
+    return cumulative[ends] - cumulative[ends - window]
+
+
+def window_series(data: ReplaySlice, baseline, window_minutes: int = CURRENT_WINDOW_MINUTES,
+                  step_minutes: int = 5) -> WindowSeries:
+    n_buckets = int(np.ceil((data.end - data.start) / timedelta(minutes=1)))
+    bucket = ((data.timestamps - np.datetime64(data.start, "us")) // BUCKET).astype(np.int64)
+
+    # A tick after bucket e - 1 closes sees buckets [e - window, e)
+    ends = np.arange(window_minutes, n_buckets + 1, step_minutes)
+    tick_times = [data.start + timedelta(minutes=int(e)) for e in ends]
+
+    counts = _window_sums(np.bincount(bucket, minlength=n_buckets), ends, window_minutes)
+    confidence_sum = _window_sums(
+        np.bincount(bucket, weights=data.confidence, minlength=n_buckets), ends, window_minutes
+    )
+    low_count = _window_sums(
+        np.bincount(bucket, weights=data.confidence < LOW_CONFIDENCE_THRESHOLD, minlength=n_buckets),
+        ends, window_minutes,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_confidence = confidence_sum / counts
+        low_confidence_rate = low_count / counts
+
+    values = dict(data.features, confidence=data.confidence)
+    drift = {}
+    for name, base_sketch in sketches_from_dict(baseline.feature_sketches).items():
+        if name not in values or name not in DRIFT_SKETCHES or base_sketch.total == 0:
+            continue
+        codes = base_sketch.bin_codes(values[name])
+        present = codes >= 0
+        width = base_sketch.bins + 2
+        per_bucket = np.bincount(
+            bucket[present] * width + codes[present], minlength=n_buckets * width
+        ).reshape(n_buckets, width)
+
+        current = _window_sums(per_bucket, ends, window_minutes)
+        reference = np.broadcast_to(_counts(base_sketch), current.shape)
+        stats = drift_matrix(reference, current)
+        stats["valid"] = current.sum(axis=1) > 0
+        drift[name] = stats
+
+    return WindowSeries(
+        tick_times=tick_times,
+        counts=counts.astype(np.int64),
+        avg_confidence=avg_confidence,
+        low_confidence_rate=low_confidence_rate,
+        drift=drift,
+        step_minutes=step_minutes,
+        window_minutes=window_minutes,
+    )
+
+
+# ---- Simulation ----
+
+def simulate(series: WindowSeries, baseline, thresholds: DeviationThresholds = DEFAULT_THRESHOLDS,
+             recovery_required_runs: int = RECOVERY_REQUIRED_RUNS,
+             initial_state: str = STATE_NORMAL) -> dict:
+    state = initial_state
+    open_incidents = []
+    incidents = []
+    timeline = []
+    state_minutes = Counter()
+    latest = None  # index of the latest stored (non-empty) window
+    escalated_at = series.tick_times[0] if series.tick_times else None
+    healthy_runs = 0  # see monitor_job.healthy_runs_since
+
+    for k, tick in enumerate(series.tick_times):
+        fresh = series.counts[k] > 0
+        if fresh:
+            latest = k
+
+        if latest is not None:
+            count = int(series.counts[latest])
+            current = SimpleNamespace(
+                avg_confidence=float(series.avg_confidence[latest]),
+                low_confidence_rate=float(series.low_confidence_rate[latest]),
+                prediction_count=count,
+            )
+            drift = series.drift_at(latest) if count >= thresholds.drift_min_predictions else {}
+            new_state, signals, reason = evaluate_deviation(baseline, current, thresholds, drift)
+
+            if new_state != STATE_NORMAL:
+                healthy_runs = 0
+            elif fresh and tick - timedelta(minutes=series.window_minutes) >= escalated_at:
+                healthy_runs += 1
+
+            action = next_action(state, new_state, healthy_runs, recovery_required_runs)
+            if action == "incident":
+                state = new_state
+                escalated_at = tick
+                healthy_runs = 0
+                incident = {
+                    "detected_at": tick.isoformat(),
+                    "severity": new_state,
+                    "decision_reason": reason,
+                    "trigger_signals": signals,
+                    "fallback_activated": new_state == STATE_DEGRADED,
+                    "resolved_at": None,
+                }
+                incidents.append(incident)
+                open_incidents.append(incident)
+                timeline.append({"at": tick.isoformat(), "state": state, "reason": reason})
+            elif action == "recover":
+                state = STATE_NORMAL
+                for incident in open_incidents:
+                    incident["resolved_at"] = tick.isoformat()
+                open_incidents = []
+                timeline.append({
+                    "at": tick.isoformat(), "state": state, "reason": "Recovered after sustained stability"
+                })
+
+        state_minutes[state] += series.step_minutes
+
+    return {
+        "incidents": incidents,
+        "timeline": timeline,
+        "summary": {
+            "ticks": len(series.tick_times),
+            "incidents": len(incidents),
+            "incidents_by_severity": dict(Counter(i["severity"] for i in incidents)),
+            "state_changes": len(timeline),
+            "minutes_by_state": dict(state_minutes),
+            "open_at_end": len(open_incidents),
+        },
+    }
+
+
+# ---- Grid sweep ----
+
+_worker_inputs = None
+
+
+def _init_worker(series, baseline):
+    global _worker_inputs
+    _worker_inputs = (series, baseline)
+
+
+def _run_point(params: dict) -> dict:
+    series, baseline = _worker_inputs
+    params = dict(params)
+    recovery_runs = params.pop("recovery_required_runs", RECOVERY_REQUIRED_RUNS)
+    thresholds = replace(DEFAULT_THRESHOLDS, **params)
+    result = simulate(series, baseline, thresholds, recovery_runs)
+    return result["summary"]
+
+
+def sweep(series: WindowSeries, baseline, grid: dict, workers: int = DRIFT_WORKERS) -> list:
+    """Simulate every combination in grid ({param: [values]}); returns (params, summary) pairs."""
+    names = list(grid)
+    points = [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+    if workers <= 1 or len(points) == 1:
+        _init_worker(series, baseline)
+        summaries = [_run_point(p) for p in points]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(points)),
+            initializer=_init_worker,
+            initargs=(series, baseline),
+        ) as pool:
+            summaries = list(pool.map(_run_point, points))
+
+    return list(zip(points, summaries))
+
+
+GRID_PARAMS = {f.name: f.type for f in fields(DeviationThresholds)}
+GRID_PARAMS["recovery_required_runs"] = int
+
+
+def _parse_grid(items: list) -> dict:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in GRID_PARAMS:
+            raise SystemExit(f"Unknown grid parameter {name!r}; choose from {sorted(GRID_PARAMS)}")
+        cast = int if GRID_PARAMS[name] in (int, "int") else float
+        grid[name] = [cast(v) for v in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay monitoring over historical prediction logs")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--days", type=float, default=30, help="Slice length when --start is omitted")
+    parser.add_argument("--source", choices=("logs", "archive"), default="logs")
+    parser.add_argument("--window-minutes", type=int, default=CURRENT_WINDOW_MINUTES)
+    parser.add_argument("--step-minutes", type=int, default=5, help="Monitoring interval being simulated")
+    parser.add_argument("--baseline-hours", type=float, default=None,
+                        help="Build the baseline from the first N hours of the slice instead of the stored one")
+    parser.add_argument("--grid", action="append", default=[], metavar="PARAM=V1,V2,...")
+    parser.add_argument("--workers", type=int, default=DRIFT_WORKERS)
+    parser.add_argument("--output", default=None, help="Write the full result as JSON")
+    args = parser.parse_args()
+
+    end = args.end or datetime.utcnow()
+    start = args.start or end - timedelta(days=args.days)
+
+    upgrade_schema()
+
+    t0 = time.perf_counter()
+    data = load_from_archive(start, end) if args.source == "archive" else load_from_logs(start, end)
+    t_load = time.perf_counter() - t0
+
+    baseline = baseline_from_slice(data, args.baseline_hours) if args.baseline_hours else load_stored_baseline()
+    if baseline is None:
+        raise SystemExit("No baseline available (store one, or pass --baseline-hours)")
+
+    t0 = time.perf_counter()
+    series = window_series(data, baseline, args.window_minutes, args.step_minutes)
+    t_windows = time.perf_counter() - t0
+
+    print(
+        f"Loaded {len(data.timestamps):,} predictions in {t_load:.2f}s; "
+        f"{len(series.tick_times):,} window positions in {t_windows:.2f}s."
+    )
+
+    t0 = time.perf_counter()
+    if args.grid:
+        results = sweep(series, baseline, _parse_grid(args.grid), args.workers)
+        print(f"Swept {len(results)} threshold combinations in {time.perf_counter() - t0:.2f}s.")
+        for params, summary in sorted(results, key=lambda r: r[1]["incidents"]):
+            settings = ", ".join(f"{k}={v}" for k, v in params.items())
+            print(
+                f"{settings:<70} incidents {summary['incidents']:>4}  "
+                f"degraded {summary['minutes_by_state'].get(STATE_DEGRADED, 0):>6} min"
+            )
+        output = [{"params": p, "summary": s} for p, s in results]
+    else:
+        output = simulate(series, baseline)
+        print(f"Simulated in {time.perf_counter() - t0:.2f}s.")
+        for change in output["timeline"]:
+            print(f"{change['at']}  {change['state']:<9} {change['reason']}")
+        print(json.dumps(output["summary"], indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,166 @@
+# monitoring/retention.py
+"""
+Retention and compaction for the ever-growing tables.
+
+Rows older than the per-table retention are deleted in chunks of
+RETENTION_CHUNK_SIZE, each in its own short transaction, so live
+predictions never wait long on the write lock. On SQLite the freed pages
+are then returned to the filesystem with an incremental vacuum.
+
+Raw prediction_logs are not handled here: monitoring.archive exports
+them and deletes the exported rows, so ARCHIVE_AFTER_HOURS is their
+lifetime in the database.
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, tuple_
+
+from app.storage.db import engine, get_db_session
+from app.storage.schemas import (
+    PredictionRollup,
+    CurrentWindowMetrics,
+    SystemState,
+    BaselineMetrics,
+    BaselineSnapshot,
+    Incident,
+)
+from app.core.config import (
+    RETENTION_ROLLUPS_DAYS,
+    RETENTION_WINDOW_METRICS_DAYS,
+    RETENTION_SYSTEM_STATE_DAYS,
+    RETENTION_BASELINE_SNAPSHOTS_DAYS,
+    RETENTION_CHUNK_SIZE,
+)
+
+# (model, timestamp column, retention in days); <= 0 keeps rows forever.
+POLICIES = [
+    (PredictionRollup, PredictionRollup.bucket_start, RETENTION_ROLLUPS_DAYS),
+    (CurrentWindowMetrics, CurrentWindowMetrics.window_end, RETENTION_WINDOW_METRICS_DAYS),
+    (SystemState, SystemState.last_updated, RETENTION_SYSTEM_STATE_DAYS),
+    (BaselineSnapshot, BaselineSnapshot.created_at, RETENTION_BASELINE_SNAPSHOTS_DAYS),
+]
+
+
+def _is_sqlite():
+    return engine.dialect.name == "sqlite"
+
+
+def _sqlite_pragma(name: str) -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def _database_bytes() -> int:
+    return _sqlite_pragma("page_count") * _sqlite_pragma("page_size")
+
+
+def purge_table(model, ts_column, days: int, chunk_size: int = RETENTION_CHUNK_SIZE) -> int:
+    """Delete rows older than `days` in bounded chunks; returns rows deleted."""
+    if days <= 0:
+        return 0
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    pk = list(model.__table__.primary_key.columns)
+
+    candidates = select(*pk).where(ts_column < cutoff)
+    if model is SystemState:
+        # The latest state row is the live state; never purge it
+        latest = select(SystemState.id).order_by(SystemState.last_updated.desc()).limit(1)
+        candidates = candidates.where(SystemState.id.not_in(latest.scalar_subquery()))
+    if model is BaselineSnapshot:
+        # Incidents refer to the version they were judged against, and the
+        # latest decayed snapshot carries the running statistics
+        latest = select(func.coalesce(func.max(BaselineSnapshot.version), 0)).where(BaselineSnapshot.mode == "decayed")
+        candidates = candidates.where(
+            BaselineSnapshot.version.not_in(
+                select(Incident.baseline_version).where(Incident.baseline_version.is_not(None))
+            ),
+            BaselineSnapshot.version.not_in(
+                select(BaselineMetrics.version).where(BaselineMetrics.version.is_not(None))
+            ),
+            BaselineSnapshot.version.not_in(latest.scalar_subquery()),
+        )
+    candidates = candidates.order_by(ts_column).limit(chunk_size)
+
+    table = model.__tablename__
+    deleted = 0
+    chunk = 0
+    while True:
+        db = get_db_session()
+        start = time.perf_counter()
+        keys = db.execute(candidates).all()
+        if keys:
+            (
+                db.query(model)
+                .filter(tuple_(*pk).in_([tuple(k) for k in keys]))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        db.close()
+
+        if not keys:
+            break
+
+        chunk += 1
+        deleted += len(keys)
+        print(f"{table}: chunk {chunk} deleted {len(keys)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        if len(keys) < chunk_size:
+            break
+
+    return deleted
+
+
+def incremental_vacuum(enable: bool = False):
+    """Return free pages to the filesystem (SQLite only)."""
+    if not _is_sqlite():
+        return
+
+    if _sqlite_pragma("auto_vacuum") != 2:
+        if not enable:
+            print("SQLite auto_vacuum is not INCREMENTAL; rerun with --enable-incremental-vacuum "
+                  "once (performs a full VACUUM) to make space reclaimable.")
+            return
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # The pragma frees one page per step and execute() only steps once;
+        # executescript() runs it to completion.
+        conn.connection.dbapi_connection.executescript("PRAGMA incremental_vacuum;")
+
+
+def run_retention(enable_incremental_vacuum: bool = False):
+    sqlite = _is_sqlite()
+    size_before = _database_bytes() if sqlite else None
+    start = time.perf_counter()
+
+    for model, ts_column, days in POLICIES:
+        t0 = time.perf_counter()
+        deleted = purge_table(model, ts_column, days)
+        print(f"{model.__tablename__}: {deleted} rows older than {days} days removed "
+              f"in {time.perf_counter() - t0:.2f} s")
+
+    if sqlite:
+        t0 = time.perf_counter()
+        incremental_vacuum(enable_incremental_vacuum)
+        reclaimed = size_before - _database_bytes()
+        print(f"Vacuum took {time.perf_counter() - t0:.2f} s, reclaimed {reclaimed} bytes.")
+
+    print(f"Retention finished in {time.perf_counter() - start:.2f} s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply table retention policies")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Switch an existing SQLite database to auto_vacuum=INCREMENTAL (runs a full VACUUM once)",
+    )
+    args = parser.parse_args()
+    run_retention(args.enable_incremental_vacuum)
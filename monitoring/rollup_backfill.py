@@ -0,0 +1,61 @@
+# monitoring/rollup_backfill.py
+"""
+Rebuild prediction_rollups from raw prediction_logs.
+
+Needed once for logs written before rollups existed, or after a manual
+edit of prediction_logs. Streams the logs in chunks instead of loading
+them all at once.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.storage.db import get_db_session
+from app.storage.schemas import PredictionLog, PredictionRollup
+from app.storage.rollups import accumulate, apply_rollups, bucket_start
+from app.ml.validation import REQUIRED_FEATURES
+
+CHUNK_SIZE = 10000
+
+
+def rebuild_rollups(since: datetime = None):
+    db: Session = get_db_session()
+
+    delete = db.query(PredictionRollup)
+    query = db.query(
+        PredictionLog.timestamp,
+        PredictionLog.model_version,
+        PredictionLog.confidence_score,
+        PredictionLog.input_summary,
+        PredictionLog.segment,
+        *[getattr(PredictionLog, f) for f in REQUIRED_FEATURES],
+    )
+    if since is not None:
+        since = bucket_start(since)
+        delete = delete.filter(PredictionRollup.bucket_start >= since)
+        query = query.filter(PredictionLog.timestamp >= since)
+
+    delete.delete(synchronize_session=False)
+
+    # Rollups are additive, so each chunk is applied on its own to keep memory flat
+    total = 0
+    result = db.execute(query.statement.execution_options(yield_per=CHUNK_SIZE))
+    for chunk in result.partitions():
+        apply_rollups(db, accumulate([row._asdict() for row in chunk]))
+        total += len(chunk)
+
+    db.commit()
+    db.close()
+
+    print(f"Rebuilt prediction rollups from {total} prediction logs.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild prediction_rollups from prediction_logs")
+    parser.add_argument("--hours", type=int, default=None, help="Only rebuild the last N hours")
+    args = parser.parse_args()
+
+    since = datetime.utcnow() - timedelta(hours=args.hours) if args.hours else None
+    rebuild_rollups(since)
@@ -0,0 +1,295 @@
+# monitoring/segments.py
+"""
+Per-segment monitoring.
+
+A segment is (model_version, payload[SEGMENT_FIELD]), so a collapse in one
+model version or client is not averaged away in the global window. Every
+run reads all segments at once:
+
+- windows come from one grouped read of prediction_rollups (or one grouped
+  scan of prediction_logs with WINDOW_SOURCE=raw);
+- baselines come from one query of segment_baselines; segments without
+  their own are compared with the "default" baseline;
+- drift for every (segment, feature) pair is a single compute_drift call;
+- evaluate_deviation and next_action run per segment in memory, and states,
+  incidents and resolutions are written in one transaction.
+
+A segment holding the whole window (e.g. all traffic on one model version
+without a segment value) duplicates the global monitor and is skipped, and
+only the SEGMENT_MAX_SEGMENTS busiest segments are judged; the payload side
+is bounded with SEGMENT_ALLOWED_VALUES.
+
+The number of database round-trips does not grow with the number of
+segments. Segment verdicts go to segment_states and to incidents tagged
+with the segment; the global state and fallback stay with monitor_job.
+
+    python -m monitoring.segments
+"""
+
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    LOW_CONFIDENCE_THRESHOLD,
+    BASELINE_SAMPLE_SIZE,
+    CURRENT_WINDOW_MINUTES,
+    WINDOW_SOURCE,
+    SCAN_CHUNK_SIZE,
+    SKETCH_BINS,
+    SEGMENT_MIN_PREDICTIONS,
+    SEGMENT_MAX_SEGMENTS,
+    STATE_NORMAL,
+)
+from app.ml.sketches import FixedHistogram, new_sketches, sketches_from_dict, sketches_to_dict
+from app.ml.validation import REQUIRED_FEATURES
+from app.storage.db import session_scope
+from app.storage.rollups import window_buckets, sum_rollups_by_segment
+from app.storage.schemas import (
+    PredictionLog,
+    BaselineMetrics,
+    SegmentBaseline,
+    SegmentState,
+    Incident,
+    feature_value,
+)
+from monitoring.deviation import DEFAULT_THRESHOLDS, DRIFT_SKETCHES, DeviationThresholds, evaluate_deviation
+from monitoring.drift import compute_drift
+from monitoring.monitor_job import next_action
+
+SKETCH_NAMES = ["confidence"] + REQUIRED_FEATURES
+
+
+def _summary(count, confidence_sum, low_count, sketches: dict):
+    return SimpleNamespace(
+        prediction_count=int(count),
+        avg_confidence=confidence_sum / count,
+        low_confidence_rate=low_count / count,
+        sketches=sketches,
+    )
+
+
+def _grow(matrix: np.ndarray, rows: int) -> np.ndarray:
+    if len(matrix) >= rows:
+        return matrix
+    return np.concatenate([matrix, np.zeros((rows - len(matrix),) + matrix.shape[1:])])
+
+
+def grouped_summaries(chunks, bins: int = SKETCH_BINS) -> dict:
+    """
+    One pass over row chunks of (model_version, segment, confidence, *features)
+    into {(model_version, segment): summary}. Every chunk is folded with
+    bincounts over a group index, never with per-segment loops.
+    """
+    templates = new_sketches(bins)
+    keys = {}
+    acc = {"count": np.zeros(0), "confidence": np.zeros(0), "low": np.zeros(0)}
+    sketch_acc = {name: np.zeros((0, bins + 3)) for name in SKETCH_NAMES}
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        groups = np.fromiter(
+            (keys.setdefault((row[0], row[1] or ""), len(keys)) for row in chunk),
+            dtype=np.int64, count=len(chunk),
+        )
+        n = len(keys)
+        values = np.array([row[2:] for row in chunk], dtype=float)  # None -> NaN
+        confidence = values[:, 0]
+
+        for name, part in (
+            ("count", np.bincount(groups, minlength=n)),
+            ("confidence", np.bincount(groups, weights=confidence, minlength=n)),
+            ("low", np.bincount(groups, weights=confidence < LOW_CONFIDENCE_THRESHOLD, minlength=n)),
+        ):
+            acc[name] = _grow(acc[name], n) + part
+        for j, name in enumerate(SKETCH_NAMES):
+            sketch_acc[name] = _grow(sketch_acc[name], n) + templates[name].grouped_rows(values[:, j], groups, n)
+
+    summaries = {}
+    for key, g in keys.items():
+        sketches = {
+            name: FixedHistogram.from_row(templates[name].lo, templates[name].hi, sketch_acc[name][g].astype(np.int64))
+            for name in SKETCH_NAMES
+        }
+        summaries[key] = _summary(acc["count"][g], acc["confidence"][g], acc["low"][g], sketches)
+    return summaries
+
+
+def _grouped_rows_query(db: Session):
+    return db.query(
+        PredictionLog.model_version,
+        PredictionLog.segment,
+        PredictionLog.confidence_score,
+        *[feature_value(f) for f in REQUIRED_FEATURES],
+    )
+
+
+def segment_windows(db: Session, window_end: datetime) -> dict:
+    """Window summary of every segment with traffic in the last CURRENT_WINDOW_MINUTES."""
+    if WINDOW_SOURCE == "rollups":
+        first_bucket, last_bucket = window_buckets(window_end, CURRENT_WINDOW_MINUTES)
+        return {
+            key: _summary(t["prediction_count"], t["confidence_sum"], t["low_confidence_count"], t["sketches"])
+            for key, t in sum_rollups_by_segment(db, first_bucket, last_bucket).items()
+            if t["prediction_count"]
+        }
+
+    query = _grouped_rows_query(db).filter(
+        PredictionLog.timestamp >= window_end - timedelta(minutes=CURRENT_WINDOW_MINUTES),
+        PredictionLog.timestamp <= window_end,
+    )
+    result = db.execute(query.statement.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    return grouped_summaries(result.partitions())
+
+
+def compute_segment_baselines(db: Session) -> int:
+    """
+    Replace segment_baselines from the baseline sample (first
+    BASELINE_SAMPLE_SIZE logs) in one grouped pass; no commit.
+    """
+    query = _grouped_rows_query(db).order_by(PredictionLog.timestamp.asc())
+    if BASELINE_SAMPLE_SIZE > 0:
+        query = query.limit(BASELINE_SAMPLE_SIZE)
+    result = db.execute(query.statement.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    summaries = grouped_summaries(result.partitions())
+
+    db.query(SegmentBaseline).delete(synchronize_session=False)
+    rows = [
+        SegmentBaseline(
+            model_version=model_version,
+            segment=segment,
+            sample_size=s.prediction_count,
+            avg_confidence=s.avg_confidence,
+            low_confidence_rate=s.low_confidence_rate,
+            feature_sketches=sketches_to_dict(s.sketches),
+        )
+        for (model_version, segment), s in summaries.items()
+        if s.prediction_count >= SEGMENT_MIN_PREDICTIONS
+    ]
+    db.add_all(rows)
+    return len(rows)
+
+
+def _baseline_view(row, version=None):
+    return SimpleNamespace(
+        avg_confidence=row.avg_confidence,
+        low_confidence_rate=row.low_confidence_rate,
+        sketches=sketches_from_dict(row.feature_sketches),
+        version=version,
+    )
+
+
+def _label(key) -> str:
+    model_version, segment = key
+    return f"{model_version}/{segment}" if segment else model_version
+
+
+def run_segment_monitoring(thresholds: DeviationThresholds = DEFAULT_THRESHOLDS):
+    with session_scope() as db:
+        actions, in_window, judged = _judge_segments(db, thresholds)
+    print(
+        f"Segments: {in_window} in window, {judged} judged, "
+        f"{actions['incident']} incidents, {actions['recover']} recovered."
+    )
+
+
+def _judge_segments(db: Session, thresholds: DeviationThresholds):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    windows = segment_windows(db, now)
+    default = db.get(BaselineMetrics, "default")
+    default_baseline = _baseline_view(default, default.version) if default else None
+    baselines = {
+        (b.model_version, b.segment): _baseline_view(b, default.version if default else None)
+        for b in db.query(SegmentBaseline)
+    }
+    states = {(s.model_version, s.segment): s for s in db.query(SegmentState)}
+    window_start = now - timedelta(minutes=CURRENT_WINDOW_MINUTES)
+
+    total = sum(w.prediction_count for w in windows.values())
+    busiest = sorted(windows, key=lambda k: windows[k].prediction_count, reverse=True)[:SEGMENT_MAX_SEGMENTS]
+
+    judged = {}
+    pairs = {}
+    for key in busiest:
+        window = windows[key]
+        baseline = baselines.get(key, default_baseline)
+        if baseline is None or window.prediction_count < SEGMENT_MIN_PREDICTIONS:
+            continue
+        if window.prediction_count == total:
+            continue  # the whole population; judged by monitor_job
+        judged[key] = baseline
+        if window.prediction_count >= thresholds.drift_min_predictions:
+            for name, sketch in window.sketches.items():
+                if name in baseline.sketches and name in DRIFT_SKETCHES:
+                    pairs[(key, name)] = (baseline.sketches[name], sketch)
+
+    # One vectorized drift computation for every segment
+    drift = defaultdict(dict)
+    for (key, name), stats in compute_drift(pairs).items():
+        drift[key][name] = stats
+
+    actions = Counter()
+    recovered = []
+    for key, baseline in judged.items():
+        window = windows[key]
+        new_state, signals, reason = evaluate_deviation(baseline, window, thresholds, drift.get(key, {}))
+
+        state = states.get(key)
+        if state is None:
+            state = SegmentState(model_version=key[0], segment=key[1], current_state=STATE_NORMAL)
+            db.add(state)
+
+        if new_state != STATE_NORMAL:
+            state.healthy_runs = 0
+        elif state.escalated_at is None or window_start >= state.escalated_at:
+            state.healthy_runs = (state.healthy_runs or 0) + 1
+
+        action = next_action(state.current_state, new_state, state.healthy_runs or 0)
+        actions[action] += 1
+        if action == "incident":
+            db.add(Incident(
+                incident_id=str(uuid.uuid4()),
+                severity=new_state,
+                trigger_signals=signals,
+                decision_reason=f"Segment {_label(key)}: {reason}",
+                fallback_activated=False,
+                resolved=False,
+                baseline_version=baseline.version,
+                model_version=key[0],
+                segment=key[1],
+            ))
+            state.current_state = new_state
+            state.reason = reason
+            state.escalated_at = now
+            state.healthy_runs = 0
+        elif action == "recover":
+            recovered.append(key)
+            state.current_state = STATE_NORMAL
+            state.reason = "Recovered after sustained stability"
+
+        state.last_updated = now
+        state.prediction_count = window.prediction_count
+        state.avg_confidence = window.avg_confidence
+        state.low_confidence_rate = window.low_confidence_rate
+
+    if recovered:
+        (
+            db.query(Incident)
+            .filter(Incident.resolved.is_(False))
+            .filter(tuple_(Incident.model_version, Incident.segment).in_(recovered))
+            .update({"resolved": True}, synchronize_session=False)
+        )
+
+    db.commit()
+    return actions, len(windows), len(judged)
+
+
+if __name__ == "__main__":
+    run_segment_monitoring()
\ No newline at end of file
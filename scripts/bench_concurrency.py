@@ -0,0 +1,117 @@
+# scripts/bench_concurrency.py
+"""
+Concurrency benchmark for the sync and async request paths.
+
+Starts one uvicorn server per API_MODE against a scratch SQLite database
+and drives /predict with N concurrent clients, reporting throughput and
+latency percentiles.
+
+    python -m scripts.bench_concurrency --levels 1,64,512 --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PORT = 8765
+
+
+def _payload(rng: random.Random) -> dict:
+    return {
+        "feature_1": rng.uniform(0, 100),
+        "feature_2": rng.uniform(0, 1),
+        "feature_3": rng.uniform(0, 1000),
+    }
+
+
+def _start_server(mode: str, database_url: str, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ, API_MODE=mode, DATABASE_URL=database_url, **extra_env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/").status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"uvicorn ({mode}) did not start")
+
+
+async def _run_level(clients: int, requests: int) -> dict:
+    rng = random.Random(0)
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    r = await client.post("/predict", json=_payload(rng))
+                    if r.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async /predict under concurrency")
+    parser.add_argument("--levels", default="1,64,512", help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per level")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--write-mode", default="sync", help="PREDICTION_LOG_WRITE_MODE for the servers")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",")]
+    extra_env = {"PREDICTION_LOG_WRITE_MODE": args.write_mode}
+
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{tmp}/bench.db"
+            extra_env["STATE_SIGNAL_PATH"] = f"{tmp}/state.signal"
+            proc = _start_server(mode, database_url, extra_env)
+            try:
+                asyncio.run(_run_level(8, 200))  # warm-up
+                for clients in levels:
+                    r = asyncio.run(_run_level(clients, args.requests))
+                    print(
+                        f"{mode:<6} {clients:>7} {r['rps']:>9.0f} {r['p50_ms']:>9.2f} "
+                        f"{r['p99_ms']:>9.2f} {r['errors']:>7}"
+                    )
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
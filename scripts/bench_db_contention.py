@@ -0,0 +1,178 @@
+# scripts/bench_db_contention.py
+"""
+/predict under load while the monitoring jobs run on the same SQLite file.
+
+For every --profiles entry a scratch database is seeded with --rows
+prediction logs and a uvicorn server is started with the profile's SQLite
+settings. /predict is then driven by --clients concurrent clients twice:
+alone, and while monitoring.daemon runs its stages back to back with
+raw-log windows and a full-table baseline (the heaviest readers). Reports
+throughput, p50/p99 latency and failed requests per phase, and the
+daemon's stage runs and failures. Alerting thresholds are disabled so the
+server never switches to the fallback path mid-run.
+
+    python -m scripts.bench_db_contention --rows 200000 --clients 64 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from app.storage.migrations import upgrade_schema
+from app.storage.schemas import PredictionLog
+from scripts.bench_concurrency import _start_server, _run_level
+from scripts.bench_results import write_results, compare_results
+
+_WAL = {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "SQLITE_MMAP_SIZE_MB": "256"}
+
+PROFILES = {
+    # Settings before the engine overhaul (pysqlite's default 5 s busy timeout)
+    "rollback": {
+        "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE_MB": "0",
+        "SQLITE_SERIALIZE_WRITES": "false",
+    },
+    "wal": {**_WAL, "SQLITE_SERIALIZE_WRITES": "false"},
+    # Defaults
+    "wal_serialized": {**_WAL, "SQLITE_SERIALIZE_WRITES": "true"},
+}
+
+QUIET = {
+    "MAX_CONFIDENCE_DROP": "1",
+    "MAX_LOW_CONFIDENCE_INCREASE": "1",
+    "DRIFT_PSI_WARNING": "1e9",
+    "DRIFT_PSI_CRITICAL": "1e9",
+    "STREAM_DETECTOR_ENABLED": "false",
+}
+
+CHUNK = 50_000
+
+
+def seed(database_url: str, rows: int, span_hours: int):
+    engine = create_engine(database_url)
+    upgrade_schema(engine)
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    step = timedelta(hours=span_hours) / rows
+    start = now - timedelta(hours=span_hours)
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(PredictionLog.__table__.insert(), [
+                {
+                    "timestamp": start + step * i,
+                    "model_version": "v1.0",
+                    "system_state": "NORMAL",
+                    "prediction": "1",
+                    "confidence_score": rng.uniform(0.4, 1.0),
+                    "fallback_used": False,
+                    "feature_1": rng.uniform(0, 100),
+                    "feature_2": rng.random(),
+                    "feature_3": rng.uniform(0, 1000),
+                }
+                for i in range(offset, min(offset + CHUNK, rows))
+            ])
+    engine.dispose()
+
+
+def start_daemon(env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "monitoring.daemon"],
+        env=dict(
+            env,
+            DAEMON_INTERVAL_SECONDS="0.1",
+            DAEMON_BASELINE_INTERVAL_SECONDS="0.1",
+            WINDOW_SOURCE="raw",
+            BASELINE_SAMPLE_SIZE="0",
+            CURRENT_WINDOW_MINUTES="1440",
+        ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def run_profile(name: str, args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        t0 = time.perf_counter()
+        seed(database_url, args.rows, args.span_hours)
+        print(f"{name}: seeded {args.rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        settings = {
+            **PROFILES[name], **QUIET,
+            "STATE_SIGNAL_PATH": f"{tmp}/state.signal",
+            "DAEMON_STATS_PATH": f"{tmp}/monitoring_stats.json",
+            "PREDICTION_LOG_WRITE_MODE": args.write_mode,
+        }
+        server = _start_server(args.mode, database_url, settings)
+        try:
+            asyncio.run(_run_level(8, 200))  # warm-up
+            results["idle"] = asyncio.run(_run_level(args.clients, args.requests))
+
+            daemon = start_daemon({**os.environ, **settings, "DATABASE_URL": database_url})
+            try:
+                time.sleep(args.daemon_warmup)
+                results["jobs"] = asyncio.run(_run_level(args.clients, args.requests))
+            finally:
+                daemon.terminate()
+                daemon.wait()
+        finally:
+            server.terminate()
+            server.wait()
+
+        try:
+            with open(settings["DAEMON_STATS_PATH"]) as f:
+                stages = json.load(f)["stages"]
+        except (OSError, ValueError):
+            stages = {}
+        results["jobs"]["stage_runs"] = sum(s["runs"] for s in stages.values())
+        results["jobs"]["stage_failures"] = sum(s["failures"] for s in stages.values())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predict while monitoring jobs run")
+    parser.add_argument("--profiles", default="rollback,wal,wal_serialized", help=f"Comma-separated, from {sorted(PROFILES)}")
+    parser.add_argument("--rows", type=int, default=200_000, help="Seeded prediction_logs rows")
+    parser.add_argument("--span-hours", type=int, default=24)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per phase")
+    parser.add_argument("--mode", default="sync", help="API_MODE of the server")
+    parser.add_argument("--write-mode", default="sync", help="PREDICTION_LOG_WRITE_MODE of the server")
+    parser.add_argument("--daemon-warmup", type=float, default=2.0,
+                        help="Seconds the daemon runs before the loaded phase starts")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+
+    rows = {}
+    for name in args.profiles.split(","):
+        for phase, r in run_profile(name, args).items():
+            rows[f"{name} {phase}"] = r
+
+    print(f"\n{'profile':<20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'stages':>7} {'failed':>7}")
+    for label, r in rows.items():
+        print(
+            f"{label:<20} {r['rps']:>9.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7} "
+            f"{r.get('stage_runs', ''):>7} {r.get('stage_failures', ''):>7}"
+        )
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    path = write_results("bench_db_contention", {"config": config, "rows": rows}, args.output)
+    print(f"results: {path}")
+
+    if args.compare:
+        compare_results(args.compare, rows, ("rps", "p50_ms", "p99_ms", "errors"))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
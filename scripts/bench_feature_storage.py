@@ -0,0 +1,158 @@
+# scripts/bench_feature_storage.py
+"""
+Row size and aggregation speed of the JSON vs typed feature layouts.
+
+Seeds prediction_logs in the original layout (features only in
+input_summary), times the raw window and baseline aggregations, migrates
+the table with monitoring.feature_backfill and times them again. Sizes are
+bytes per row of the prediction_logs table after a VACUUM (SQLite only;
+the target database is dropped and re-seeded, never point it at production).
+
+    python -m scripts.bench_feature_storage --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--span-hours", type=int, default=24,
+                        help="Seeded logs are spread evenly over this many hours")
+    parser.add_argument("--baseline-sample", type=int, default=100_000)
+    parser.add_argument("--window-minutes", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Must be set before any app module creates the engine
+os.environ["DATABASE_URL"] = args.database_url or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+)
+os.environ["BASELINE_SAMPLE_SIZE"] = str(args.baseline_sample)
+os.environ["CURRENT_WINDOW_MINUTES"] = str(args.window_minutes)
+
+from app.storage.db import engine, get_db_session  # noqa: E402
+from app.storage.migrations import upgrade_schema  # noqa: E402
+from app.storage.schemas import Base, PredictionLog  # noqa: E402
+from monitoring.baseline import _baseline_from_logs  # noqa: E402
+from monitoring.current_window import _window_from_logs  # noqa: E402
+from monitoring.feature_backfill import backfill_features  # noqa: E402
+from scripts.bench_results import write_results, compare_results  # noqa: E402
+
+CHUNK = 50_000
+
+
+def seed(rows: int, span_hours: int):
+    """Original layout: the whole payload in input_summary, typed columns NULL."""
+    Base.metadata.drop_all(bind=engine)
+    upgrade_schema()
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    step = timedelta(hours=span_hours) / rows
+    start = now - timedelta(hours=span_hours)
+    table = PredictionLog.__table__
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            batch = []
+            for i in range(offset, min(offset + CHUNK, rows)):
+                batch.append({
+                    "timestamp": start + step * i,
+                    "model_version": "v1.0",
+                    "system_state": "NORMAL",
+                    "input_summary": {
+                        "feature_1": rng.uniform(0, 100),
+                        "feature_2": rng.random(),
+                        "feature_3": rng.uniform(0, 1000),
+                    },
+                    "prediction": "1",
+                    "confidence_score": rng.uniform(0.4, 1.0),
+                    "fallback_used": False,
+                })
+            conn.execute(table.insert(), batch)
+    print(f"seeded {rows:,} rows in {time.perf_counter() - t0:.1f}s")
+    return now
+
+
+def table_bytes_per_row(rows: int) -> float:
+    """prediction_logs pages (without indexes) per row, after a VACUUM."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        try:
+            size = conn.exec_driver_sql(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = 'prediction_logs'"
+            ).scalar()
+        except Exception:
+            # SQLite built without dbstat: whole file, indexes included
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            size = conn.exec_driver_sql("PRAGMA page_count").scalar() * page_size
+    return size / rows
+
+
+def timed(fn, *fn_args):
+    best = float("inf")
+    for _ in range(args.repeat):
+        db = get_db_session()
+        t0 = time.perf_counter()
+        fn(db, *fn_args)
+        best = min(best, time.perf_counter() - t0)
+        db.close()
+    return best
+
+
+def measure(label: str, window_end, results: dict):
+    row = {
+        "bytes_per_row": table_bytes_per_row(args.rows),
+        "window_ms": timed(_window_from_logs, window_end) * 1000,
+        "baseline_ms": timed(_baseline_from_logs) * 1000,
+    }
+    results[label] = row
+    print(f"{label:<6} {row['bytes_per_row']:8.1f} B/row   window {row['window_ms']:9.1f} ms   "
+          f"baseline {row['baseline_ms']:9.1f} ms")
+
+
+if __name__ == "__main__":
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("Row sizes are read from SQLite's dbstat; use a sqlite:/// database URL")
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    window_end = seed(args.rows, args.span_hours)
+
+    rows = {}
+    measure("json", window_end, rows)
+
+    t0 = time.perf_counter()
+    backfill_features(chunk_size=CHUNK)
+    migration_s = time.perf_counter() - t0
+
+    measure("typed", window_end, rows)
+
+    json_row, typed_row = rows["json"], rows["typed"]
+    print(f"\nrow size {typed_row['bytes_per_row'] / json_row['bytes_per_row']:.2f}x, "
+          f"window {json_row['window_ms'] / typed_row['window_ms']:.2f}x faster, "
+          f"baseline {json_row['baseline_ms'] / typed_row['baseline_ms']:.2f}x faster, "
+          f"migration {args.rows / migration_s:,.0f} rows/s")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "database_url")}
+    path = write_results(
+        "bench_feature_storage",
+        {"config": config, "migration_seconds": migration_s, "rows": rows},
+        args.output,
+    )
+    print(f"results: {path}")
+
+    if args.compare:
+        compare_results(args.compare, rows, ("bytes_per_row", "window_ms", "baseline_ms"))
\ No newline at end of file
@@ -0,0 +1,194 @@
+# scripts/bench_micro.py
+"""
+Microbenchmarks for the request path and the monitoring jobs.
+
+Per-call timings for validate_input, model.predict (prediction cache off),
+a prediction cache hit and evaluate_deviation, then the window and
+baseline jobs against seeded prediction_logs tables of each --sizes row
+count (drop-and-reseed; never point --database-url at production).
+Results go to bench_results/ for comparison between commits.
+
+    python -m scripts.bench_micro --sizes 10000,1000000
+    python -m scripts.bench_micro --sizes 10000000 --compare bench_results/bench_micro-<commit>-<time>.json
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,1000000", help="Comma-separated prediction_logs row counts")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--span-hours", type=int, default=24,
+                        help="Seeded logs are spread evenly over this many hours")
+    parser.add_argument("--baseline-sample", type=int, default=100_000)
+    parser.add_argument("--window-minutes", type=int, default=15)
+    parser.add_argument("--calls", type=int, default=20000, help="Calls per microbenchmark round")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Must be set before any app module creates the engine
+os.environ["DATABASE_URL"] = args.database_url or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+)
+os.environ["BASELINE_SAMPLE_SIZE"] = str(args.baseline_sample)
+os.environ["CURRENT_WINDOW_MINUTES"] = str(args.window_minutes)
+# model.predict measures the model call, not the prediction cache
+os.environ["PREDICTION_CACHE_SIZE"] = "0"
+
+import numpy as np  # noqa: E402
+
+from app.ml import model  # noqa: E402
+from app.core.config import SKETCH_BINS  # noqa: E402
+from app.ml.sketches import sketches_from_values, sketches_to_dict  # noqa: E402
+from app.ml.prediction_cache import PredictionCache  # noqa: E402
+from app.ml.validation import validate_input, synthetic_matrix, REQUIRED_FEATURES  # noqa: E402
+from app.storage.db import engine, get_db_session  # noqa: E402
+from app.storage.migrations import upgrade_schema  # noqa: E402
+from app.storage.schemas import Base, PredictionLog  # noqa: E402
+from monitoring.baseline import compute_baseline  # noqa: E402
+from monitoring.current_window import _window_from_logs, _window_from_rollups  # noqa: E402
+from monitoring.deviation import evaluate_deviation  # noqa: E402
+from monitoring.rollup_backfill import rebuild_rollups  # noqa: E402
+from scripts.bench_results import write_results, compare_results  # noqa: E402
+
+CHUNK = 50_000
+
+
+def per_call(fn, calls: int) -> dict:
+    """Best and median ns per call over args.repeat rounds."""
+    rounds = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(calls):
+            fn()
+        rounds.append((time.perf_counter_ns() - t0) / calls)
+    rounds.sort()
+    return {"best_us": rounds[0] / 1000, "median_us": rounds[len(rounds) // 2] / 1000}
+
+
+def best_of(fn) -> dict:
+    times = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return {"best_ms": times[0] * 1000, "median_ms": times[len(times) // 2] * 1000}
+
+
+def _window_metrics(rng, rows: int, shift: float):
+    matrix = synthetic_matrix(rows, seed=rng.integers(1 << 30))
+    matrix[:, 0] = np.clip(matrix[:, 0] + shift * 100, 0, 100)
+    confidence = rng.uniform(0.5 + shift, 1.0, rows)
+    values = {name: matrix[:, i] for i, name in enumerate(REQUIRED_FEATURES)}
+    values["confidence"] = confidence
+    return SimpleNamespace(
+        avg_confidence=float(confidence.mean()),
+        low_confidence_rate=float((confidence < 0.6).mean()),
+        prediction_count=rows,
+        feature_sketches=sketches_to_dict(sketches_from_values(values, SKETCH_BINS)),
+    )
+
+
+def micro_benchmarks() -> dict:
+    payload = {"feature_1": 42.0, "feature_2": 0.5, "feature_3": 420.0}
+    features = validate_input(payload)
+    model.load_model()
+    cache = PredictionCache(capacity=1024)
+    cache.put("bench", features, *model.predict(features)[:2])
+
+    rng = np.random.default_rng(42)
+    baseline = _window_metrics(rng, 100_000, 0.0)
+    current = _window_metrics(rng, 5_000, 0.1)
+
+    return {
+        "validate_input": per_call(lambda: validate_input(payload), args.calls),
+        "model.predict": per_call(lambda: model.predict(features), args.calls),
+        "prediction_cache.get (hit)": per_call(lambda: cache.get("bench", features), args.calls),
+        "evaluate_deviation": per_call(lambda: evaluate_deviation(baseline, current), max(1, args.calls // 20)),
+    }
+
+
+def seed(rows: int, span_hours: int) -> datetime:
+    Base.metadata.drop_all(bind=engine)
+    upgrade_schema()
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    step = timedelta(hours=span_hours) / rows
+    start = now - timedelta(hours=span_hours)
+    table = PredictionLog.__table__
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(table.insert(), [
+                {
+                    "timestamp": start + step * i,
+                    "model_version": "v1.0",
+                    "system_state": "NORMAL",
+                    "input_summary": {
+                        "feature_1": rng.uniform(0, 100),
+                        "feature_2": rng.random(),
+                        "feature_3": rng.uniform(0, 1000),
+                    },
+                    "prediction": "1",
+                    "confidence_score": rng.uniform(0.4, 1.0),
+                    "fallback_used": False,
+                }
+                for i in range(offset, min(offset + CHUNK, rows))
+            ])
+    # Rollups only for the window being measured
+    rebuild_rollups(since=now - timedelta(minutes=args.window_minutes))
+    print(f"seeded {rows:,} rows in {time.perf_counter() - t0:.1f}s")
+    return now
+
+
+def job_benchmarks(rows: int) -> dict:
+    window_end = seed(rows, args.span_hours)
+
+    def window(fn):
+        def run():
+            db = get_db_session()
+            fn(db, window_end)
+            db.close()
+        return run
+
+    return {
+        f"window (rollups) @{rows}": best_of(window(_window_from_rollups)),
+        f"window (raw logs) @{rows}": best_of(window(_window_from_logs)),
+        f"baseline job @{rows}": best_of(compute_baseline),
+    }
+
+
+if __name__ == "__main__":
+    print(f"database: {engine.url.render_as_string(hide_password=True)}")
+    rows = {}
+
+    for name, result in micro_benchmarks().items():
+        rows[name] = result
+        print(f"{name:<32} {result['best_us']:10.2f} us/call (median {result['median_us']:.2f})")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        for name, result in job_benchmarks(size).items():
+            rows[name] = result
+            print(f"{name:<32} {result['best_ms']:10.1f} ms (median {result['median_ms']:.1f})")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "database_url")}
+    path = write_results("bench_micro", {"config": config, "rows": rows}, args.output)
+    print(f"results written to {path}")
+
+    if args.compare:
+        compare_results(args.compare, rows, ("best_us", "best_ms"))
\ No newline at end of file
@@ -0,0 +1,52 @@
+# scripts/bench_results.py
+"""
+Machine-readable benchmark results.
+
+Every result file records the commit it was measured on, so two runs can
+be compared with compare_results() (or `--compare` on the scripts).
+"""
+
+import json
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path("bench_results")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name: str, results: dict, output: str = None) -> Path:
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = Path(output) if output else RESULTS_DIR / f"{name}-{commit}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"benchmark": name, "commit": commit, "recorded_at": stamp, **results}, indent=2))
+    return path
+
+
+def compare_results(previous_path: str, rows: dict, key_fields: tuple):
+    """
+    Print relative changes of `rows` ({name: {field: value}}) against the
+    same names in a previous result file.
+    """
+    previous = json.loads(Path(previous_path).read_text())
+    before = previous.get("rows", {})
+    print(f"\ncompared with {previous.get('commit')} ({previous_path})")
+    for name, values in rows.items():
+        if name not in before:
+            continue
+        changes = []
+        for field in key_fields:
+            old, new = before[name].get(field), values.get(field)
+            if old:
+                changes.append(f"{field} {(new - old) / old * 100:+.1f}%")
+        print(f"  {name:<40} " + ", ".join(changes))
\ No newline at end of file
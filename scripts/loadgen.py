@@ -0,0 +1,171 @@
+# scripts/loadgen.py
+"""
+Concurrent load generator for a running service.
+
+Drives /predict (or /predict/batch) from an asyncio + httpx client pool
+with a fixed concurrency and an optional target rate. Profiles are run in
+order, each for --duration seconds, and reported separately:
+
+    python -m scripts.loadgen --profiles healthy,degrading,recovery \
+        --concurrency 64 --rps 500 --duration 30
+
+With --rps the schedule is open-loop: latency is measured from each
+request's scheduled send time, so a saturated service shows up as
+latency instead of a silently lower request rate. Results are written
+to bench_results/ (see scripts/bench_results.py) and can be compared
+with an earlier run via --compare.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from scripts.bench_results import write_results, compare_results
+
+
+# ---- Traffic profiles (same shapes as the original traffic simulator) ----
+
+def healthy(rng: random.Random) -> dict:
+    return {
+        "feature_1": rng.uniform(20, 40),
+        "feature_2": rng.uniform(0.4, 0.6),
+        "feature_3": rng.uniform(200, 400),
+    }
+
+
+def degrading(rng: random.Random) -> dict:
+    # Constant low-confidence input
+    return {"feature_1": 30, "feature_2": 0.1, "feature_3": 200}
+
+
+def recovery(rng: random.Random) -> dict:
+    return {
+        "feature_1": rng.uniform(25, 45),
+        "feature_2": rng.uniform(0.45, 0.65),
+        "feature_3": rng.uniform(250, 450),
+    }
+
+
+PROFILES = {
+    "healthy": healthy,
+    "degrading": degrading,
+    "recovery": recovery,
+}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_phase(client, profile: str, args, seed: int) -> dict:
+    make_payload = PROFILES[profile]
+    rng = random.Random(seed)
+    path = "/predict/batch" if args.batch_size > 1 else "/predict"
+
+    latencies = []
+    errors = 0
+    scheduled_count = 0
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    async def worker():
+        nonlocal errors, scheduled_count
+        while True:
+            if args.rps > 0:
+                scheduled = start + scheduled_count / args.rps
+                scheduled_count += 1
+                if scheduled >= deadline:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    return
+
+            if args.batch_size > 1:
+                body = [make_payload(rng) for _ in range(args.batch_size)]
+            else:
+                body = make_payload(rng)
+
+            try:
+                response = await client.post(path, json=body)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - scheduled)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    requests = len(latencies)
+    return {
+        "profile": profile,
+        "requests": requests,
+        "rows": requests * args.batch_size,
+        "errors": errors,
+        "error_rate": errors / requests if requests else 0.0,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "p999_ms": percentile(latencies, 0.999) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+async def run(args) -> list:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        phases = []
+        for i, profile in enumerate(args.profiles.split(",")):
+            result = await run_phase(client, profile, args, seed=args.seed + i)
+            print(
+                f"{profile:<10} {result['requests']:>8} req {result['throughput_rps']:>9.1f} req/s "
+                f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f}  "
+                f"p999 {result['p999_ms']:8.2f} ms  errors {result['error_rate'] * 100:.2f}%"
+            )
+            phases.append(result)
+        return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load generator for /predict")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--profiles", default="healthy", help=f"Comma-separated, from {sorted(PROFILES)}")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rps", type=float, default=0, help="Target request rate; 0 sends as fast as possible")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per profile")
+    parser.add_argument("--batch-size", type=int, default=1, help="> 1 sends /predict/batch requests")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Result file (default: bench_results/loadgen-<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(","):
+        if profile not in PROFILES:
+            parser.error(f"unknown profile: {profile}")
+
+    phases = asyncio.run(run(args))
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    rows = {f"{p['profile']}@c{args.concurrency}": p for p in phases}
+    path = write_results("loadgen", {"config": config, "rows": rows}, args.output)
+    print(f"results written to {path}")
+
+    if args.compare:
+        compare_results(args.compare, rows, ("throughput_rps", "p99_ms", "error_rate"))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,34 @@
+# scripts/register_model.py
+"""
+Register a pickled estimator as a new version in the model registry.
+
+    python -m scripts.register_model --version v1.1 --source data/model.pkl --activate
+
+Running servers pick up an activated version through their manifest
+watcher, or immediately via POST /admin/models/{version}/activate.
+"""
+
+import argparse
+import pickle
+
+from app.core.config import MODEL_REGISTRY_DIR
+from app.ml.registry import register_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register a model version")
+    parser.add_argument("--version", required=True)
+    parser.add_argument("--source", default="data/model.pkl", help="Pickled estimator to register")
+    parser.add_argument("--registry-dir", default=MODEL_REGISTRY_DIR)
+    parser.add_argument("--activate", action="store_true", help="Make it the active version")
+    args = parser.parse_args()
+
+    with open(args.source, "rb") as f:
+        model = pickle.load(f)
+
+    artifact = register_model(model, args.version, args.registry_dir, activate=args.activate)
+    print(f"Registered {args.version} at {artifact}" + (" (active)" if args.activate else ""))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file